@@ -2,6 +2,9 @@ from config import DevConfig
 from flask import Flask, request
 from flask_cors import CORS
 
+from app.commons.cache import ResultCache
+from app.commons.profiling import finish_request_profile
+
 
 def create_app(config_class=DevConfig):
     # create and configure the app
@@ -17,10 +20,20 @@ def create_app(config_class=DevConfig):
                     "origins": ["http://localhost:3000", "http://127.0.0.1:3000"]
                 }
             },
+            expose_headers=["ETag"],
         )
     else:
         # TODO: config for production
-        CORS(app)
+        CORS(app, expose_headers=["ETag"])
+
+    app.extensions["result_cache"] = ResultCache(
+        app.config["RESULT_CACHE_MAX_BYTES"], app.config["RESULT_CACHE_TTL"]
+    )
+    app.extensions["paragraph_cache"] = ResultCache(
+        app.config["PARAGRAPH_CACHE_MAX_BYTES"], app.config["RESULT_CACHE_TTL"]
+    )
+
+    app.after_request(finish_request_profile)
 
     @app.before_request
     def handle_options():
@@ -0,0 +1,191 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import Response, jsonify, request
+
+
+class ResultCache:
+    """
+    Bounded in-process LRU cache for endpoint results.
+
+    Entries are evicted least recently used first once their combined size goes over
+    `max_bytes`, and are treated as missing once they are older than `ttl` seconds.
+    """
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], int, float]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Looks up a cached result and marks it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[Dict[str, Any]]: The cached result, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if (
+                entry is not None
+                and self.ttl
+                and time.monotonic() - entry[2] > self.ttl
+            ):
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Stores a result, evicting the least recently used entries to stay within budget.
+
+        Results larger than the whole budget are not stored.
+
+        Args:
+            key (str): The cache key.
+            value (Dict[str, Any]): The result to store.
+        """
+        size = estimate_size(value)
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, time.monotonic())
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Reports the cache counters.
+
+        Returns:
+            Dict[str, int]: Hits, misses, number of entries and their combined size in bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+            }
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimates the memory used by a result, in bytes, counting the keys and values of
+    the dicts and lists nested in it, such as the chapters of a work.
+
+    Args:
+        value (Any): The result to measure.
+
+    Returns:
+        int: The estimated size in bytes.
+    """
+    size = sys.getsizeof(value)
+
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+
+    return size
+
+
+def make_cache_key(namespace: str, content_hash: str, **options: Any) -> str:
+    """
+    Builds a cache key from a content hash and the options that affect the result.
+
+    Args:
+        namespace (str): Name of the operation, so different operations never share keys.
+        content_hash (str): Hash of the input content.
+        **options: Options that change the result (e.g., chapter_id).
+
+    Returns:
+        str: A hex digest usable as both the cache key and the ETag.
+    """
+    digest = hashlib.sha256(namespace.encode("utf-8"))
+    digest.update(b"\0" + content_hash.encode("utf-8"))
+
+    for name in sorted(options):
+        digest.update(f"\0{name}={options[name]}".encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    """
+    Hashes text content for use in a cache key.
+
+    Args:
+        text (str): The content to hash.
+
+    Returns:
+        str: The SHA-256 hex digest of the UTF-8 encoded text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cached_json_response(
+    cache: ResultCache, key: str, compute: Callable[[], Dict[str, Any]]
+) -> Tuple[Response, int]:
+    """
+    Returns a JSON response for a result, computing it only when it is not cached.
+
+    The key is sent back as the response's ETag. A request whose If-None-Match header
+    already holds that ETag gets an empty 304 response without computing anything,
+    since the result depends only on what went into the key.
+
+    Args:
+        cache (ResultCache): The cache to use.
+        key (str): The cache key for the request (see `make_cache_key`).
+        compute (Callable): Produces the result when it is not cached. Exceptions it
+            raises are passed on to the caller and nothing is cached.
+
+    Returns:
+        Tuple[Response, int]: The response and its status code.
+    """
+    if request.if_none_match.contains(key):
+        response = Response(status=304)
+        response.set_etag(key)
+        return response, 304
+
+    result = cache.get(key)
+
+    if result is None:
+        result = compute()
+        cache.set(key, result)
+
+    response = jsonify(result)
+    response.set_etag(key)
+    return response, 200
@@ -2,3 +2,15 @@ class InvalidHTMLFile(Exception):
     """Raised when the uploaded HTML file is invalid or unreadable."""
 
     pass
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when a request needs more memory than one request is allowed."""
+
+    pass
+
+
+class MemoryLimitReached(Exception):
+    """Raised when the process is already using as much memory as it is allowed."""
+
+    pass
@@ -0,0 +1,40 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+_executors: Dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Returns a process pool with the given number of workers, created on first use and
+    shared by later calls.
+
+    A pool that is broken, because one of its processes died, or that was shut down
+    is replaced with a new one, so one failure does not fail every later call.
+
+    Args:
+        workers (int): The number of worker processes.
+
+    Returns:
+        ProcessPoolExecutor: The shared pool.
+    """
+    with _executors_lock:
+        executor = _executors.get(workers)
+
+        if executor is None or _is_unusable(executor):
+            executor = _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+
+        return executor
+
+
+def _is_unusable(executor: ProcessPoolExecutor) -> bool:
+    """
+    Whether a pool can no longer take work.
+    """
+    # ProcessPoolExecutor only keeps these flags as private attributes
+    return bool(
+        getattr(executor, "_broken", False)
+        or getattr(executor, "_shutdown_thread", False)
+    )
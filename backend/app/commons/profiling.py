@@ -0,0 +1,363 @@
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from flask import Response, current_app, g, request
+
+from .exceptions import MemoryBudgetExceeded, MemoryLimitReached
+
+# timed calls between memory samples; reading the resident size takes about 10µs, so
+# sampling on every paragraph rule call would cost more than the timing itself
+MEMORY_SAMPLE_INTERVAL = 64
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else None
+
+
+def current_memory() -> Optional[int]:
+    """
+    Reads the resident memory of this process.
+
+    Returns:
+        Optional[int]: The resident size in bytes, or None where /proc is not
+        available.
+    """
+    if _PAGE_SIZE is None:
+        return None
+
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class StageTiming:
+    """
+    What one stage of a profiled call cost.
+
+    Attributes:
+        name (str): The stage's name (e.g., "extract_styles").
+        wall (float): Wall time in seconds.
+        cpu (float): CPU time of the calling thread in seconds.
+        nodes (Optional[int]): How many nodes the stage worked on, if it counts them.
+        memory (Optional[int]): The most the process had grown by, in bytes, when
+            sampled during the stage, if memory was sampled.
+    """
+
+    __slots__ = ("name", "wall", "cpu", "nodes", "memory")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.nodes: Optional[int] = None
+        self.memory: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Converts the timing to plain data.
+
+        Returns:
+            Dict[str, Any]: The name, wall and CPU time in milliseconds, node count
+            and peak memory growth in bytes.
+        """
+        return {
+            "name": self.name,
+            "wallMs": round(self.wall * 1000, 3),
+            "cpuMs": round(self.cpu * 1000, 3),
+            "nodes": self.nodes,
+            "peakMemoryBytes": self.memory,
+        }
+
+
+class Profile:
+    """
+    Records what each stage of a clean or generate call cost, in the order the stages
+    first ran. A stage that runs several times adds up.
+
+    Memory is tracked by sampling the process's resident size at the end of each
+    stage, every MEMORY_SAMPLE_INTERVAL timed calls and wherever `check_memory` is
+    called, rather than by tracing allocations, which slows a clean down several
+    times over. Growth is measured from when the profile was created, so it includes
+    anything other threads allocated meanwhile.
+
+    Attributes:
+        stages (Dict[str, StageTiming]): Each stage's timing, by name.
+        memory_budget (Optional[int]): Bytes the process may grow by before
+            MemoryBudgetExceeded is raised, or None for no budget.
+        memory_limit (Optional[int]): Resident bytes of the process past which
+            MemoryLimitReached is raised, or None for no limit.
+        start_memory (Optional[int]): The resident size in bytes when the profile was
+            created, or None if it cannot be read on this platform.
+        peak_memory (Optional[int]): The most the process had grown by in any sample.
+    """
+
+    enabled = True
+
+    def __init__(
+        self, memory_budget: Optional[int] = None, memory_limit: Optional[int] = None
+    ):
+        self.stages: Dict[str, StageTiming] = {}
+        self.memory_budget = memory_budget
+        self.memory_limit = memory_limit
+        self.start_memory = current_memory()
+        self.peak_memory: Optional[int] = None if self.start_memory is None else 0
+        self._active: List[StageTiming] = []
+        self._calls = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageTiming]:
+        """
+        Times the code run inside the block as a stage.
+
+        Args:
+            name (str): The stage's name.
+
+        Yields:
+            StageTiming: The stage's timing, whose node count the block may set.
+        """
+        timing = self._get_stage(name)
+        self._active.append(timing)
+        wall, cpu = time.perf_counter(), time.thread_time()
+
+        try:
+            yield timing
+            self.check_memory()
+        finally:
+            timing.wall += time.perf_counter() - wall
+            timing.cpu += time.thread_time() - cpu
+            self._active.pop()
+
+    def timed(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wraps a function so each call is added to a stage, counting the calls as nodes.
+        Memory is sampled every MEMORY_SAMPLE_INTERVAL calls to any timed function.
+
+        Args:
+            name (str): The stage's name.
+            func (Callable): The function to time.
+
+        Returns:
+            Callable: The wrapped function.
+        """
+        timing = self._get_stage(name)
+        timing.nodes = 0
+
+        @wraps(func)
+        def run(*args: Any, **kwargs: Any) -> Any:
+            wall, cpu = time.perf_counter(), time.thread_time()
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timing.wall += time.perf_counter() - wall
+                timing.cpu += time.thread_time() - cpu
+                timing.nodes += 1
+                self._calls += 1
+
+                if self._calls % MEMORY_SAMPLE_INTERVAL == 0:
+                    self.check_memory()
+
+        return run
+
+    def check_memory(self, expected: int = 0) -> None:
+        """
+        Samples the process's resident size, recording the growth against the stages
+        running now, and stops the call if it is over its budget.
+
+        Args:
+            expected (int): Bytes the caller is about to allocate, so a step that
+                cannot be interrupted is refused before it runs rather than after.
+
+        Raises:
+            MemoryLimitReached: If the process is over its memory limit.
+            MemoryBudgetExceeded: If the process has grown, or would grow by the
+                expected bytes, past the budget since the profile was created.
+        """
+        if self.start_memory is None:
+            return
+
+        memory = current_memory()
+
+        if memory is None:
+            return
+
+        growth = memory - self.start_memory
+        self.peak_memory = max(self.peak_memory, growth)
+
+        for timing in self._active:
+            timing.memory = max(timing.memory or 0, growth)
+
+        if self.memory_limit is not None and memory > self.memory_limit:
+            raise MemoryLimitReached(
+                "The server is low on memory. Please try again later."
+            )
+
+        if self.memory_budget is not None and growth + expected > self.memory_budget:
+            raise MemoryBudgetExceeded(
+                "This document is too large to process within the server's memory limit."
+            )
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        """
+        Converts the stages to plain data.
+
+        Returns:
+            List[Dict[str, Any]]: Each stage's timing (see `StageTiming.to_dict`).
+        """
+        return [timing.to_dict() for timing in self.stages.values()]
+
+    def server_timing(self) -> str:
+        """
+        Formats the stages as a Server-Timing header value.
+
+        Returns:
+            str: One metric per stage, with its wall time as the duration and its CPU
+            time, node count and peak memory growth in the description, followed by
+            the peak memory growth of the whole call.
+        """
+        metrics = []
+
+        for timing in self.stages.values():
+            description = f"cpu {timing.cpu * 1000:.1f}ms"
+
+            if timing.nodes is not None:
+                description += f", {timing.nodes} nodes"
+
+            if timing.memory is not None:
+                description += f", {_format_bytes(timing.memory)}"
+
+            metrics.append(
+                f'{timing.name};dur={timing.wall * 1000:.1f};desc="{description}"'
+            )
+
+        if self.peak_memory is not None:
+            metrics.append(f'peak_memory;desc="{_format_bytes(self.peak_memory)}"')
+
+        return ", ".join(metrics)
+
+    def _get_stage(self, name: str) -> StageTiming:
+        timing = self.stages.get(name)
+
+        if timing is None:
+            timing = self.stages[name] = StageTiming(name)
+
+        return timing
+
+
+class _DisabledProfile(Profile):
+    """
+    Profile that records nothing, so code can be instrumented unconditionally.
+    """
+
+    enabled = False
+
+    def __init__(self):
+        super().__init__()
+        self.start_memory = self.peak_memory = None
+
+    def stage(self, name: str):
+        return nullcontext(_DISCARDED_STAGE)
+
+    def timed(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        return func
+
+    def check_memory(self, expected: int = 0) -> None:
+        pass
+
+
+class MemoryGuard(Profile):
+    """
+    Profile that only enforces a memory budget and limit, without timing anything.
+
+    The process's resident size is sampled at the end of each stage and wherever
+    `check_memory` is called, so a request pays for a few reads of its size rather
+    than for timing every paragraph rule. As with Profile, growth is that of the
+    whole process, so it includes what other requests allocate meanwhile.
+    """
+
+    enabled = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageTiming]:
+        yield _DISCARDED_STAGE
+        self.check_memory()
+
+    def timed(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        return func
+
+
+_DISCARDED_STAGE = StageTiming("discarded")
+
+DISABLED_PROFILE: Profile = _DisabledProfile()
+
+
+def _format_bytes(size: int) -> str:
+    return f"mem {size / (1024 * 1024):.1f}MiB"
+
+
+def request_profile() -> Profile:
+    """
+    Returns the profile of the current request, started on first use: a full
+    profile if the PROFILE_REQUESTS setting is on, a MemoryGuard if only a memory
+    budget or limit is set, or a profile that records nothing otherwise.
+
+    The budget is measured as growth of the process's resident size, so concurrent
+    requests handled by the same process count against each other's budgets.
+
+    Returns:
+        Profile: The profile to pass to the services.
+
+    Raises:
+        MemoryLimitReached: If the process is already over its memory limit when the
+            profile is started.
+    """
+    config = current_app.config
+
+    memory_budget = config["REQUEST_MEMORY_BUDGET"] or None
+    memory_limit = config["PROCESS_MEMORY_LIMIT"] or None
+
+    if "profile" not in g:
+        if config["PROFILE_REQUESTS"]:
+            g.profile = Profile(memory_budget, memory_limit)
+        elif memory_budget or memory_limit:
+            g.profile = MemoryGuard(memory_budget, memory_limit)
+        else:
+            return DISABLED_PROFILE
+
+        g.profile.check_memory()
+
+    return g.profile
+
+
+def finish_request_profile(response: Response) -> Response:
+    """
+    Logs the peak memory growth of the current request's profile, and sends its
+    timings as a Server-Timing header if the PROFILE_REQUESTS setting is on.
+
+    Args:
+        response (Response): The response to the request.
+
+    Returns:
+        Response: The same response.
+    """
+    profile = g.get("profile")
+
+    if profile is None:
+        return response
+
+    if profile.peak_memory is not None:
+        current_app.logger.info(
+            "%s %s: %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            _format_bytes(profile.peak_memory),
+        )
+
+    if current_app.config["PROFILE_REQUESTS"] and profile.stages:
+        response.headers["Server-Timing"] = profile.server_timing()
+
+    return response
@@ -1,7 +1,13 @@
+import codecs
+import hashlib
+from typing import Iterator
+
 from marshmallow import ValidationError
 from werkzeug.datastructures import FileStorage
 from .exceptions import InvalidHTMLFile
 
+ZIP_SIGNATURE = b"PK\x03\x04"
+
 
 def not_empty_string(field_name: str):
     def validator(value: str):
@@ -20,3 +26,68 @@ def read_uploaded_html_file(file: FileStorage) -> str:
         )
 
     return html
+
+
+def iter_uploaded_html_file(
+    file: FileStorage, chunk_size: int = 64 * 1024
+) -> Iterator[str]:
+    """
+    Reads an uploaded HTML file as UTF-8 text in chunks, without holding all of it.
+
+    Args:
+        file (FileStorage): The uploaded file.
+        chunk_size (int): The number of bytes to read at a time.
+
+    Yields:
+        str: The decoded text, chunk by chunk.
+
+    Raises:
+        InvalidHTMLFile: If the file is not valid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    try:
+        for chunk in iter(lambda: file.stream.read(chunk_size), b""):
+            yield decoder.decode(chunk)
+
+        yield decoder.decode(b"", final=True)
+    except Exception:
+        raise InvalidHTMLFile(
+            "Unable to read the uploaded file. Please check that it's a valid HTML file."
+        )
+
+
+def is_zip_file(file: FileStorage) -> bool:
+    """
+    Checks whether an uploaded file is a zip archive by its leading bytes, then rewinds
+    the stream.
+
+    Args:
+        file (FileStorage): The uploaded file.
+
+    Returns:
+        bool: True if the file starts with a zip local file header, False otherwise.
+    """
+    signature = file.stream.read(len(ZIP_SIGNATURE))
+    file.stream.seek(0)
+    return signature == ZIP_SIGNATURE
+
+
+def hash_uploaded_file(file: FileStorage) -> str:
+    """
+    Hashes the contents of an uploaded file without keeping a copy of them, then
+    rewinds the stream so the file can still be read.
+
+    Args:
+        file (FileStorage): The uploaded file.
+
+    Returns:
+        str: The SHA-256 hex digest of the file's bytes.
+    """
+    digest = hashlib.sha256()
+
+    for chunk in iter(lambda: file.stream.read(64 * 1024), b""):
+        digest.update(chunk)
+
+    file.stream.seek(0)
+    return digest.hexdigest()
@@ -0,0 +1,85 @@
+import io
+import zipfile
+from typing import Iterable, Iterator, List, Union
+
+
+class ZipStream:
+    """
+    Builds a zip archive one entry at a time, handing back the bytes written so far
+    so the archive can be streamed in a response while it is still being built.
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_DEFLATED):
+        self._buffer = _ChunkBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, "w", compression)
+
+    def add(self, name: str, data: Union[str, bytes]) -> bytes:
+        """
+        Adds a file to the archive.
+
+        Args:
+            name (str): The file's path inside the archive.
+            data (Union[str, bytes]): The file's contents; text is encoded as UTF-8.
+
+        Returns:
+            bytes: The archive bytes produced since the last call.
+        """
+        self._zip.writestr(name, data)
+        return self._buffer.take()
+
+    def add_chunks(
+        self, name: str, chunks: Iterable[Union[str, bytes]]
+    ) -> Iterator[bytes]:
+        """
+        Adds a file to the archive from its contents in chunks, compressing each chunk
+        as it arrives so the file is never held whole.
+
+        Args:
+            name (str): The file's path inside the archive.
+            chunks (Iterable[Union[str, bytes]]): The file's contents; text is encoded
+                as UTF-8.
+
+        Yields:
+            bytes: The archive bytes produced as the chunks are written.
+        """
+        with self._zip.open(name, "w") as entry:
+            for chunk in chunks:
+                entry.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+                data = self._buffer.take()
+
+                if data:
+                    yield data
+
+        yield self._buffer.take()
+
+    def close(self) -> bytes:
+        """
+        Finishes the archive by writing its central directory.
+
+        Returns:
+            bytes: The remaining archive bytes.
+        """
+        self._zip.close()
+        return self._buffer.take()
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """
+    Write-only, unseekable stream that keeps what was written until it is taken.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
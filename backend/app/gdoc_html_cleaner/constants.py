@@ -1 +1,81 @@
 SEMANTIC_TAGS = ["em", "strong", "u", "s"]
+
+PRESERVE_WHITESPACE_TAGS = {"p"}
+
+CDATA_CONTAINING_TAGS = {"script", "style"}
+
+INDENT = " "
+
+DEFAULT_PARSER = "html.parser"
+
+# C-accelerated tree builders, used only when asked for by name: the default parser
+# cleans paragraphs without building a tree, which is about twice as fast
+FAST_PARSERS = ["lxml"]
+
+SUPPORTED_PARSERS = [DEFAULT_PARSER, *FAST_PARSERS, "auto"]
+
+# HTML is checked for Google Docs markup this many characters at a time, so the check
+# stops soon after it has an answer
+GDOC_DETECTION_CHUNK_SIZE = 16 * 1024
+
+# documents shorter than this (in characters) are not worth sending to a process pool
+PARALLEL_MIN_SIZE = 1_000_000
+
+# rough resident bytes a parsed tree takes per character of HTML, used to refuse
+# documents too large for a request's memory budget before parsing them
+PARSED_TREE_BYTES_PER_CHAR = 24
+
+# each worker gets a few ranges so one slow range does not hold up the others
+PARALLEL_RANGES_PER_WORKER = 4
+
+# part of every incremental fingerprint, and raised whenever a change to the cleaner
+# changes the output of a range, so elements cleaned before the change are not reused
+INCREMENTAL_FINGERPRINT_VERSION = 2
+
+HTML_FILE_EXTENSIONS = (".html", ".htm")
+
+CLEANED_FILE_SUFFIX = "_cleaned.html"
+
+BATCH_MANIFEST_NAME = "manifest.json"
+
+# files past this count in one batch are reported as errors instead of cleaned
+BATCH_MAX_FILES = 100
+
+# HTML files in an uploaded zip are not decompressed past this many bytes
+ZIP_MAX_MEMBER_SIZE = 50 * 1024 * 1024
+
+# the HTML files of a batch's zips are not decompressed past this many bytes in all
+BATCH_MAX_UNZIPPED_SIZE = 200 * 1024 * 1024
+
+# each worker is given this many files of a batch at a time, so the rest wait unqueued
+BATCH_FILES_PER_WORKER = 2
+
+# batches with less HTML than this (in characters) in all are not worth sending to a
+# process pool, and are cleaned one file at a time in the process handling the request
+BATCH_PARALLEL_MIN_SIZE = 1_000_000
+
+EXTRACTED_STYLE_PROPERTIES = {
+    "text-align",
+    "font-weight",
+    "font-style",
+    "text-decoration",
+}
+
+STRONG_FLAG = 1
+EM_FLAG = 2
+UNDERLINE_FLAG = 4
+STRIKETHROUGH_FLAG = 8
+
+# semantic tags in the order they are nested, outermost first
+SEMANTIC_TAG_FLAGS = [
+    ("strong", STRONG_FLAG),
+    ("em", EM_FLAG),
+    ("u", UNDERLINE_FLAG),
+    ("s", STRIKETHROUGH_FLAG),
+]
+
+# the bits above this shift hold a class's alignment index plus one (0 = no alignment)
+ALIGNMENT_SHIFT = 4
+
+# tags a top-level <p> may hold for it to be cleaned as paragraph runs instead of a tree
+PARAGRAPH_INLINE_TAGS = {"span", "a", "sup", "sub", "br", "img"}
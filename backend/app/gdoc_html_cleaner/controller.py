@@ -1,13 +1,29 @@
-from flask import Blueprint, jsonify, request
+from typing import Tuple
+
+from flask import Blueprint, Response, current_app, jsonify, request
 from marshmallow import ValidationError
-from ..commons.exceptions import InvalidHTMLFile
+from ..commons.cache import cached_json_response, hash_text, make_cache_key
+from ..commons.exceptions import (
+    InvalidHTMLFile,
+    MemoryBudgetExceeded,
+    MemoryLimitReached,
+)
+from ..commons.profiling import request_profile
+from ..commons.utils import hash_uploaded_file
 from .exceptions import InvalidGoogleDocsHTML
-from .schemas import CleanHTMLFileSchema, CleanHTMLSchema
-from .service import clean_html, clean_html_from_file
+from .schemas import CleanHTMLBatchSchema, CleanHTMLFileSchema, CleanHTMLSchema
+from .service import (
+    clean_html,
+    clean_html_batch,
+    clean_html_from_file,
+    clean_html_incremental,
+    read_html_from_file,
+)
 
 gdoc_html_cleaner_bp = Blueprint("gdoc_html_cleaner", __name__)
 clean_html_schema = CleanHTMLSchema()
 clean_html_file_schema = CleanHTMLFileSchema()
+clean_html_batch_schema = CleanHTMLBatchSchema()
 
 
 @gdoc_html_cleaner_bp.route("/clean", methods=["POST"])
@@ -19,34 +35,125 @@ def clean_from_text():
         return jsonify({"error": first_error}), 400
 
     html = data.get("html")
+    compact = data.get("compact")
+    incremental = data.get("incremental")
+    parser = current_app.config["GDOC_HTML_CLEANER_PARSER"]
 
     try:
-        cleaned_html = clean_html(html)
+        if incremental:
+            return _clean_incrementally(html, compact)
+
+        cache_key = make_cache_key(
+            "clean", hash_text(html), compact=compact, parser=parser
+        )
+
+        return cached_json_response(
+            current_app.extensions["result_cache"],
+            cache_key,
+            lambda: {
+                "cleanedHtml": clean_html(
+                    html,
+                    compact,
+                    parser,
+                    current_app.config["GDOC_HTML_CLEANER_WORKERS"],
+                    request_profile(),
+                )
+            },
+        )
     except InvalidGoogleDocsHTML as err:
         return jsonify({"error": str(err)}), 400
+    except MemoryBudgetExceeded as err:
+        return jsonify({"error": str(err)}), 413
+    except MemoryLimitReached as err:
+        return jsonify({"error": str(err)}), 503, {"Retry-After": "30"}
     except Exception:
         return jsonify({"error": "Internal server error"}), 500
 
-    return jsonify({"cleanedHtml": cleaned_html}), 200
-
 
 @gdoc_html_cleaner_bp.route("/clean-file", methods=["POST"])
 def clean_from_file():
     try:
-        data = clean_html_file_schema.load(request.files)
+        data = clean_html_file_schema.load({**request.files, **request.form})
     except ValidationError as err:
         first_error = next(iter(err.messages.values()))[0]
         return jsonify({"error": first_error}), 400
 
     uploaded_file = data.get("file")
+    compact = data.get("compact")
+    incremental = data.get("incremental")
+    parser = current_app.config["GDOC_HTML_CLEANER_PARSER"]
 
     try:
-        cleaned_html = clean_html_from_file(uploaded_file)
+        if incremental:
+            return _clean_incrementally(read_html_from_file(uploaded_file), compact)
+
+        # HTML uploads are decoded as UTF-8, so they share cache entries with /clean
+        cache_key = make_cache_key(
+            "clean", hash_uploaded_file(uploaded_file), compact=compact, parser=parser
+        )
+
+        return cached_json_response(
+            current_app.extensions["result_cache"],
+            cache_key,
+            lambda: {
+                "cleanedHtml": clean_html_from_file(
+                    uploaded_file,
+                    compact,
+                    parser,
+                    current_app.config["GDOC_HTML_CLEANER_STREAM_UPLOADS"],
+                    current_app.config["GDOC_HTML_CLEANER_WORKERS"],
+                    request_profile(),
+                )
+            },
+        )
     except InvalidHTMLFile as err:
         return jsonify({"error": str(err)}), 400
     except InvalidGoogleDocsHTML as err:
         return jsonify({"error": str(err)}), 400
+    except MemoryBudgetExceeded as err:
+        return jsonify({"error": str(err)}), 413
+    except MemoryLimitReached as err:
+        return jsonify({"error": str(err)}), 503, {"Retry-After": "30"}
     except Exception:
         return jsonify({"error": "Internal server error"}), 500
 
-    return jsonify({"cleanedHtml": cleaned_html}), 200
+
+@gdoc_html_cleaner_bp.route("/clean-batch", methods=["POST"])
+def clean_batch():
+    try:
+        data = clean_html_batch_schema.load(
+            {"files": request.files.getlist("files"), **request.form}
+        )
+    except ValidationError as err:
+        first_error = next(iter(err.messages.values()))[0]
+        return jsonify({"error": first_error}), 400
+
+    try:
+        chunks = clean_html_batch(
+            data.get("files"),
+            data.get("compact"),
+            current_app.config["GDOC_HTML_CLEANER_PARSER"],
+            current_app.config["GDOC_HTML_CLEANER_BATCH_WORKERS"],
+        )
+    except Exception:
+        return jsonify({"error": "Internal server error"}), 500
+
+    return Response(
+        chunks,
+        mimetype="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="cleaned.zip"'},
+    )
+
+
+def _clean_incrementally(html: str, compact: bool) -> Tuple[Response, int]:
+    """
+    Cleans HTML reusing paragraphs cleaned by earlier requests, and reports how many
+    were reused.
+
+    The result cache is bypassed, since the count describes this request's clean and
+    would be stale when read back; the paragraph cache makes repeated cleans cheap.
+    """
+    cleaned_html, reused = clean_html_incremental(
+        html, current_app.extensions["paragraph_cache"], compact, request_profile()
+    )
+    return jsonify({"cleanedHtml": cleaned_html, "reusedParagraphs": reused}), 200
@@ -2,3 +2,9 @@ class InvalidGoogleDocsHTML(Exception):
     """Raised when the input HTML is not from Google Docs."""
 
     pass
+
+
+class UnsupportedStylesheet(Exception):
+    """Raised when a stylesheet is too unusual for the lightweight style extractor."""
+
+    pass
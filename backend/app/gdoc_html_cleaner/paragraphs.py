@@ -0,0 +1,562 @@
+import os
+import re
+from collections import Counter
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from bs4.builder import HTMLParserTreeBuilder
+from bs4.dammit import EntitySubstitution
+
+from . import utils
+from .constants import PARAGRAPH_INLINE_TAGS, SEMANTIC_TAG_FLAGS
+from .serializer import format_start_tag
+from .stylesheet import SEMANTIC_FLAGS_MASK, ClassStyleTable
+
+# text directly inside a paragraph
+TEXT_RUN = 0
+# a <span> directly inside a paragraph, whose own tag is dropped when it is cleaned
+SPAN_RUN = 1
+# any other tag directly inside a paragraph, which is kept as it is
+INLINE_RUN = 2
+
+VOID_ELEMENTS = HTMLParserTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS
+
+LIST_ATTRIBUTES = HTMLParserTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES
+
+# the whitespace BeautifulSoup collapses a whitespace-only text node to one space or
+# newline for
+ASCII_SPACES = " \n\t\x0c\r"
+
+NONWHITESPACE_PATTERN = re.compile(r"\S+")
+
+# the semantic tags around a run for each combination of flags, outermost first
+OPEN_TAGS = [
+    "".join(f"<{tag}>" for tag, flag in SEMANTIC_TAG_FLAGS if flags & flag)
+    for flags in range(SEMANTIC_FLAGS_MASK + 1)
+]
+CLOSE_TAGS = [
+    "".join(f"</{tag}>" for tag, flag in reversed(SEMANTIC_TAG_FLAGS) if flags & flag)
+    for flags in range(SEMANTIC_FLAGS_MASK + 1)
+]
+
+# a top-level item of a body range
+_BLANK_ITEM = 0
+_PARAGRAPH_ITEM = 1
+_TREE_ITEM = 2
+
+
+class Run:
+    """
+    One child of a paragraph, with the semantic tags it is wrapped in.
+
+    The contents are kept as pieces that alternate between text and markup, starting
+    and ending with text, so the text can be changed without reparsing the tags.
+
+    Attributes:
+        kind (int): TEXT_RUN, SPAN_RUN or INLINE_RUN.
+        flags (int): The STRONG/EM/UNDERLINE/STRIKETHROUGH flags of the semantic tags
+            the run is wrapped in. 0 until a span's classes are mapped.
+        pieces (List[str]): The contents, text at even indexes and markup at odd ones.
+        classes (Optional[Tuple[str, ...]]): A span's classes, until they are mapped.
+    """
+
+    __slots__ = ("kind", "flags", "pieces", "classes")
+
+    def __init__(
+        self,
+        kind: int,
+        pieces: List[str],
+        classes: Optional[Tuple[str, ...]] = None,
+    ):
+        self.kind = kind
+        self.flags = 0
+        self.pieces = pieces
+        self.classes = classes
+
+    @property
+    def text(self) -> str:
+        """
+        The run's text without its markup.
+        """
+        return "".join(self.pieces[::2])
+
+
+class Paragraph:
+    """
+    A top-level \\<p> tag read as a flat list of runs instead of a tree.
+
+    Attributes:
+        attrs (Dict[str, Any]): The tag's attributes, as BeautifulSoup stores them.
+        alignment (Optional[str]): The 'text-align' value to write as its 'align'.
+        runs (List[Run]): The tag's children, in order.
+    """
+
+    __slots__ = ("attrs", "alignment", "runs")
+
+    def __init__(self, attrs: Dict[str, Any]):
+        self.attrs = attrs
+        self.alignment: Optional[str] = None
+        self.runs: List[Run] = []
+
+
+def read_body_range(
+    range_html: str, closed_empty_elements: List[str]
+) -> List[Union[Paragraph, Tuple[str, List[str]]]]:
+    """
+    Reads a range of top-level \\<body> elements, turning each \\<p> tag that only
+    holds PARAGRAPH_INLINE_TAGS into a Paragraph.
+
+    The range is tokenized the way BeautifulSoup's 'html.parser' builder does it, so
+    each paragraph holds exactly what its tree would. Anything else, such as tables,
+    headings, lists, comments or tags that are not closed in order, is left as raw
+    HTML, with consecutive elements kept together.
+
+    Args:
+        range_html (str): The raw HTML of the range.
+        closed_empty_elements (List[str]): Parser state the range starts in (see
+            `parallel.BodyOutline`).
+
+    Returns:
+        List[Union[Paragraph, Tuple[str, List[str]]]]: In document order, each
+        paragraph, and each stretch of other HTML with the parser state it starts in.
+    """
+    reader = _ParagraphReader(range_html, closed_empty_elements)
+    reader.feed(range_html)
+    reader.close()
+    return reader.finish()
+
+
+def clean_paragraph(paragraph: Paragraph, class_styles: ClassStyleTable) -> str:
+    """
+    Applies the paragraph rules to a paragraph and writes it as HTML.
+
+    The rules give the same output as the tree rules in `service.build_paragraph_rules`
+    do for the same \\<p> tag.
+
+    Args:
+        paragraph (Paragraph): The paragraph to clean. It is changed in place.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+
+    Returns:
+        str: The cleaned \\<p> tag.
+    """
+    apply_alignment(paragraph, class_styles)
+    map_span_flags(paragraph, class_styles)
+    merge_runs(paragraph)
+    strip_newlines(paragraph)
+    fill_empty_paragraph(paragraph)
+    return render_paragraph(paragraph)
+
+
+def apply_alignment(paragraph: Paragraph, class_styles: ClassStyleTable) -> None:
+    """
+    Sets the alignment mapped to a paragraph's classes and removes its 'c' classes.
+
+    Args:
+        paragraph (Paragraph): The paragraph to update.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+    """
+    classes = paragraph.attrs.get("class", [])
+    paragraph.alignment = class_styles.paragraph_alignment(classes)
+    new_classes = [c for c in classes if not utils.is_c_class_name(c)]
+
+    if new_classes:
+        paragraph.attrs["class"] = new_classes
+    else:
+        paragraph.attrs.pop("class", None)
+
+
+def map_span_flags(paragraph: Paragraph, class_styles: ClassStyleTable) -> None:
+    """
+    Maps the classes of each span in a paragraph to semantic tag flags.
+
+    Args:
+        paragraph (Paragraph): The paragraph to update.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+    """
+    for run in paragraph.runs:
+        if run.kind == SPAN_RUN:
+            run.flags = class_styles.span_flags(run.classes) if run.classes else 0
+            run.classes = None
+
+
+def merge_runs(paragraph: Paragraph) -> None:
+    """
+    Merges adjacent runs wrapped in the same outermost semantic tag into one, and
+    flattens spans with no semantic styling into text, in one pass.
+
+    As with the tree rules, runs are only merged when they are next to each other in
+    the original paragraph, and the text of unstyled spans is held back until the
+    next tag, so text directly inside the paragraph can come before it.
+
+    Args:
+        paragraph (Paragraph): The paragraph to update, with its span flags mapped.
+    """
+    runs: List[Run] = []
+    span_texts: List[str] = []
+    previous_outer = 0
+
+    for run in paragraph.runs:
+        # the lowest flag is the outermost tag
+        outer = run.flags & -run.flags
+
+        if run.kind == TEXT_RUN:
+            runs.append(run)
+        elif run.kind == SPAN_RUN and not outer:
+            span_texts.append(run.text)
+        elif outer and outer == previous_outer:
+            _merge_run(runs[-1], run, outer)
+        else:
+            if span_texts:
+                runs.append(Run(TEXT_RUN, ["".join(span_texts)]))
+                span_texts = []
+
+            runs.append(run)
+
+        previous_outer = outer
+
+    if span_texts:
+        runs.append(Run(TEXT_RUN, ["".join(span_texts)]))
+
+    paragraph.runs = runs
+
+
+def _merge_run(target: Run, run: Run, outer: int) -> None:
+    """
+    Moves a run's contents into the end of a run with the same outermost tag, keeping
+    the inner tags of both as markup.
+    """
+    if target.flags != outer:
+        target.pieces = _wrap_pieces(target.pieces, target.flags & ~outer)
+        target.flags = outer
+
+    pieces = _wrap_pieces(run.pieces, run.flags & ~outer)
+    target.pieces[-1] += pieces[0]
+    target.pieces.extend(pieces[1:])
+
+
+def _wrap_pieces(pieces: List[str], flags: int) -> List[str]:
+    """
+    Wraps a run's pieces in the semantic tags for the given flags.
+    """
+    if not flags:
+        return pieces
+
+    return ["", OPEN_TAGS[flags], *pieces, CLOSE_TAGS[flags], ""]
+
+
+def strip_newlines(paragraph: Paragraph) -> None:
+    """
+    Removes newline characters from the text of a paragraph's runs.
+
+    Args:
+        paragraph (Paragraph): The paragraph to update.
+    """
+    for run in paragraph.runs:
+        pieces = run.pieces
+
+        for i in range(0, len(pieces), 2):
+            if os.linesep in pieces[i]:
+                pieces[i] = pieces[i].replace(os.linesep, "")
+
+
+def fill_empty_paragraph(paragraph: Paragraph) -> None:
+    """
+    Fills a paragraph with no runs, or only whitespace text, with a non-breaking space.
+
+    Args:
+        paragraph (Paragraph): The paragraph to update.
+    """
+    if all(
+        run.kind == TEXT_RUN and run.pieces[0].strip() == "" for run in paragraph.runs
+    ):
+        paragraph.runs = [Run(TEXT_RUN, ["\u00a0"])]
+
+
+def render_paragraph(paragraph: Paragraph) -> str:
+    """
+    Writes a paragraph as HTML, the way the serializer writes a \\<p> tag.
+
+    Args:
+        paragraph (Paragraph): The paragraph to write.
+
+    Returns:
+        str: The \\<p> tag and its contents, unescaped.
+    """
+    attrs = paragraph.attrs
+
+    if paragraph.alignment:
+        attrs = {**attrs, "align": paragraph.alignment}
+
+    parts = [format_start_tag("p", attrs, False)]
+
+    for run in paragraph.runs:
+        if run.flags:
+            parts.append(OPEN_TAGS[run.flags])
+            parts.extend(run.pieces)
+            parts.append(CLOSE_TAGS[run.flags])
+        else:
+            parts.extend(run.pieces)
+
+    parts.append("</p>")
+    return "".join(parts)
+
+
+def _attr_dict(name: str, attrs: List[Tuple[str, Optional[str]]]) -> Dict[str, Any]:
+    """
+    Builds a tag's attributes the way BeautifulSoup does: later duplicates replace
+    earlier ones, missing values are empty, and attributes such as 'class' are split
+    into lists.
+    """
+    result: Dict[str, Any] = {}
+
+    for key, value in attrs:
+        result[key] = "" if value is None else value
+
+    for key in LIST_ATTRIBUTES["*"] | LIST_ATTRIBUTES.get(name, set()):
+        if key in result:
+            result[key] = NONWHITESPACE_PATTERN.findall(result[key])
+
+    return result
+
+
+def _charref_text(name: str) -> str:
+    """
+    Converts a numeric character reference the way the 'html.parser' builder does for
+    text that was not decoded from bytes, reading low numbers as Windows-1252.
+    """
+    if name.startswith("x"):
+        number = int(name.lstrip("x"), 16)
+    elif name.startswith("X"):
+        number = int(name.lstrip("X"), 16)
+    else:
+        number = int(name)
+
+    if number < 256:
+        try:
+            return bytes([number]).decode("windows-1252")
+        except UnicodeDecodeError:
+            pass
+
+    try:
+        return chr(number)
+    except (ValueError, OverflowError):
+        return "\N{REPLACEMENT CHARACTER}"
+
+
+class _ParagraphReader(HTMLParser):
+    """
+    Tracks the stack of open tags the way BeautifulSoup's html.parser builder does,
+    building a Paragraph for each simple top-level \\<p> tag and noting where the
+    other top-level items start.
+    """
+
+    def __init__(self, html: str, closed_empty_elements: List[str]):
+        # character references are left alone, as the html.parser builder does
+        super().__init__(convert_charrefs=False)
+        self.items: List[Union[Paragraph, Tuple[str, List[str]]]] = []
+        self._html = html
+        self._stack: List[str] = []
+        # a count per name is enough, since only membership is ever checked
+        self._already_closed_empty_element = Counter(closed_empty_elements)
+        self._line_starts = [0] + [m.end() for m in re.finditer("\n", html)]
+        self._data: List[str] = []
+        # the top-level item being read, which ends where the next one starts
+        self._item_kind = _BLANK_ITEM
+        self._item_start = 0
+        self._item_closed = list(closed_empty_elements)
+        self._paragraph: Optional[Paragraph] = None
+        self._paragraph_open = False
+        # the start of the raw HTML not yet added to the items, if any
+        self._tree_start: Optional[int] = None
+        self._tree_closed: List[str] = []
+
+    def finish(self) -> List[Union[Paragraph, Tuple[str, List[str]]]]:
+        """
+        Ends the last item once the whole range has been fed and closed.
+        """
+        self._flush_data()
+        self._end_item()
+        self._add_tree(len(self._html))
+        return self.items
+
+    def handle_starttag(
+        self, name: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        self._start(name, attrs)
+
+        if name in VOID_ELEMENTS:
+            self._pop_to(name)
+            self._already_closed_empty_element[name] += 1
+
+    def handle_startendtag(
+        self, name: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        if self._stack and self._already_closed_empty_element[name]:
+            # the end tag below is swallowed, so the tag stays open
+            self._use_tree()
+
+        self._start(name, attrs)
+        self.handle_endtag(name)
+
+    def handle_endtag(self, name: str) -> None:
+        if self._already_closed_empty_element[name]:
+            # a redundant end tag for an empty element that was already closed
+            self._already_closed_empty_element[name] -= 1
+            return
+
+        self._flush_data()
+
+        if not self._stack:
+            # a stray end tag splits the text around it
+            self._use_tree()
+        elif self._paragraph is not None:
+            self._end_paragraph_tag(name)
+
+        self._pop_to(name)
+
+    def handle_data(self, data: str) -> None:
+        if self._paragraph is not None or not self._stack:
+            self._data.append(data)
+
+    def handle_charref(self, name: str) -> None:
+        self.handle_data(_charref_text(name))
+
+    def handle_entityref(self, name: str) -> None:
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(f"&{name}" if character is None else character)
+
+    def handle_comment(self, data: str) -> None:
+        self._flush_data()
+        self._use_tree()
+
+    def handle_decl(self, decl: str) -> None:
+        self._flush_data()
+        self._use_tree()
+
+    def handle_pi(self, data: str) -> None:
+        self._flush_data()
+        self._use_tree()
+
+    def unknown_decl(self, data: str) -> None:
+        self._flush_data()
+        self._use_tree()
+
+    def _start(self, name: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self._flush_data()
+
+        if not self._stack:
+            offset = self._offset()
+            self._end_item()
+            self._item_start = offset
+            self._item_closed = list(self._already_closed_empty_element.elements())
+
+            if name == "p":
+                self._item_kind = _PARAGRAPH_ITEM
+                self._paragraph = Paragraph(_attr_dict(name, attrs))
+                self._paragraph_open = True
+            else:
+                self._use_tree()
+        elif self._paragraph is not None:
+            self._start_paragraph_tag(name, attrs)
+
+        self._stack.append(name)
+
+    def _start_paragraph_tag(
+        self, name: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        depth = len(self._stack)
+
+        # spans nested in other tags would have to be replaced in place
+        if name not in PARAGRAPH_INLINE_TAGS or (
+            name == "span" and depth > 1 and self._stack[1] != "span"
+        ):
+            self._use_tree()
+            return
+
+        attr_dict = _attr_dict(name, attrs)
+        runs = self._paragraph.runs
+
+        if depth == 1 and name == "span":
+            runs.append(Run(SPAN_RUN, [""], tuple(attr_dict.get("class", ()))))
+            return
+
+        start_tag = format_start_tag(name, attr_dict, name in VOID_ELEMENTS)
+
+        if depth == 1:
+            runs.append(Run(INLINE_RUN, ["", start_tag, ""]))
+        else:
+            runs[-1].pieces += [start_tag, ""]
+
+    def _end_paragraph_tag(self, name: str) -> None:
+        depth = len(self._stack)
+
+        if self._stack[-1] != name:
+            # tags closed out of order, or an end tag with no start tag
+            self._use_tree()
+        elif depth == 1:
+            self._paragraph_open = False
+        elif name not in VOID_ELEMENTS and not (depth == 2 and name == "span"):
+            self._paragraph.runs[-1].pieces += [f"</{name}>", ""]
+
+    def _flush_data(self) -> None:
+        if not self._data:
+            return
+
+        data = "".join(self._data)
+        self._data = []
+
+        if not self._stack:
+            # text between top-level elements is only written if it is not blank
+            if data.strip():
+                self._use_tree()
+            return
+
+        if self._paragraph is None:
+            return
+
+        if not data.strip(ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+
+        runs = self._paragraph.runs
+
+        if len(self._stack) == 1:
+            runs.append(Run(TEXT_RUN, [data]))
+        else:
+            runs[-1].pieces[-1] += data
+
+    def _use_tree(self) -> None:
+        self._item_kind = _TREE_ITEM
+        self._paragraph = None
+
+    def _end_item(self) -> None:
+        if self._item_kind == _PARAGRAPH_ITEM and not self._paragraph_open:
+            self._add_tree(self._item_start)
+            self.items.append(self._paragraph)
+        elif self._item_kind != _BLANK_ITEM and self._tree_start is None:
+            self._tree_start = self._item_start
+            self._tree_closed = self._item_closed
+
+        self._paragraph = None
+
+    def _add_tree(self, end: int) -> None:
+        if self._tree_start is not None:
+            tree_html = self._html[self._tree_start : end]
+
+            if end < len(self._html):
+                # the tree ends right before the next item's start tag
+                tree_html = utils.terminate_reference(tree_html)
+
+            self.items.append((tree_html, self._tree_closed))
+            self._tree_start = None
+
+    def _pop_to(self, name: str) -> None:
+        if name not in self._stack:
+            return
+
+        while self._stack.pop() != name:
+            pass
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
@@ -0,0 +1,212 @@
+import re
+from collections import Counter
+from html.parser import HTMLParser
+from typing import List, Optional, Set, Tuple
+
+from bs4.builder import HTMLParserTreeBuilder
+
+from . import utils
+
+
+class BodyOutline:
+    """
+    Where a document's \\<body> can be split into ranges of top-level elements, found
+    without building a tree, plus what the Google Docs check and style extraction need.
+
+    Attributes:
+        body_classes (Optional[List[str]]): Classes of the first \\<body> tag, or None
+            if the document has no \\<body>.
+        has_c_number_classes (bool): Whether any element has a 'c' + digits class.
+        css_text (Optional[str]): Contents of the first \\<style> tag, if any.
+        content_end (int): Offset where the contents of \\<body> end.
+        range_starts (List[int]): Offsets where each range starts. The first range
+            starts right after the \\<body> start tag and the others start at a
+            top-level start tag.
+        range_closed_empty_elements (List[List[str]]): For each range, the empty
+            elements whose end tags the parser would skip when the range starts.
+        range_class_names (List[Set[str]]): For each range, the classes of the tags
+            in it.
+    """
+
+    __slots__ = (
+        "body_classes",
+        "has_c_number_classes",
+        "css_text",
+        "content_end",
+        "range_starts",
+        "range_closed_empty_elements",
+        "range_class_names",
+    )
+
+    def __init__(self):
+        self.body_classes: Optional[List[str]] = None
+        self.has_c_number_classes = False
+        self.css_text: Optional[str] = None
+        self.content_end = 0
+        self.range_starts: List[int] = []
+        self.range_closed_empty_elements: List[List[str]] = []
+        self.range_class_names: List[Set[str]] = []
+
+    def ranges(self, html: str) -> List[Tuple[str, List[str]]]:
+        """
+        Cuts the contents of \\<body> into its ranges.
+
+        Args:
+            html (str): The document the outline was made from.
+
+        Returns:
+            List[Tuple[str, List[str]]]: The raw HTML of each range with the parser
+            state it starts in, in document order. A range that ends in a character
+            reference without a ';' gets one, as html.parser reads the reference
+            once it reaches the next tag.
+        """
+        ends = self.range_starts[1:] + [self.content_end]
+        ranges = []
+
+        for start, end, closed in zip(
+            self.range_starts, ends, self.range_closed_empty_elements
+        ):
+            range_html = html[start : max(start, end)]
+
+            if end < len(html):
+                # the range ends right before a tag
+                range_html = utils.terminate_reference(range_html)
+
+            ranges.append((range_html, closed))
+
+        return ranges
+
+
+def outline_body(html: str, range_count: int) -> BodyOutline:
+    """
+    Scans a document with the same tokenizer as the 'html.parser' builder, mirroring
+    how BeautifulSoup nests the tags, and splits its \\<body> into ranges.
+
+    Ranges only break before a top-level start tag, so each range parses on its own
+    into exactly the elements it holds in the whole document.
+
+    Args:
+        html (str): The raw HTML string.
+        range_count (int): The number of ranges of similar size to aim for.
+
+    Returns:
+        BodyOutline: The outline of the document.
+    """
+    scanner = _BodyScanner(html, max(1, len(html) // max(1, range_count)))
+    scanner.feed(html)
+    scanner.close()
+
+    outline = scanner.outline
+
+    if scanner.body_depth is not None:
+        # the body was never closed
+        outline.content_end = len(html)
+
+    if scanner.in_first_style:
+        # the style was never closed
+        outline.css_text = "".join(scanner.style_data)
+
+    return outline
+
+
+class _BodyScanner(HTMLParser):
+    """
+    Tracks the stack of open tags the way BeautifulSoup's html.parser builder does,
+    recording where top-level \\<body> elements start.
+    """
+
+    def __init__(self, html: str, range_size: int):
+        # character references are left alone, as the html.parser builder does
+        super().__init__(convert_charrefs=False)
+        self.outline = BodyOutline()
+        self.body_depth: Optional[int] = None
+        self.in_first_style = False
+        self.style_data: List[str] = []
+        self._range_size = range_size
+        self._stack: List[str] = []
+        # a count per name is enough, since only membership is ever checked
+        self._already_closed_empty_element: Counter = Counter()
+        self._line_starts = [0] + [m.end() for m in re.finditer("\n", html)]
+        self._style_seen = False
+
+    def handle_starttag(
+        self, name: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        self._open(name, attrs)
+
+        if name in HTMLParserTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS:
+            self._pop_to(name)
+            self._already_closed_empty_element[name] += 1
+
+    def handle_startendtag(
+        self, name: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        self._open(name, attrs)
+        self.handle_endtag(name)
+
+    def handle_endtag(self, name: str) -> None:
+        if self._already_closed_empty_element[name]:
+            # a redundant end tag for an empty element that was already closed
+            self._already_closed_empty_element[name] -= 1
+            return
+
+        self._pop_to(name)
+
+    def handle_data(self, data: str) -> None:
+        if self.in_first_style:
+            self.style_data.append(data)
+
+    def _open(self, name: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        outline = self.outline
+        # later duplicates of an attribute replace earlier ones
+        class_names = (dict(attrs).get("class") or "").split()
+
+        if not outline.has_c_number_classes:
+            outline.has_c_number_classes = any(
+                utils.is_c_class_name(class_name) for class_name in class_names
+            )
+
+        if self.body_depth is not None and len(self._stack) == self.body_depth + 1:
+            offset = self._offset()
+
+            if offset - outline.range_starts[-1] >= self._range_size:
+                self._start_range(offset)
+
+        if name == "body" and outline.body_classes is None:
+            outline.body_classes = class_names
+            self.body_depth = len(self._stack)
+            self._start_range(self._offset() + len(self.get_starttag_text()))
+        elif name == "style" and not self._style_seen:
+            self._style_seen = True
+            self.in_first_style = True
+
+        if self.body_depth is not None:
+            outline.range_class_names[-1].update(class_names)
+
+        self._stack.append(name)
+
+    def _pop_to(self, name: str) -> None:
+        if name not in self._stack:
+            return
+
+        while self._stack.pop() != name:
+            pass
+
+        if self.in_first_style and "style" not in self._stack:
+            self.in_first_style = False
+            self.outline.css_text = "".join(self.style_data)
+
+        if self.body_depth is not None and len(self._stack) <= self.body_depth:
+            self.outline.content_end = self._offset()
+            self.body_depth = None
+
+    def _start_range(self, offset: int) -> None:
+        self.outline.range_starts.append(offset)
+        self.outline.range_closed_empty_elements.append(
+            list(self._already_closed_empty_element.elements())
+        )
+        self.outline.range_class_names.append(set())
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
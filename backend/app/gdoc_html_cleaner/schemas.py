@@ -1,11 +1,30 @@
 from marshmallow import Schema, fields
+from marshmallow.validate import Length
 
 from ..commons.utils import not_empty_string
+from .constants import BATCH_MAX_FILES
 
 
 class CleanHTMLSchema(Schema):
     html = fields.String(required=True, validate=not_empty_string("HTML"))
+    compact = fields.Boolean(load_default=False)
+    incremental = fields.Boolean(load_default=False)
 
 
 class CleanHTMLFileSchema(Schema):
     file = fields.Field(required=True)
+    compact = fields.Boolean(load_default=False)
+    incremental = fields.Boolean(load_default=False)
+
+
+class CleanHTMLBatchSchema(Schema):
+    files = fields.List(
+        fields.Field(),
+        required=True,
+        validate=Length(
+            min=1,
+            max=BATCH_MAX_FILES,
+            error=f"Upload between 1 and {BATCH_MAX_FILES} files.",
+        ),
+    )
+    compact = fields.Boolean(load_default=False)
@@ -0,0 +1,259 @@
+import html
+from io import StringIO
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from bs4 import NavigableString, PageElement, Tag
+from bs4.element import PreformattedString
+
+from .constants import CDATA_CONTAINING_TAGS, INDENT, PRESERVE_WHITESPACE_TAGS
+
+
+def serialize_body(body: Tag, compact: bool = False) -> str:
+    """
+    Serializes the contents of a cleaned \\<body> tag into an unescaped HTML string.
+
+    Args:
+        body (Tag): The cleaned \\<body> tag.
+        compact (bool): Whether to use the compact AO3-paste format instead of the
+            prettified format.
+
+    Returns:
+        str: Unescaped HTML string from within \\<body>.
+    """
+    out = StringIO()
+    write_body(body, out, compact)
+    return out.getvalue()
+
+
+def write_body(body: Tag, out: TextIO, compact: bool = False) -> None:
+    """
+    Writes the contents of a cleaned \\<body> tag to an output buffer in a single pass.
+
+    The prettified format puts every tag and text node outside of paragraphs on its
+    own line, indented by one space per level, and writes \\<p> tags on a single
+    line. The compact format writes each top-level element on its own line with its
+    contents as they are, which is what AO3 expects when pasting HTML.
+
+    Text and attribute values are written unescaped.
+
+    Args:
+        body (Tag): The cleaned \\<body> tag.
+        out (TextIO): The buffer to write the HTML to.
+        compact (bool): Whether to use the compact AO3-paste format instead of the
+            prettified format.
+    """
+    write_body_elements(body.contents, out, compact)
+
+
+def write_body_elements(
+    elements: List[PageElement], out: TextIO, compact: bool = False
+) -> None:
+    """
+    Writes a run of cleaned top-level \\<body> children to an output buffer.
+
+    Writing a document's top-level children in several runs gives the same output as
+    `write_body`, as long as no run ends with a text node that the next run continues.
+
+    Args:
+        elements (List[PageElement]): Consecutive children of the \\<body> tag.
+        out (TextIO): The buffer to write the HTML to.
+        compact (bool): Whether to use the compact AO3-paste format instead of the
+            prettified format.
+    """
+    if compact:
+        for text, element in _group_strings(elements):
+            if text is not None:
+                text = text.strip()
+                if text:
+                    out.write(text)
+                    out.write("\n")
+            else:
+                _write_verbatim(element, out)
+                out.write("\n")
+    else:
+        _write_pretty_contents(elements, out, 0)
+
+
+def _write_pretty_contents(
+    contents: List[PageElement], out: TextIO, level: int
+) -> None:
+    """
+    Writes the children of a tag in the prettified format.
+
+    Args:
+        contents (List[PageElement]): The children to write.
+        out (TextIO): The buffer to write the HTML to.
+        level (int): The indentation level of the children.
+    """
+    indent = INDENT * level
+
+    for text, element in _group_strings(contents):
+        if text is not None:
+            text = text.strip()
+            if text:
+                out.write(indent + text + "\n")
+        elif element.can_be_empty_element:
+            # its children, if any, were written as its siblings
+            out.write(indent + _format_start_tag(element) + "\n")
+        elif element.name in PRESERVE_WHITESPACE_TAGS:
+            out.write(indent)
+            _write_verbatim(element, out)
+            out.write("\n")
+        else:
+            out.write(indent + _format_start_tag(element) + "\n")
+            _write_pretty_contents(element.contents, out, level + 1)
+            out.write(indent + "</" + element.name + ">\n")
+
+
+def _group_strings(
+    contents: List[PageElement],
+) -> Iterator[Tuple[Optional[str], Optional[Tag]]]:
+    """
+    Pairs up the children of a tag for pretty printing, merging consecutive text nodes.
+
+    The children of void elements are paired up as their siblings (see
+    `_lift_void_children`).
+
+    Args:
+        contents (List[PageElement]): The children of a tag.
+
+    Yields:
+        Tuple: (text, None) for a run of text nodes, or (None, tag) for a tag.
+    """
+    pieces = []
+
+    for child in _lift_void_children(contents):
+        if isinstance(child, Tag):
+            if pieces:
+                yield "".join(pieces), None
+                pieces = []
+            yield None, child
+        elif isinstance(child, PreformattedString):
+            if pieces:
+                yield "".join(pieces), None
+                pieces = []
+            yield _format_string(child), None
+        else:
+            pieces.append(_format_string(child))
+
+    if pieces:
+        yield "".join(pieces), None
+
+
+def _lift_void_children(contents: List[PageElement]) -> Iterator[PageElement]:
+    """
+    Lists the children of a tag with the children of any void element among them
+    right after it, as its siblings.
+
+    html.parser leaves a \<br> open when a \<br/> follows an earlier \<br>, so the
+    text after it becomes its children. Void elements cannot hold anything, and
+    reading the output again puts the children next to the tag.
+
+    Args:
+        contents (List[PageElement]): The children of a tag.
+
+    Yields:
+        PageElement: The children, in the order they are written.
+    """
+    for child in contents:
+        yield child
+
+        if isinstance(child, Tag) and child.can_be_empty_element and child.contents:
+            yield from _lift_void_children(child.contents)
+
+
+def _write_verbatim(element: PageElement, out: TextIO) -> None:
+    """
+    Writes an element and everything inside it without any added whitespace.
+
+    The children of a void element are written after it, as its siblings.
+
+    Args:
+        element (PageElement): The tag or text node to write.
+        out (TextIO): The buffer to write the HTML to.
+    """
+    if not isinstance(element, Tag):
+        out.write(_format_string(element))
+        return
+
+    out.write(_format_start_tag(element))
+
+    if element.can_be_empty_element:
+        for child in element.contents:
+            _write_verbatim(child, out)
+
+        return
+
+    for child in element.contents:
+        _write_verbatim(child, out)
+
+    out.write("</" + element.name + ">")
+
+
+def _format_start_tag(tag: Tag) -> str:
+    """
+    Formats the opening tag of an element with its attributes sorted by name.
+
+    Args:
+        tag (Tag): The tag to format.
+
+    Returns:
+        str: The opening tag, ending in "/>" for void elements.
+    """
+    return format_start_tag(tag.name, tag.attrs, tag.can_be_empty_element)
+
+
+def format_start_tag(name: str, attrs: Dict[str, Any], is_empty: bool) -> str:
+    """
+    Formats an opening tag the way the serializer writes a tree's tags, for markup
+    that was never built into a tree.
+
+    html.parser decodes the character references in attribute values but not in
+    attribute names, so names are decoded here, and both are written unescaped.
+
+    Args:
+        name (str): The tag name.
+        attrs (Dict[str, Any]): The attribute values, as strings or lists of strings
+            for attributes with several values (e.g., 'class').
+        is_empty (bool): Whether the tag is a void element with no contents.
+
+    Returns:
+        str: The opening tag, ending in "/>" if it is empty.
+    """
+    parts = ["<", name]
+
+    for key, value in sorted(attrs.items()):
+        key = html.unescape(key)
+
+        if value is None:
+            parts.append(" " + key)
+            continue
+
+        if isinstance(value, (list, tuple)):
+            value = " ".join(value)
+
+        value = str(value)
+        # single quotes are only used when they are not needed inside the value
+        quote = "'" if '"' in value and "'" not in value else '"'
+        parts.append(f" {key}={quote}{value}{quote}")
+
+    parts.append("/>" if is_empty else ">")
+    return "".join(parts)
+
+
+def _format_string(string: NavigableString) -> str:
+    """
+    Formats a text node as unescaped text.
+
+    Args:
+        string (NavigableString): The text node to format.
+
+    Returns:
+        str: The text, including the markup around comments and similar nodes.
+    """
+    if type(string) is NavigableString and (
+        string.parent is None or string.parent.name not in CDATA_CONTAINING_TAGS
+    ):
+        return str(string)
+
+    return html.unescape(string.output_ready())
@@ -1,33 +1,511 @@
-import html
+import hashlib
+import json
 import os
-from typing import Dict, List, Optional, Tuple
+import posixpath
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from functools import partial
+from io import StringIO
+from itertools import repeat
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
 
 import cssutils
-from bs4 import BeautifulSoup, NavigableString
+from bs4 import BeautifulSoup, NavigableString, PageElement, Tag
 from werkzeug.datastructures import FileStorage
 
 from . import utils
-from .constants import SEMANTIC_TAGS
-from .exceptions import InvalidGoogleDocsHTML
+from .constants import (
+    BATCH_FILES_PER_WORKER,
+    BATCH_MANIFEST_NAME,
+    BATCH_MAX_FILES,
+    BATCH_MAX_UNZIPPED_SIZE,
+    BATCH_PARALLEL_MIN_SIZE,
+    CLEANED_FILE_SUFFIX,
+    DEFAULT_PARSER,
+    HTML_FILE_EXTENSIONS,
+    INCREMENTAL_FINGERPRINT_VERSION,
+    PARALLEL_MIN_SIZE,
+    PARALLEL_RANGES_PER_WORKER,
+    PARSED_TREE_BYTES_PER_CHAR,
+    SEMANTIC_TAGS,
+    ZIP_MAX_MEMBER_SIZE,
+)
+from .exceptions import InvalidGoogleDocsHTML, UnsupportedStylesheet
+from .paragraphs import Paragraph, clean_paragraph, read_body_range
+from .parallel import outline_body
+from .serializer import serialize_body, write_body_elements
+from .streaming import StreamingDocument
+from .stylesheet import (
+    ClassStyleTable,
+    build_class_style_table,
+    extract_class_styles,
+)
+
+from ..commons.cache import ResultCache
+from ..commons.exceptions import InvalidHTMLFile
+from ..commons.executors import get_executor
+from ..commons.profiling import DISABLED_PROFILE, Profile
+from ..commons.utils import (
+    is_zip_file,
+    iter_uploaded_html_file,
+    read_uploaded_html_file,
+)
+from ..commons.zip_stream import ZipStream
+
+
+def clean_html_from_file(
+    file: FileStorage,
+    compact: bool = False,
+    parser: Optional[str] = None,
+    streaming: bool = False,
+    workers: int = 1,
+    profile: Profile = DISABLED_PROFILE,
+) -> str:
+    """
+    Cleans an uploaded HTML file exported from Google Docs.
 
-from ..commons.utils import read_uploaded_html_file
+    Google Docs' "Web page (.html, zipped)" download can be uploaded as is: the HTML
+    file is read straight out of the zip and the images next to it are skipped.
 
+    Args:
+        file (FileStorage): The uploaded HTML file, or a zip holding it.
+        compact (bool): Whether to return the compact AO3-paste format instead of
+            prettified HTML.
+        parser (Optional[str]): The parser backend to use (see `utils.resolve_parser`).
+            Ignored when streaming.
+        streaming (bool): Whether to clean the file while reading it in chunks (see
+            `clean_html_stream`) instead of reading it whole first.
+        workers (int): The number of processes to clean large files with when not
+            streaming (see `clean_html`).
+        profile (Profile): Records what each stage of the clean costs.
 
-def clean_html_from_file(file: FileStorage) -> str:
+    Returns:
+        str: Cleaned and simplified HTML string.
+
+    Raises:
+        InvalidHTMLFile: If the file, or the zip holding it, cannot be read.
     """
-    Cleans an uploaded HTML file exported from Google Docs.
+    if is_zip_file(file):
+        return _clean_zipped_html_file(
+            file, compact, parser, streaming, workers, profile
+        )
+
+    return _clean_html_file(file, compact, parser, streaming, workers, profile)
+
+
+def _clean_html_file(
+    file: FileStorage,
+    compact: bool,
+    parser: Optional[str],
+    streaming: bool,
+    workers: int,
+    profile: Profile,
+) -> str:
+    """
+    Cleans an HTML file, reading it whole or in chunks (see `clean_html_from_file`).
+    """
+    if streaming:
+        out = StringIO()
+
+        # reading and cleaning are interleaved, so they are timed as one stage
+        with profile.stage("clean_html_stream"):
+            clean_html_stream(iter_uploaded_html_file(file), out, compact, profile)
+
+        return out.getvalue()
+
+    with profile.stage("read_file"):
+        html = read_uploaded_html_file(file)
+
+    return clean_html(html, compact, parser, workers, profile)
+
+
+def _clean_zipped_html_file(
+    file: FileStorage,
+    compact: bool,
+    parser: Optional[str],
+    streaming: bool,
+    workers: int,
+    profile: Profile,
+) -> str:
+    """
+    Cleans the HTML file inside an uploaded zip, decompressing it from the upload
+    without writing it to disk.
 
     Args:
-        file (FileStorage): The uploaded HTML file.
+        file (FileStorage): The uploaded zip.
+        compact (bool): Whether to return the compact AO3-paste format.
+        parser (Optional[str]): The parser backend to use.
+        streaming (bool): Whether to clean the HTML while decompressing it.
+        workers (int): The number of processes to clean large files with.
+        profile (Profile): Records what each stage of the clean costs.
 
     Returns:
         str: Cleaned and simplified HTML string.
+
+    Raises:
+        InvalidHTMLFile: If the zip cannot be read or holds no HTML file.
+    """
+    with _open_uploaded_zip(file) as archive, _open_html_member(archive) as member:
+        html_file = FileStorage(member, member.name)
+        return _clean_html_file(html_file, compact, parser, streaming, workers, profile)
+
+
+def read_html_from_file(file: FileStorage) -> str:
+    """
+    Reads the whole HTML of an uploaded HTML file, or of the HTML file inside an
+    uploaded zip (see `clean_html_from_file`).
+
+    Args:
+        file (FileStorage): The uploaded HTML file, or a zip holding it.
+
+    Returns:
+        str: The HTML.
+
+    Raises:
+        InvalidHTMLFile: If the file, or the zip holding it, cannot be read.
+    """
+    if not is_zip_file(file):
+        return read_uploaded_html_file(file)
+
+    with _open_uploaded_zip(file) as archive, _open_html_member(archive) as member:
+        return read_uploaded_html_file(FileStorage(member, member.name))
+
+
+def _open_uploaded_zip(file: FileStorage) -> zipfile.ZipFile:
+    """
+    Opens an uploaded zip for reading straight from the upload stream.
+
+    Raises:
+        InvalidHTMLFile: If the zip cannot be read.
+    """
+    try:
+        return zipfile.ZipFile(file.stream)
+    except zipfile.BadZipFile:
+        raise InvalidHTMLFile("Unable to read the uploaded zip file.")
+
+
+def _open_html_member(archive: zipfile.ZipFile) -> IO[bytes]:
+    """
+    Opens the first HTML file in a zip, leaving its other files compressed.
+
+    Raises:
+        InvalidHTMLFile: If the zip holds no HTML file, or it cannot be read.
+    """
+    member = next(filter(_is_html_member, archive.infolist()), None)
+
+    if member is None:
+        raise InvalidHTMLFile("The uploaded zip file has no HTML file in it.")
+
+    # the member is never decompressed past its recorded size
+    if member.file_size > ZIP_MAX_MEMBER_SIZE:
+        raise InvalidHTMLFile("The file is too large to clean.")
+
+    try:
+        return archive.open(member)
+    except Exception:
+        raise InvalidHTMLFile("Unable to read the file from the uploaded zip.")
+
+
+def clean_html_batch(
+    files: List[FileStorage],
+    compact: bool = False,
+    parser: Optional[str] = None,
+    workers: int = 1,
+) -> Iterator[bytes]:
+    """
+    Cleans a batch of uploaded HTML files concurrently in a pool of processes.
+
+    Uploaded zips are opened and the HTML files inside them are cleaned as part of
+    the batch. The result is a zip holding a cleaned file per input that succeeded,
+    added as each one finishes, and a manifest listing every input with the name of
+    its cleaned file or the reason it failed. One file failing does not fail the
+    batch.
+
+    The uploads are read before this returns, so the returned iterator does not need
+    the request to still be open. Files past BATCH_MAX_FILES, counted from each zip's
+    directory, are reported without being read, and a batch's zips are not
+    decompressed past BATCH_MAX_UNZIPPED_SIZE in all. Each worker is given
+    BATCH_FILES_PER_WORKER files at a time, the rest waiting until one finishes.
+    Batches of less than BATCH_PARALLEL_MIN_SIZE characters of HTML in all, and any
+    batch when `workers` is 1, are cleaned one file at a time in this process as the
+    archive is read.
+
+    Args:
+        files (List[FileStorage]): The uploaded HTML and zip files.
+        compact (bool): Whether to return the compact AO3-paste format instead of
+            prettified HTML.
+        parser (Optional[str]): The parser backend to use (see `utils.resolve_parser`).
+        workers (int): The number of worker processes.
+
+    Returns:
+        Iterator[bytes]: The zip archive, in chunks, as the files finish.
+    """
+    manifest: List[Dict[str, Any]] = []
+    output_names = set()
+    jobs: "deque[Tuple[str, Dict[str, Any], str]]" = deque()
+
+    for source, html, error in _read_batch_sources(files):
+        entry = {"source": source, "output": None, "error": error}
+        manifest.append(entry)
+
+        if error is None:
+            jobs.append((html, entry, _unique_output_name(source, output_names)))
+
+    clean = partial(clean_html, compact=compact, parser=parser)
+    executor = None
+
+    if workers > 1 and sum(len(html) for html, _, _ in jobs) >= BATCH_PARALLEL_MIN_SIZE:
+        executor = get_executor(workers)
+
+    return _stream_batch_results(
+        executor, clean, jobs, manifest, workers * BATCH_FILES_PER_WORKER
+    )
+
+
+def _read_batch_sources(
+    files: List[FileStorage],
+) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Reads the HTML of every file in a batch, looking inside uploaded zips.
+
+    Only the HTML files of a zip are decompressed, so images and other members are
+    skipped without being read. Inputs past BATCH_MAX_FILES are not read at all, and
+    zip members are not decompressed once BATCH_MAX_UNZIPPED_SIZE bytes have been.
+
+    Args:
+        files (List[FileStorage]): The uploaded HTML and zip files.
+
+    Yields:
+        Tuple: (source name, HTML or None, error message or None) for each input.
+    """
+    too_many = f"Only {BATCH_MAX_FILES} files can be cleaned at once."
+    count = 0
+    unzipped_size = 0
+
+    for file in files:
+        name = file.filename or "document.html"
+
+        if not is_zip_file(file):
+            count += 1
+
+            if count > BATCH_MAX_FILES:
+                yield name, None, too_many
+                continue
+
+            try:
+                yield name, read_uploaded_html_file(file), None
+            except InvalidHTMLFile as err:
+                yield name, None, str(err)
+            continue
+
+        try:
+            archive = zipfile.ZipFile(file.stream)
+        except zipfile.BadZipFile:
+            yield name, None, "Unable to read the uploaded zip file."
+            continue
+
+        with archive:
+            # the directory lists every member, so none is read to count them
+            members = [m for m in archive.infolist() if _is_html_member(m)]
+
+            for member in members:
+                source = f"{name}/{member.filename}"
+                count += 1
+
+                if count > BATCH_MAX_FILES:
+                    yield source, None, too_many
+                    continue
+
+                limit = min(
+                    ZIP_MAX_MEMBER_SIZE, BATCH_MAX_UNZIPPED_SIZE - unzipped_size
+                )
+                data, error = _read_zip_member(archive, member, limit)
+
+                if data is None:
+                    yield source, None, error
+                    continue
+
+                unzipped_size += len(data)
+
+                try:
+                    yield source, data.decode("utf-8"), None
+                except UnicodeDecodeError:
+                    yield (
+                        source,
+                        None,
+                        (
+                            "Unable to read the uploaded file. "
+                            "Please check that it's a valid HTML file."
+                        ),
+                    )
+
+
+def _is_html_member(member: zipfile.ZipInfo) -> bool:
+    """
+    Checks whether a zip member is an HTML file, ignoring folders and macOS metadata.
+
+    Args:
+        member (zipfile.ZipInfo): The zip member.
+
+    Returns:
+        bool: True if the member should be cleaned, False otherwise.
+    """
+    return (
+        not member.is_dir()
+        and member.filename.lower().endswith(HTML_FILE_EXTENSIONS)
+        and not member.filename.startswith("__MACOSX/")
+    )
+
+
+def _read_zip_member(
+    archive: zipfile.ZipFile, member: zipfile.ZipInfo, limit: int
+) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Reads an HTML file from a zip, decompressing no more than a limit.
+
+    Args:
+        archive (zipfile.ZipFile): The open zip.
+        member (zipfile.ZipInfo): The HTML file to read.
+        limit (int): The most bytes to decompress; the file is refused past it.
+
+    Returns:
+        Tuple: (data, None) if the file was read, or (None, error message) if not.
+    """
+    too_large = (
+        "The file is too large to clean."
+        if limit >= ZIP_MAX_MEMBER_SIZE
+        else "The zipped files are too large to clean in one batch."
+    )
+
+    # the recorded size can be wrong, so the read is limited as well
+    if member.file_size > limit:
+        return None, too_large
+
+    try:
+        with archive.open(member) as member_file:
+            data = member_file.read(limit + 1)
+    except Exception:
+        return None, "Unable to read the file from the uploaded zip."
+
+    if len(data) > limit:
+        return None, too_large
+
+    return data, None
+
+
+def _unique_output_name(source: str, used: set) -> str:
+    """
+    Names the cleaned file for an input, numbering names that are already taken.
+
+    Args:
+        source (str): The input's name, possibly a path inside a zip.
+        used (set): Names already given out; the new name is added to it.
+
+    Returns:
+        str: The cleaned file's name (e.g., "chapter1_cleaned.html").
+    """
+    stem = posixpath.splitext(posixpath.basename(source))[0] or "document"
+    output_name = stem + CLEANED_FILE_SUFFIX
+    count = 1
+
+    while output_name in used:
+        count += 1
+        output_name = f"{stem}_{count}{CLEANED_FILE_SUFFIX}"
+
+    used.add(output_name)
+    return output_name
+
+
+def _stream_batch_results(
+    executor: Optional[Executor],
+    clean: Callable[[str], str],
+    jobs: "deque[Tuple[str, Dict[str, Any], str]]",
+    manifest: List[Dict[str, Any]],
+    max_in_flight: int,
+) -> Iterator[bytes]:
     """
-    html = read_uploaded_html_file(file)
-    return clean_html(html)
+    Cleans a batch's files in a pool, submitting one whenever another finishes so no
+    more than `max_in_flight` are queued, and writes the cleaned files into a zip as
+    they finish, then adds the manifest.
 
+    Jobs that have not started are cancelled if the response is abandoned.
 
-def clean_html(html_str: str) -> str:
+    Args:
+        executor (Optional[Executor]): The pool to clean the files in, or None to
+            clean them one at a time in this process.
+        clean (Callable[[str], str]): Cleans the HTML of a file.
+        jobs (deque): The HTML, manifest entry and output name of each file to
+            clean, removed as they are submitted.
+        manifest (list): The manifest entries of every input, in upload order.
+        max_in_flight (int): The most files submitted and not yet written.
+
+    Yields:
+        bytes: The zip archive, in chunks.
+    """
+    archive = ZipStream()
+    futures: Dict[Future, Tuple[Dict[str, Any], str]] = {}
+
+    try:
+        while jobs or futures:
+            # the manifest entry, output name and a call that returns the cleaned HTML
+            # of each file that is ready to be written
+            finished: List[Tuple[Dict[str, Any], str, Callable[[], str]]] = []
+
+            if executor is None:
+                html, entry, output_name = jobs.popleft()
+                finished.append((entry, output_name, partial(clean, html)))
+            else:
+                while jobs and len(futures) < max_in_flight:
+                    html, entry, output_name = jobs.popleft()
+                    futures[executor.submit(clean, html)] = (entry, output_name)
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    finished.append((*futures.pop(future), future.result))
+
+            for entry, output_name, result in finished:
+                try:
+                    cleaned_html = result()
+                except InvalidGoogleDocsHTML as err:
+                    entry["error"] = str(err)
+                    continue
+                except Exception:
+                    entry["error"] = "Internal server error"
+                    continue
+
+                entry["output"] = output_name
+                yield archive.add(output_name, cleaned_html)
+
+        yield archive.add(
+            BATCH_MANIFEST_NAME, json.dumps({"files": manifest}, indent=2)
+        )
+        yield archive.close()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def clean_html(
+    html_str: str,
+    compact: bool = False,
+    parser: Optional[str] = None,
+    workers: int = 1,
+    profile: Profile = DISABLED_PROFILE,
+) -> str:
     """
     Cleans HTML content exported from Google Docs and returns simplified AO3-compatible HTML.
 
@@ -36,38 +514,507 @@ def clean_html(html_str: str) -> str:
 
     Args:
         html_str (str): The raw HTML string.
+        compact (bool): Whether to return the compact AO3-paste format instead of
+            prettified HTML.
+        parser (Optional[str]): The parser backend to use (see `utils.resolve_parser`).
+            Defaults to the pure-Python 'html.parser' builder, with which top-level
+            paragraphs are cleaned without building a tree (see
+            `clean_html_paragraphs`).
+        workers (int): The number of processes to clean documents of at least
+            PARALLEL_MIN_SIZE characters with (see `clean_html_parallel`). Smaller
+            documents, and any document when this is 1, are cleaned in this process.
+        profile (Profile): Records what each stage of the clean costs.
 
     Returns:
         str: A cleaned and simplified HTML string.
 
     Raises:
         InvalidGoogleDocsHTML: If the content is not recognized as Google Docs HTML.
+        MemoryBudgetExceeded: If the clean needs more memory than the profile's budget.
+        MemoryLimitReached: If the process is over the profile's memory limit.
     """
-    if not utils.is_gdoc_html(html_str):
+    if workers > 1 and len(html_str) >= PARALLEL_MIN_SIZE:
+        return clean_html_parallel(html_str, compact, workers, profile)
+
+    parser = utils.resolve_parser(parser)
+
+    if parser == DEFAULT_PARSER:
+        return clean_html_paragraphs(html_str, compact, profile)
+
+    # the tree is built in one call, so a document too large for the budget is
+    # refused before parsing rather than after
+    profile.check_memory(len(html_str) * PARSED_TREE_BYTES_PER_CHAR)
+
+    with profile.stage("parse") as stage:
+        soup = BeautifulSoup(html_str, parser)
+
+    if profile.enabled:
+        stage.nodes = _count_nodes(soup)
+
+    with profile.stage("is_gdoc_soup"):
+        is_gdoc = utils.is_gdoc_soup(soup)
+
+    if not is_gdoc:
         raise InvalidGoogleDocsHTML("This HTML is not exported from Google Docs")
 
-    soup = BeautifulSoup(html_str, "html.parser")
-    class_align_map, class_style_map = extract_styles(soup)
-    soup = apply_transformations(soup, class_align_map, class_style_map)
-    return get_cleaned_body_html(soup)
+    with profile.stage("extract_styles") as stage:
+        class_styles = extract_styles(soup)
 
+    stage.nodes = len(class_styles.flags)
 
-def extract_styles(
-    soup: BeautifulSoup,
-) -> Tuple[Dict[str, Optional[str]], Dict[str, Dict[str, Optional[str]]]]:
+    soup = apply_transformations(soup, class_styles, profile)
+
+    with profile.stage("get_cleaned_body_html") as stage:
+        cleaned_html = get_cleaned_body_html(soup, compact)
+
+    if profile.enabled:
+        stage.nodes = _count_nodes(soup.find("body"))
+
+    return cleaned_html
+
+
+def _count_nodes(element: Optional[Tag]) -> int:
+    """
+    Counts the tags and strings nested in an element, for profiling.
+
+    Args:
+        element (Optional[Tag]): The element, if there is one.
+
+    Returns:
+        int: The number of descendants.
+    """
+    return sum(1 for _ in element.descendants) if element is not None else 0
+
+
+def clean_html_paragraphs(
+    html_str: str,
+    compact: bool = False,
+    profile: Profile = DISABLED_PROFILE,
+) -> str:
+    """
+    Cleans HTML exported from Google Docs, reading top-level \\<p> tags as flat lists
+    of text runs instead of building a tree for the whole document.
+
+    Paragraphs are cleaned and written straight from their runs (see `paragraphs`),
+    and only the other top-level elements, such as tables and lists, are parsed into
+    a tree. The output is the same as `clean_html` gives with the 'html.parser'
+    backend.
+
+    Args:
+        html_str (str): The raw HTML string.
+        compact (bool): Whether to return the compact AO3-paste format instead of
+            prettified HTML.
+        profile (Profile): Records what each stage of the clean costs.
+
+    Returns:
+        str: A cleaned and simplified HTML string.
+
+    Raises:
+        InvalidGoogleDocsHTML: If the content is not recognized as Google Docs HTML.
+    """
+    with profile.stage("outline_body"):
+        outline = outline_body(html_str, 1)
+
+    if not (
+        outline.body_classes
+        and "doc-content" in outline.body_classes
+        and outline.has_c_number_classes
+    ):
+        raise InvalidGoogleDocsHTML("This HTML is not exported from Google Docs")
+
+    with profile.stage("extract_styles") as stage:
+        class_styles = extract_styles_from_css(outline.css_text or "")
+
+    stage.nodes = len(class_styles.flags)
+
+    with profile.stage("clean_ranges") as stage:
+        cleaned_html = "".join(
+            _clean_body_range(range_html, closed, class_styles, compact)
+            for range_html, closed in outline.ranges(html_str)
+        )
+
+    stage.nodes = len(outline.range_starts)
+    return cleaned_html
+
+
+def clean_html_parallel(
+    html_str: str,
+    compact: bool = False,
+    workers: int = 2,
+    profile: Profile = DISABLED_PROFILE,
+) -> str:
+    """
+    Cleans HTML exported from Google Docs by splitting \\<body> into ranges of
+    paragraphs and cleaning the ranges in a pool of processes.
+
+    The document is scanned once to find where its top-level elements start and to
+    read its stylesheet, so the styles are only extracted once. Each range is then
+    parsed and cleaned on its own, and the results are joined in document order. The
+    output is the same as `clean_html` gives with the 'html.parser' backend, which is
+    the only one used here.
+
+    Args:
+        html_str (str): The raw HTML string.
+        compact (bool): Whether to return the compact AO3-paste format instead of
+            prettified HTML.
+        workers (int): The number of worker processes.
+        profile (Profile): Records what each stage of the clean costs. The stages
+            run in the worker processes are timed together as "clean_ranges".
+
+    Returns:
+        str: A cleaned and simplified HTML string.
+
+    Raises:
+        InvalidGoogleDocsHTML: If the content is not recognized as Google Docs HTML.
+    """
+    with profile.stage("outline_body") as stage:
+        outline = outline_body(html_str, workers * PARALLEL_RANGES_PER_WORKER)
+
+    stage.nodes = len(outline.range_starts)
+
+    if not (
+        outline.body_classes
+        and "doc-content" in outline.body_classes
+        and outline.has_c_number_classes
+    ):
+        raise InvalidGoogleDocsHTML("This HTML is not exported from Google Docs")
+
+    with profile.stage("extract_styles") as stage:
+        class_styles = extract_styles_from_css(outline.css_text or "")
+
+    stage.nodes = len(class_styles.flags)
+
+    with profile.stage("clean_ranges") as stage:
+        ranges = outline.ranges(html_str)
+        results = get_executor(workers).map(
+            _clean_body_range,
+            [range_html for range_html, _ in ranges],
+            [closed for _, closed in ranges],
+            repeat(class_styles),
+            repeat(compact),
+        )
+        cleaned_html = "".join(results)
+
+    stage.nodes = len(ranges)
+    return cleaned_html
+
+
+def clean_html_incremental(
+    html_str: str,
+    cache: ResultCache,
+    compact: bool = False,
+    profile: Profile = DISABLED_PROFILE,
+) -> Tuple[str, int]:
+    """
+    Cleans HTML exported from Google Docs, reusing the cleaned output of top-level
+    \\<body> elements that were already cleaned in an earlier document.
+
+    Each top-level element is fingerprinted from its raw HTML, the parser state it
+    starts in and the resolved styles of the classes it uses, so an element is only
+    reused when cleaning it again would give the same output. Only new or changed
+    elements are parsed and cleaned. The output is the same as `clean_html` gives
+    with the 'html.parser' backend, which is the only one used here.
+
+    Args:
+        html_str (str): The raw HTML string.
+        cache (ResultCache): Maps element fingerprints to their cleaned HTML. It is
+            shared by every document cleaned with it.
+        compact (bool): Whether to return the compact AO3-paste format instead of
+            prettified HTML.
+        profile (Profile): Records what each stage of the clean costs.
+
+    Returns:
+        Tuple[str, int]: The cleaned HTML and the number of elements that were reused.
+
+    Raises:
+        InvalidGoogleDocsHTML: If the content is not recognized as Google Docs HTML.
+    """
+    with profile.stage("outline_body") as stage:
+        # a range per top-level element
+        outline = outline_body(html_str, len(html_str))
+
+    stage.nodes = len(outline.range_starts)
+
+    if not (
+        outline.body_classes
+        and "doc-content" in outline.body_classes
+        and outline.has_c_number_classes
+    ):
+        raise InvalidGoogleDocsHTML("This HTML is not exported from Google Docs")
+
+    with profile.stage("extract_styles") as stage:
+        class_styles = extract_styles_from_css(outline.css_text or "")
+
+    stage.nodes = len(class_styles.flags)
+    results = []
+    reused = 0
+    # timed so memory is sampled as the ranges are cleaned
+    clean_range = profile.timed("clean_ranges.clean_body_range", _clean_body_range)
+
+    with profile.stage("clean_ranges") as stage:
+        for (range_html, closed), class_names in zip(
+            outline.ranges(html_str), outline.range_class_names
+        ):
+            key = _fingerprint_range(
+                range_html, closed, class_names, class_styles, compact
+            )
+            cached = cache.get(key)
+
+            if cached is not None:
+                results.append(cached["html"])
+                reused += 1
+                continue
+
+            cleaned_html = clean_range(range_html, closed, class_styles, compact)
+            cache.set(key, {"html": cleaned_html})
+            results.append(cleaned_html)
+
+    # only the ranges that were not reused are counted
+    stage.nodes = len(results) - reused
+    return "".join(results), reused
+
+
+def _fingerprint_range(
+    range_html: str,
+    closed_empty_elements: List[str],
+    class_names: Set[str],
+    class_styles: ClassStyleTable,
+    compact: bool,
+) -> str:
+    """
+    Fingerprints everything the cleaned output of a range of \\<body> depends on.
+
+    The fingerprint includes INCREMENTAL_FINGERPRINT_VERSION, so ranges cleaned by a
+    version of the cleaner that wrote them differently are not reused.
+
+    Args:
+        range_html (str): The raw HTML of the range.
+        closed_empty_elements (List[str]): Parser state the range starts in.
+        class_names (Set[str]): The classes of the tags in the range.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+        compact (bool): Whether the output is in the compact AO3-paste format.
+
+    Returns:
+        str: The SHA-256 hex digest of the version, the range and its styles.
+    """
+    styles = [
+        (class_name, *class_styles.resolve(class_name))
+        for class_name in sorted(class_names)
+    ]
+    digest = hashlib.sha256(f"{INCREMENTAL_FINGERPRINT_VERSION}\0".encode("utf-8"))
+    digest.update(range_html.encode("utf-8"))
+    digest.update(f"\0{closed_empty_elements}\0{styles}\0{compact}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _clean_body_range(
+    range_html: str,
+    closed_empty_elements: List[str],
+    class_styles: ClassStyleTable,
+    compact: bool,
+) -> str:
+    """
+    Cleans one range of top-level \\<body> elements, in this process or a worker.
+
+    Top-level paragraphs are read as paragraph runs and cleaned without building a
+    tree (see `paragraphs`), and the elements in between are parsed and cleaned as
+    a tree. Both give the same output.
+
+    Args:
+        range_html (str): The raw HTML of the range.
+        closed_empty_elements (List[str]): Parser state the range starts in (see
+            `parallel.BodyOutline`).
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+        compact (bool): Whether to use the compact AO3-paste format.
+
+    Returns:
+        str: The cleaned HTML of the range.
+    """
+    out = StringIO()
+
+    for item in read_body_range(range_html, closed_empty_elements):
+        if isinstance(item, Paragraph):
+            # a top-level <p> is written on its own line in both formats
+            out.write(clean_paragraph(item, class_styles))
+            out.write("\n")
+        else:
+            _clean_body_range_as_tree(*item, class_styles, compact, out)
+
+    return out.getvalue()
+
+
+def _clean_body_range_as_tree(
+    range_html: str,
+    closed_empty_elements: List[str],
+    class_styles: ClassStyleTable,
+    compact: bool,
+    out: TextIO,
+) -> None:
+    """
+    Parses a range of top-level \\<body> elements into a tree, cleans it and writes
+    it to the output.
+
+    Args:
+        range_html (str): The raw HTML of the range.
+        closed_empty_elements (List[str]): Parser state the range starts in.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+        compact (bool): Whether to use the compact AO3-paste format.
+        out (TextIO): The buffer to write the cleaned HTML to.
+    """
+    document = StreamingDocument(closed_empty_elements)
+    document.feed("<body>" + range_html)
+    document.close()
+
+    paragraph_rules = build_paragraph_rules(document.soup, class_styles)
+
+    for element in list(document.body.contents):
+        transform_node(document.soup, element, paragraph_rules, class_styles)
+
+    write_body_elements(document.body.contents, out, compact)
+
+
+def clean_html_stream(
+    chunks: Iterable[str],
+    out: TextIO,
+    compact: bool = False,
+    profile: Profile = DISABLED_PROFILE,
+) -> None:
+    """
+    Cleans HTML exported from Google Docs while reading it, writing each top-level
+    element of \\<body> to the output as soon as it has been read and cleaned.
+
+    The \\<style> block is read first, and each paragraph is dropped from memory once
+    it has been written, so memory use grows with the largest paragraph rather than
+    with the whole document. The output is the same as `clean_html` gives with the
+    'html.parser' backend, which is the only one used here.
+
+    Args:
+        chunks (Iterable[str]): The raw HTML, in pieces of any size.
+        out (TextIO): The buffer to write the cleaned HTML to.
+        compact (bool): Whether to write the compact AO3-paste format instead of
+            prettified HTML.
+        profile (Profile): Checks the process's memory after each chunk.
+
+    Raises:
+        InvalidGoogleDocsHTML: If the content is not recognized as Google Docs HTML.
+            Nothing is written for documents whose \\<body> is not from Google Docs;
+            output is held back until the first 'c' class has been seen.
+        MemoryBudgetExceeded: If the clean needs more memory than the profile's budget.
+        MemoryLimitReached: If the process is over the profile's memory limit.
+    """
+    document = StreamingDocument()
+    class_styles: Optional[ClassStyleTable] = None
+    paragraph_rules: List[Callable[[Tag], None]] = []
+
+    for chunk in chunks:
+        document.feed(chunk)
+
+        if document.body is not None and not utils.is_gdoc_body(document.body):
+            raise InvalidGoogleDocsHTML("This HTML is not exported from Google Docs")
+
+        if class_styles is None and document.has_complete_style:
+            class_styles = extract_styles(document.soup)
+            paragraph_rules = build_paragraph_rules(document.soup, class_styles)
+
+        if class_styles is not None and document.has_c_number_classes:
+            _clean_completed_elements(
+                document, out, compact, paragraph_rules, class_styles
+            )
+
+        profile.check_memory()
+
+    document.close()
+
+    if not utils.is_gdoc_body(document.body) or not document.has_c_number_classes:
+        raise InvalidGoogleDocsHTML("This HTML is not exported from Google Docs")
+
+    if class_styles is None:
+        class_styles = extract_styles(document.soup)
+        paragraph_rules = build_paragraph_rules(document.soup, class_styles)
+
+    _clean_completed_elements(document, out, compact, paragraph_rules, class_styles)
+
+
+def _clean_completed_elements(
+    document: StreamingDocument,
+    out: TextIO,
+    compact: bool,
+    paragraph_rules: List[Callable[[Tag], None]],
+    class_styles: ClassStyleTable,
+) -> None:
+    """
+    Cleans, writes and discards the completed top-level elements of a streamed document.
+
+    Args:
+        document (StreamingDocument): The document being read.
+        out (TextIO): The buffer to write the cleaned HTML to.
+        compact (bool): Whether to write the compact AO3-paste format.
+        paragraph_rules (list): Rules applied in order to each \\<p> tag.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+    """
+    elements = document.completed_body_elements()
+    count = len(elements)
+
+    if not count:
+        return
+
+    for element in elements:
+        transform_node(document.soup, element, paragraph_rules, class_styles)
+
+    # replaced spans leave new tags in their place, so the elements are listed again
+    write_body_elements(document.body.contents[:count], out, compact)
+    document.discard_body_elements(count)
+
+
+def extract_styles(soup: BeautifulSoup) -> ClassStyleTable:
     """
     Extracts text alignment and style properties from CSS classes defined in the \\<style> tag.
 
+    The stylesheet is read with a lightweight extractor, falling back to cssutils for
+    stylesheets the extractor cannot handle, and packed into a table of per-class flags.
+
     Args:
         soup (BeautifulSoup): Parsed HTML document.
 
     Returns:
-        Tuple: Tuple containing a map of class names to their corresponding 'text-align' values,
-        and a map of class names to their styles.
+        ClassStyleTable: The semantic tag and alignment flags of each class.
     """
     style_tag = soup.find("style")
     css_text = style_tag.string if style_tag else ""
+    return extract_styles_from_css(css_text or "")
+
+
+def extract_styles_from_css(css_text: str) -> ClassStyleTable:
+    """
+    Extracts text alignment and style properties from the contents of a \\<style> tag.
+
+    Args:
+        css_text (str): The contents of the \\<style> tag.
 
+    Returns:
+        ClassStyleTable: The semantic tag and alignment flags of each class.
+    """
+    try:
+        class_align_map, class_style_map = extract_class_styles(css_text)
+    except UnsupportedStylesheet:
+        class_align_map, class_style_map = extract_styles_with_cssutils(css_text)
+
+    return build_class_style_table(class_align_map, class_style_map)
+
+
+def extract_styles_with_cssutils(
+    css_text: str,
+) -> Tuple[Dict[str, Optional[str]], Dict[str, Dict[str, Optional[str]]]]:
+    """
+    Extracts text alignment and style properties from 'c' class rules using cssutils.
+
+    Args:
+        css_text (str): The contents of the \\<style> tag.
+
+    Returns:
+        Tuple: Tuple containing a map of class names to their corresponding 'text-align' values,
+        and a map of class names to their styles.
+    """
     sheet = cssutils.parseString(css_text)
 
     class_align_map: Dict[str, Optional[str]] = {}
@@ -109,8 +1056,8 @@ def extract_styles(
 
 def apply_transformations(
     soup: BeautifulSoup,
-    class_align_map: Dict[str, Optional[str]],
-    class_style_map: Dict[str, Dict[str, Optional[str]]],
+    class_styles: ClassStyleTable,
+    profile: Profile = DISABLED_PROFILE,
 ) -> BeautifulSoup:
     """
     Applies a series of transformations to clean up the HTML structure.
@@ -123,31 +1070,165 @@ def apply_transformations(
         - Removing newlines
         - Ensuring paragraphs are not empty
 
+    The document is walked once. Every rule is applied to a \\<p> tag, in the order
+    above, when the walk reaches it, and \\<span> tags outside of paragraphs are
+    replaced with semantic tags along the way.
+
     Args:
         soup (BeautifulSoup): The parsed HTML document.
-        class_align_map (dict): Maps class names to text alignment values.
-        class_style_map (dict): Maps class names to font-related style properties.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+        profile (Profile): Records the cost of the walk, and of each rule across all
+            paragraphs.
 
     Returns:
         BeautifulSoup: The transformed soup object.
     """
-    transformations = [
-        lambda s: apply_paragraph_alignment(s, class_align_map),
-        lambda s: replace_spans_with_semantic_tags(s, class_style_map),
-        merge_similar_adjacent_semantic_tags,
-        consolidate_spans_in_paragraphs,
-        strip_paragraph_newlines,
-        ensure_nonempty_paragraphs,
-    ]
+    with profile.stage("apply_transformations"):
+        paragraph_rules = build_paragraph_rules(soup, class_styles)
+
+        if profile.enabled:
+            paragraph_rules = [
+                profile.timed(f"apply_transformations.{_rule_name(rule)}", rule)
+                for rule in paragraph_rules
+            ]
 
-    for transform in transformations:
-        soup = transform(soup)
+        _transform_element(soup, soup, paragraph_rules, class_styles)
 
     return soup
 
 
+def _rule_name(rule: Callable[[Tag], None]) -> str:
+    """
+    Names a paragraph rule after the function it calls.
+    """
+    return getattr(rule, "func", rule).__name__
+
+
+def build_paragraph_rules(
+    soup: BeautifulSoup, class_styles: ClassStyleTable
+) -> List[Callable[[Tag], None]]:
+    """
+    Builds the list of rules applied in order to each \\<p> tag of a document.
+
+    Args:
+        soup (BeautifulSoup): The parsed HTML document.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+
+    Returns:
+        List[Callable[[Tag], None]]: The paragraph rules.
+    """
+    # partials keep the rules' names, which the stage timings report
+    return [
+        partial(align_paragraph, class_styles=class_styles),
+        partial(replace_spans_in_element, soup, class_styles=class_styles),
+        merge_similar_adjacent_semantic_tags_in_paragraph,
+        consolidate_spans_in_paragraph,
+        strip_newlines_in_paragraph,
+        ensure_nonempty_paragraph,
+    ]
+
+
+def _transform_element(
+    soup: BeautifulSoup,
+    element: Tag,
+    paragraph_rules: List[Callable[[Tag], None]],
+    class_styles: ClassStyleTable,
+) -> None:
+    """
+    Walks the children of an element, applying the paragraph rules to every \\<p> tag
+    and replacing styled \\<span> tags found outside of paragraphs.
+
+    Args:
+        soup (BeautifulSoup): The parsed HTML document.
+        element (Tag): The element whose children are transformed.
+        paragraph_rules (list): Rules applied in order to each \\<p> tag.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+    """
+    for child in list(element.children):
+        transform_node(soup, child, paragraph_rules, class_styles)
+
+
+def transform_node(
+    soup: BeautifulSoup,
+    node: PageElement,
+    paragraph_rules: List[Callable[[Tag], None]],
+    class_styles: ClassStyleTable,
+) -> None:
+    """
+    Transforms a single node and everything nested in it.
+
+    A \\<p> tag has the paragraph rules applied to it, a styled \\<span> tag is
+    replaced with semantic tags, and any other tag has its children transformed.
+    Paragraphs nested in a transformed \\<p> or replaced \\<span> have the rules
+    applied to them along with it, one rule at a time (see
+    `_transform_paragraphs_in_stages`).
+
+    Args:
+        soup (BeautifulSoup): The parsed HTML document.
+        node (PageElement): The node to transform.
+        paragraph_rules (list): Rules applied in order to each \\<p> tag.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+    """
+    if not isinstance(node, Tag):
+        return
+
+    if node.name == "p":
+        nested = node.find_all("p")
+
+        if nested:
+            _transform_paragraphs_in_stages([node, *nested], paragraph_rules, True)
+        else:
+            for rule in paragraph_rules:
+                rule(node)
+    elif node.name != "span":
+        _transform_element(soup, node, paragraph_rules, class_styles)
+    else:
+        # a replaced span's children are moved out of it, so they are listed first
+        nested = node.find_all("p")
+
+        if replace_span_with_semantic_tags(soup, node, class_styles):
+            _transform_paragraphs_in_stages(nested, paragraph_rules, False)
+        else:
+            _transform_element(soup, node, paragraph_rules, class_styles)
+
+
+def _transform_paragraphs_in_stages(
+    paragraphs: List[Tag],
+    paragraph_rules: List[Callable[[Tag], None]],
+    replace_spans: bool,
+) -> None:
+    """
+    Applies each paragraph rule to a \\<p> tag and the \\<p> tags nested in it
+    before the next rule, as the whole-document passes did.
+
+    The span replacement is only applied to the first tag, as it covers the spans
+    of the tags nested in it. Tags nested in a replaced span are left out of it, as
+    the spans inside a replaced span were kept.
+
+    Args:
+        paragraphs (List[Tag]): The \\<p> tags, outer ones first, in document order.
+        paragraph_rules (list): Rules applied in order to each \\<p> tag.
+        replace_spans (bool): Whether to replace the spans of the first tag, which
+            holds the others.
+    """
+    for rule in paragraph_rules:
+        if not _is_span_rule(rule):
+            for p in paragraphs:
+                rule(p)
+        elif replace_spans:
+            rule(paragraphs[0])
+
+
+def _is_span_rule(rule: Callable[[Tag], None]) -> bool:
+    """
+    Whether a paragraph rule, possibly timed, is the span replacement.
+    """
+    rule = getattr(rule, "__wrapped__", rule)
+    return getattr(rule, "func", None) is replace_spans_in_element
+
+
 def apply_paragraph_alignment(
-    soup: BeautifulSoup, class_align_map: Dict[str, Optional[str]]
+    soup: BeautifulSoup, class_styles: ClassStyleTable
 ) -> BeautifulSoup:
     """
     Applies alignment styles to \\<p> tags based on mapped class alignments.
@@ -156,78 +1237,128 @@ def apply_paragraph_alignment(
 
     Args:
         soup (BeautifulSoup): The parsed HTML document.
-        class_align_map (dict): Maps class names to text alignment values.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
 
     Returns:
         BeautifulSoup: Updated soup with \\<p> alignment applied.
     """
     for p in soup.find_all("p"):
-        classes = p.get("class", [])
-        alignment = None
+        align_paragraph(p, class_styles)
 
-        for cls in classes:
-            if cls in class_align_map and class_align_map[cls]:
-                alignment = class_align_map[cls]
-                break
+    return soup
 
-        if alignment:
-            p["align"] = alignment
 
-        new_classes = [c for c in classes if not utils.is_c_class_name(c)]
+def align_paragraph(p: Tag, class_styles: ClassStyleTable) -> None:
+    """
+    Applies the alignment mapped to a \\<p> tag's classes and removes its 'c' classes.
 
-        if new_classes:
-            p["class"] = new_classes
-        else:
-            del p["class"]
+    Args:
+        p (Tag): The \\<p> tag to update.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+    """
+    classes = p.get("class", [])
+    alignment = class_styles.paragraph_alignment(classes)
 
-    return soup
+    if alignment:
+        p["align"] = alignment
+
+    new_classes = [c for c in classes if not utils.is_c_class_name(c)]
+
+    if new_classes:
+        p["class"] = new_classes
+    else:
+        del p["class"]
 
 
 def replace_spans_with_semantic_tags(
-    soup: BeautifulSoup, class_style_map: Dict[str, Dict[str, Optional[str]]]
+    soup: BeautifulSoup, class_styles: ClassStyleTable
 ) -> BeautifulSoup:
     """
     Replaces \\<span> tags with semantic HTML tags based on associated styles.
 
     Args:
         soup (BeautifulSoup): The parsed HTML document.
-        class_style_map (dict): Maps class names to font-related style properties.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
 
     Returns:
         BeautifulSoup: Updated soup with semantic tags replacing spans.
     """
-    for span in soup.find_all("span"):
-        classes = span.get("class", [])
+    replace_spans_in_element(soup, soup, class_styles)
+    return soup
 
-        if not classes:
-            continue
 
-        tags = map_classes_to_semantic_tags(classes, class_style_map)
+def replace_spans_in_element(
+    soup: BeautifulSoup,
+    element: Tag,
+    class_styles: ClassStyleTable,
+) -> None:
+    """
+    Replaces the styled \\<span> tags nested in an element with semantic HTML tags.
+
+    The contents of a replaced span are not searched for further spans.
 
-        if not tags:
+    Args:
+        soup (BeautifulSoup): The parsed HTML document.
+        element (Tag): The element whose descendants are searched.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+    """
+    for child in list(element.children):
+        if not isinstance(child, Tag):
             continue
 
-        span_content = span.decode_contents(formatter="html")
-        new_node = None
+        if child.name != "span" or not replace_span_with_semantic_tags(
+            soup, child, class_styles
+        ):
+            replace_spans_in_element(soup, child, class_styles)
 
-        for tag in reversed(tags):
-            new_tag = soup.new_tag(tag)
 
-            if new_node is None:
-                new_tag.append(BeautifulSoup(span_content, "html.parser"))
+def replace_span_with_semantic_tags(
+    soup: BeautifulSoup,
+    span: Tag,
+    class_styles: ClassStyleTable,
+) -> bool:
+    """
+    Replaces a single \\<span> tag with the semantic HTML tags its classes map to.
 
-            else:
-                new_tag.append(new_node)
+    Args:
+        soup (BeautifulSoup): The parsed HTML document.
+        span (Tag): The \\<span> tag to replace.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
 
-            new_node = new_tag
+    Returns:
+        bool: True if the span was replaced, False if it has no semantic styling.
+    """
+    classes = span.get("class", [])
 
-        span.replace_with(new_node)
+    if not classes:
+        return False
 
-    return soup
+    tags = class_styles.span_tags(classes)
+
+    if not tags:
+        return False
+
+    new_node = None
+
+    for tag in reversed(tags):
+        new_tag = soup.new_tag(tag)
+
+        if new_node is None:
+            # move the span's children into the innermost tag as they are
+            new_tag.extend(span)
+
+        else:
+            new_tag.append(new_node)
+
+        new_node = new_tag
+
+    span.replace_with(new_node)
+
+    return True
 
 
 def map_classes_to_semantic_tags(
-    class_names: List[str], class_style_map: Dict[str, Dict[str, Optional[str]]]
+    class_names: List[str], class_styles: ClassStyleTable
 ) -> List[str]:
     """
     Maps class names to semantic HTML tags based on style properties.
@@ -240,35 +1371,12 @@ def map_classes_to_semantic_tags(
 
     Args:
         class_names (List[str]): List of CSS class names to map.
-        class_style_map (dict): Maps class names to their style properties.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
 
     Returns:
         List[str]: List of semantic tag names to apply (e.g., ["strong", "em"]).
     """
-    tag_set = set()
-
-    for cls in class_names:
-        styles = class_style_map.get(cls, {})
-
-        if not styles:
-            continue
-
-        font_weight = styles.get("font-weight")
-        if font_weight and font_weight in ("700", "bold"):
-            tag_set.add("strong")
-
-        font_style = styles.get("font-style")
-        if font_style and font_style == "italic":
-            tag_set.add("em")
-
-        text_decoration = styles.get("text-decoration")
-        if text_decoration and "underline" in text_decoration:
-            tag_set.add("u")
-
-        if text_decoration and "line-through" in text_decoration:
-            tag_set.add("s")
-
-    return [tag for tag in ("strong", "em", "u", "s") if tag in tag_set]
+    return list(class_styles.span_tags(class_names))
 
 
 def merge_identical_adjacent_tags(soup: BeautifulSoup, tag_name: str) -> BeautifulSoup:
@@ -283,31 +1391,46 @@ def merge_identical_adjacent_tags(soup: BeautifulSoup, tag_name: str) -> Beautif
         BeautifulSoup: Updated soup with merged tags.
     """
     for p in soup.find_all("p"):
-        children = list(p.children)
-        i = 0
-        while i < len(children) - 1:
-            current = children[i]
-            next_node = children[i + 1]
-            # check both are tags of the same name with no intervening text/nodes
-            if (
-                hasattr(current, "name")
-                and current.name == tag_name
-                and hasattr(next_node, "name")
-                and next_node.name == tag_name
-            ):
-                # merge next_node's content into current
-                for content in list(next_node.contents):
-                    current.append(content.extract())
-
-                next_node.extract()
-                # recompute children after extraction
-                children = list(p.children)
-            else:
-                i += 1
+        merge_adjacent_tags_in_paragraph(p, [tag_name])
 
     return soup
 
 
+def merge_adjacent_tags_in_paragraph(p: Tag, tag_names: List[str]) -> None:
+    """
+    Merges runs of adjacent identical tags that are direct children of a \\<p> tag.
+
+    The children are swept once, so runs of every tag name in `tag_names` are merged
+    together in time linear to the number of children.
+
+    Args:
+        p (Tag): The \\<p> tag to update.
+        tag_names (List[str]): The semantic tag names to merge (e.g., ["strong"]).
+    """
+    new_contents = []
+    merged = False
+
+    for child in p.contents:
+        previous = new_contents[-1] if new_contents else None
+
+        # check both are tags of the same name with no intervening text/nodes
+        if (
+            isinstance(child, Tag)
+            and child.name in tag_names
+            and isinstance(previous, Tag)
+            and previous.name == child.name
+        ):
+            # merge child's content into the first tag of the run
+            previous.extend(child)
+            merged = True
+        else:
+            new_contents.append(child)
+
+    if merged:
+        p.clear()
+        p.extend(new_contents)
+
+
 def merge_similar_adjacent_semantic_tags(soup: BeautifulSoup) -> BeautifulSoup:
     """
     Merges adjacent identical semantic tags for all supported types.
@@ -324,11 +1447,22 @@ def merge_similar_adjacent_semantic_tags(soup: BeautifulSoup) -> BeautifulSoup:
     Returns:
         BeautifulSoup: Updated soup with redundant tags merged.
     """
-    for tag in SEMANTIC_TAGS:
-        soup = merge_identical_adjacent_tags(soup, tag)
+    for p in soup.find_all("p"):
+        merge_similar_adjacent_semantic_tags_in_paragraph(p)
+
     return soup
 
 
+def merge_similar_adjacent_semantic_tags_in_paragraph(p: Tag) -> None:
+    """
+    Merges adjacent identical semantic tags of all supported types within a \\<p> tag.
+
+    Args:
+        p (Tag): The \\<p> tag to update.
+    """
+    merge_adjacent_tags_in_paragraph(p, SEMANTIC_TAGS)
+
+
 def consolidate_spans_in_paragraphs(soup: BeautifulSoup) -> BeautifulSoup:
     """
     Flattens \\<span> tags that are purely used for plain text into raw text nodes.
@@ -340,30 +1474,40 @@ def consolidate_spans_in_paragraphs(soup: BeautifulSoup) -> BeautifulSoup:
         BeautifulSoup: Updated soup with span wrappers removed when unnecessary.
     """
     for p in soup.find_all("p"):
-        span_texts = []
-        new_contents = []
-
-        for child in p.contents:
-            if isinstance(child, str):
-                new_contents.append(child)
-            elif child.name == "span":
-                span_texts.append(child.get_text())
-            else:
-                if span_texts:
-                    combined = "".join(span_texts)
-                    new_contents.append(combined)
-                    span_texts = []
-                new_contents.append(child)
+        consolidate_spans_in_paragraph(p)
 
-        if span_texts:
-            combined = "".join(span_texts)
-            new_contents.append(combined)
+    return soup
 
-        p.clear()
-        for item in new_contents:
-            p.append(item)
 
-    return soup
+def consolidate_spans_in_paragraph(p: Tag) -> None:
+    """
+    Flattens the \\<span> children of a \\<p> tag into raw text nodes.
+
+    Args:
+        p (Tag): The \\<p> tag to update.
+    """
+    span_texts = []
+    new_contents = []
+
+    for child in p.contents:
+        if isinstance(child, str):
+            new_contents.append(child)
+        elif child.name == "span":
+            span_texts.append(child.get_text())
+        else:
+            if span_texts:
+                combined = "".join(span_texts)
+                new_contents.append(combined)
+                span_texts = []
+            new_contents.append(child)
+
+    if span_texts:
+        combined = "".join(span_texts)
+        new_contents.append(combined)
+
+    p.clear()
+    for item in new_contents:
+        p.append(item)
 
 
 def strip_paragraph_newlines(soup: BeautifulSoup) -> BeautifulSoup:
@@ -376,22 +1520,32 @@ def strip_paragraph_newlines(soup: BeautifulSoup) -> BeautifulSoup:
     Returns:
         BeautifulSoup: Updated soup with newlines stripped.
     """
-    pattern = rf"{os.linesep}"
-
     for p in soup.find_all("p"):
-        text_nodes = [
-            descendant
-            for descendant in p.descendants
-            if isinstance(descendant, NavigableString)
-        ]
-
-        for text in text_nodes:
-            new_text = text.replace(pattern, "")
-            text.replace_with(new_text)
+        strip_newlines_in_paragraph(p)
 
     return soup
 
 
+def strip_newlines_in_paragraph(p: Tag) -> None:
+    """
+    Removes newline characters from the text nodes nested in a \\<p> tag.
+
+    Args:
+        p (Tag): The \\<p> tag to update.
+    """
+    pattern = rf"{os.linesep}"
+
+    text_nodes = [
+        descendant
+        for descendant in p.descendants
+        if isinstance(descendant, NavigableString)
+    ]
+
+    for text in text_nodes:
+        new_text = text.replace(pattern, "")
+        text.replace_with(new_text)
+
+
 def ensure_nonempty_paragraphs(soup: BeautifulSoup) -> BeautifulSoup:
     """
     Ensures that empty or whitespace-only paragraphs contain a non-breaking space (\\&nbsp;).
@@ -403,30 +1557,38 @@ def ensure_nonempty_paragraphs(soup: BeautifulSoup) -> BeautifulSoup:
         BeautifulSoup: Updated soup with non-empty paragraphs.
     """
     for p in soup.find_all("p"):
-        # check if the tag has no contents or only whitespace (including spaces/newlines)
-        if not p.contents or all(
-            isinstance(content, str) and content.strip() == "" for content in p.contents
-        ):
-            # clear existing contents just to be safe
-            p.clear()
-            p.append("\u00a0")
+        ensure_nonempty_paragraph(p)
 
     return soup
 
 
-def get_cleaned_body_html(soup: BeautifulSoup) -> str:
+def ensure_nonempty_paragraph(p: Tag) -> None:
+    """
+    Fills an empty or whitespace-only \\<p> tag with a non-breaking space (\\&nbsp;).
+
+    Args:
+        p (Tag): The \\<p> tag to update.
+    """
+    # check if the tag has no contents or only whitespace (including spaces/newlines)
+    if not p.contents or all(
+        isinstance(content, str) and content.strip() == "" for content in p.contents
+    ):
+        # clear existing contents just to be safe
+        p.clear()
+        p.append("\u00a0")
+
+
+def get_cleaned_body_html(soup: BeautifulSoup, compact: bool = False) -> str:
     """
     Extracts and unescapes the cleaned contents of the \\<body> tag.
 
     Args:
         soup (BeautifulSoup): The parsed HTML document.
+        compact (bool): Whether to use the compact AO3-paste format instead of the
+            prettified format.
 
     Returns:
         str: Unescaped HTML string from within \\<body>.
     """
     body = soup.find("body")
-    body_html = body.decode_contents(formatter="html")
-    prettified_html = BeautifulSoup(
-        body_html, features="html.parser", preserve_whitespace_tags=["p"]
-    ).prettify()
-    return html.unescape(prettified_html)
+    return serialize_body(body, compact)
@@ -0,0 +1,158 @@
+from typing import Any, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, PageElement, Tag
+from bs4.builder._htmlparser import BeautifulSoupHTMLParser
+
+from . import utils
+from .constants import DEFAULT_PARSER
+
+
+class StreamingDocument:
+    """
+    Builds a document tree from HTML fed in chunks, so the top-level children of
+    \\<body> can be processed and dropped as soon as they are complete.
+
+    The tree is built by the same event handlers as BeautifulSoup's 'html.parser'
+    builder, so every element is identical to the one `BeautifulSoup(html,
+    "html.parser")` would produce. Only the \\<head>, the \\<body> tag itself and the
+    children that have not been dropped yet are kept in memory.
+
+    Args:
+        closed_empty_elements (Optional[List[str]]): Empty elements whose end tags
+            should be skipped, for input that continues where another document left
+            off (see `parallel.BodyOutline`).
+    """
+
+    def __init__(self, closed_empty_elements: Optional[List[str]] = None):
+        self.soup = BeautifulSoup("", DEFAULT_PARSER)
+        args, kwargs = self.soup.builder.parser_args
+        self._parser = _StreamingHTMLParser(self.soup, *args, **kwargs)
+        self._parser.already_closed_empty_element.extend(closed_empty_elements or [])
+        self._closed = False
+
+    @property
+    def body(self) -> Optional[Tag]:
+        """
+        The first \\<body> tag in the document, once it has been opened.
+        """
+        return self._parser.body
+
+    @property
+    def has_c_number_classes(self) -> bool:
+        """
+        Whether any element seen so far has a 'c' + digits class (e.g., 'c1').
+        """
+        return self._parser.has_c_number_classes
+
+    @property
+    def has_complete_style(self) -> bool:
+        """
+        Whether the first \\<style> tag in the document has been read to its end.
+        """
+        style = self._parser.style
+        return style is not None and not self._is_open(style)
+
+    def feed(self, chunk: str) -> None:
+        """
+        Parses the next chunk of the document.
+
+        Args:
+            chunk (str): The next piece of HTML. Tags, entities and text may be split
+                across chunks anywhere.
+        """
+        self._parser.feed(chunk)
+
+    def close(self) -> None:
+        """
+        Parses whatever input is left and closes all open tags, as BeautifulSoup does
+        at the end of a document.
+        """
+        self._parser.close()
+        self.soup.endData()
+
+        while self.soup.currentTag.name != self.soup.ROOT_TAG_NAME:
+            self.soup.popTag()
+
+        self._closed = True
+
+    def completed_body_elements(self) -> List[PageElement]:
+        """
+        Lists the leading \\<body> children that will not change as more input is read.
+
+        A child is complete once its end tag has been parsed. Text nodes at the end of
+        the list are held back until a tag follows them, because text that comes next
+        would be merged with them when the body is serialized.
+
+        Returns:
+            List[PageElement]: The completed children, in document order.
+        """
+        body = self.body
+
+        if body is None:
+            return []
+
+        contents = body.contents
+
+        if self._closed:
+            return list(contents)
+
+        end = len(contents)
+
+        if self._is_open(body) and self.soup.currentTag is not body:
+            # the last child is still being parsed
+            end -= 1
+
+        while end and not isinstance(contents[end - 1], Tag):
+            end -= 1
+
+        return contents[:end]
+
+    def discard_body_elements(self, count: int) -> None:
+        """
+        Removes the first `count` children of \\<body> from the tree and frees them.
+
+        Args:
+            count (int): The number of leading children to remove.
+        """
+        for element in self.body.contents[:count]:
+            if isinstance(element, Tag):
+                element.decompose()
+            else:
+                element.extract()
+
+    def _is_open(self, tag: Tag) -> bool:
+        return any(open_tag is tag for open_tag in self.soup.tagStack)
+
+
+class _StreamingHTMLParser(BeautifulSoupHTMLParser):
+    """
+    BeautifulSoup's html.parser event handler, noting the tags that the streaming
+    cleaner needs to know about as they are opened.
+    """
+
+    def __init__(self, soup: BeautifulSoup, *args: Any, **kwargs: Any):
+        super().__init__(soup, *args, **kwargs)
+        self.body: Optional[Tag] = None
+        self.style: Optional[Tag] = None
+        self.has_c_number_classes = False
+
+    def handle_starttag(
+        self,
+        name: str,
+        attrs: List[Tuple[str, Optional[str]]],
+        handle_empty_element: bool = True,
+    ) -> None:
+        super().handle_starttag(name, attrs, handle_empty_element)
+
+        # neither tag is an empty element, so it is still on top of the stack
+        if name == "body" and self.body is None:
+            self.body = self.soup.currentTag
+        elif name == "style" and self.style is None:
+            self.style = self.soup.currentTag
+
+        if not self.has_c_number_classes:
+            # later duplicates of an attribute replace earlier ones
+            class_value = dict(attrs).get("class")
+            self.has_c_number_classes = bool(class_value) and any(
+                utils.is_c_class_name(class_name) for class_name in class_value.split()
+            )
@@ -0,0 +1,323 @@
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import utils
+from .constants import (
+    ALIGNMENT_SHIFT,
+    EM_FLAG,
+    EXTRACTED_STYLE_PROPERTIES,
+    SEMANTIC_TAG_FLAGS,
+    STRIKETHROUGH_FLAG,
+    STRONG_FLAG,
+    UNDERLINE_FLAG,
+)
+from .exceptions import UnsupportedStylesheet
+
+# quoted strings are matched whole so braces and semicolons inside them are skipped
+TOKEN_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|["\'{};]')
+
+# the bits below ALIGNMENT_SHIFT, which hold the semantic tag flags
+SEMANTIC_FLAGS_MASK = (1 << ALIGNMENT_SHIFT) - 1
+
+COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+
+DECLARATION_PATTERN = re.compile(r'(?:"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[^;])+')
+
+SIMPLE_VALUE_PATTERN = re.compile(r"^[-\w\s#.%]*$")
+
+
+class ClassStyleTable:
+    """
+    Per-document table of the semantic tag and alignment flags of each 'c' class.
+
+    Each class maps to an int whose low bits are the STRONG/EM/UNDERLINE/STRIKETHROUGH
+    flags and whose bits above ALIGNMENT_SHIFT hold an index into `alignments`. Lookups
+    for a combination of classes are memoized, since a document only uses a handful of
+    distinct class combinations.
+    """
+
+    __slots__ = (
+        "flags",
+        "alignments",
+        "_span_flags",
+        "_span_tags",
+        "_paragraph_alignments",
+    )
+
+    def __init__(self, flags: Dict[str, int], alignments: List[str]):
+        self.flags = flags
+        self.alignments = alignments
+        self._span_flags: Dict[Tuple[str, ...], int] = {}
+        self._span_tags: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._paragraph_alignments: Dict[Tuple[str, ...], Optional[str]] = {}
+
+    def span_flags(self, class_names: Tuple[str, ...]) -> int:
+        """
+        Looks up the combined semantic tag flags of a combination of classes.
+
+        Args:
+            class_names (Tuple[str, ...]): The classes of an element.
+
+        Returns:
+            int: The STRONG/EM/UNDERLINE/STRIKETHROUGH flags set by any of the classes.
+        """
+        flags = self._span_flags.get(class_names)
+
+        if flags is None:
+            flags = 0
+            for cls in class_names:
+                flags |= self.flags.get(cls, 0)
+
+            flags = self._span_flags[class_names] = flags & SEMANTIC_FLAGS_MASK
+
+        return flags
+
+    def span_tags(self, class_names: List[str]) -> Tuple[str, ...]:
+        """
+        Looks up the semantic tags for a combination of classes.
+
+        Args:
+            class_names (List[str]): The classes of an element.
+
+        Returns:
+            Tuple[str, ...]: Semantic tag names to apply, outermost first (e.g., ("strong", "em")).
+        """
+        key = tuple(class_names)
+        tags = self._span_tags.get(key)
+
+        if tags is None:
+            combined = 0
+            for cls in key:
+                combined |= self.flags.get(cls, 0)
+
+            tags = tuple(tag for tag, flag in SEMANTIC_TAG_FLAGS if combined & flag)
+            self._span_tags[key] = tags
+
+        return tags
+
+    def paragraph_alignment(self, class_names: List[str]) -> Optional[str]:
+        """
+        Looks up the alignment of the first class in a combination that has one.
+
+        Args:
+            class_names (List[str]): The classes of an element.
+
+        Returns:
+            Optional[str]: The 'text-align' value, or None if no class sets one.
+        """
+        key = tuple(class_names)
+
+        if key not in self._paragraph_alignments:
+            alignment = None
+            for cls in key:
+                index = self.flags.get(cls, 0) >> ALIGNMENT_SHIFT
+                if index:
+                    alignment = self.alignments[index - 1]
+                    break
+
+            self._paragraph_alignments[key] = alignment
+
+        return self._paragraph_alignments[key]
+
+    def resolve(self, class_name: str) -> Tuple[int, Optional[str]]:
+        """
+        Resolves a class's flags into values that do not depend on the rest of the
+        stylesheet, unlike the alignment index packed into the flags.
+
+        Args:
+            class_name (str): The class name.
+
+        Returns:
+            Tuple[int, Optional[str]]: The semantic tag flags and the 'text-align'
+            value of the class.
+        """
+        flags = self.flags.get(class_name, 0)
+        index = flags >> ALIGNMENT_SHIFT
+        alignment = self.alignments[index - 1] if index else None
+        return flags & SEMANTIC_FLAGS_MASK, alignment
+
+
+def build_class_style_table(
+    class_align_map: Dict[str, Optional[str]],
+    class_style_map: Dict[str, Dict[str, Optional[str]]],
+) -> ClassStyleTable:
+    """
+    Packs the extracted class styles into a table of per-class bit flags.
+
+    Supported formatting:
+        - STRONG_FLAG for a 'font-weight' of 700 or bold
+        - EM_FLAG for an italic 'font-style'
+        - UNDERLINE_FLAG for an underline 'text-decoration'
+        - STRIKETHROUGH_FLAG for a line-through 'text-decoration'
+
+    Args:
+        class_align_map (dict): Maps class names to text alignment values.
+        class_style_map (dict): Maps class names to font-related style properties.
+
+    Returns:
+        ClassStyleTable: The flag table for the document.
+    """
+    flags: Dict[str, int] = {}
+    alignments: List[str] = []
+    alignment_indexes: Dict[str, int] = {}
+
+    for class_name, styles in class_style_map.items():
+        class_flags = 0
+
+        font_weight = styles.get("font-weight")
+        if font_weight and font_weight in ("700", "bold"):
+            class_flags |= STRONG_FLAG
+
+        font_style = styles.get("font-style")
+        if font_style and font_style == "italic":
+            class_flags |= EM_FLAG
+
+        text_decoration = styles.get("text-decoration")
+        if text_decoration and "underline" in text_decoration:
+            class_flags |= UNDERLINE_FLAG
+
+        if text_decoration and "line-through" in text_decoration:
+            class_flags |= STRIKETHROUGH_FLAG
+
+        flags[class_name] = class_flags
+
+    for class_name, alignment in class_align_map.items():
+        if not alignment:
+            continue
+
+        if alignment not in alignment_indexes:
+            alignments.append(alignment)
+            alignment_indexes[alignment] = len(alignments)
+
+        flags[class_name] = flags.get(class_name, 0) | (
+            alignment_indexes[alignment] << ALIGNMENT_SHIFT
+        )
+
+    return ClassStyleTable(flags, alignments)
+
+
+def extract_class_styles(
+    css_text: str,
+) -> Tuple[Dict[str, Optional[str]], Dict[str, Dict[str, Optional[str]]]]:
+    """
+    Extracts text alignment and font styles from the 'c' class rules of a Google Docs
+    stylesheet without building a full CSS object model.
+
+    Only 'text-align', 'font-weight', 'font-style' and 'text-decoration' are read from
+    rules whose selector is a single 'c' class (e.g. '.c1'). Other rules, including
+    at-rules and anything nested inside them, are skipped.
+
+    Args:
+        css_text (str): The contents of the \\<style> tag.
+
+    Returns:
+        Tuple: Tuple containing a map of class names to their corresponding 'text-align' values,
+        and a map of class names to their styles.
+
+    Raises:
+        UnsupportedStylesheet: If a 'c' class rule uses syntax this extractor does not
+            handle (e.g. '!important', escapes or functions), or the stylesheet is malformed.
+    """
+    class_align_map: Dict[str, Optional[str]] = {}
+    class_style_map: Dict[str, Dict[str, Optional[str]]] = {}
+
+    for selector, block in _iter_top_level_rules(css_text):
+        if not utils.is_c_class_selector(selector):
+            continue
+
+        properties = _parse_declarations(block)
+        class_name = selector[1:]
+        class_align_map[class_name] = properties.get("text-align")
+        class_style_map[class_name] = {
+            "font-weight": properties.get("font-weight"),
+            "font-style": properties.get("font-style"),
+            "text-decoration": properties.get("text-decoration"),
+        }
+
+    return class_align_map, class_style_map
+
+
+def _iter_top_level_rules(css_text: str) -> Iterator[Tuple[str, str]]:
+    """
+    Splits a stylesheet into its top-level rules.
+
+    Args:
+        css_text (str): The stylesheet to split.
+
+    Yields:
+        Tuple[str, str]: The selector (or at-rule prelude) and the text inside its braces.
+
+    Raises:
+        UnsupportedStylesheet: If the braces or quotes in the stylesheet are unbalanced.
+    """
+    if "/*" in css_text:
+        css_text = COMMENT_PATTERN.sub("", css_text)
+
+    depth = 0
+    rule_start = 0
+    block_start = 0
+    selector = ""
+
+    for match in TOKEN_PATTERN.finditer(css_text):
+        token = match.group()
+
+        if token == "{":
+            if depth == 0:
+                selector = css_text[rule_start : match.start()].strip()
+                block_start = match.end()
+            depth += 1
+        elif token == "}":
+            depth -= 1
+            if depth < 0:
+                raise UnsupportedStylesheet("Unbalanced braces in stylesheet")
+            if depth == 0:
+                yield selector, css_text[block_start : match.start()]
+                rule_start = match.end()
+        elif token == ";":
+            if depth == 0:
+                # end of an at-statement such as @import or @charset
+                rule_start = match.end()
+        elif len(token) == 1:
+            raise UnsupportedStylesheet("Unterminated string in stylesheet")
+
+    if depth != 0:
+        raise UnsupportedStylesheet("Unbalanced braces in stylesheet")
+
+
+def _parse_declarations(block: str) -> Dict[str, str]:
+    """
+    Reads the extracted style properties from the declarations of a single rule.
+
+    Later declarations override earlier ones, and empty declarations are ignored.
+
+    Args:
+        block (str): The text inside the rule's braces.
+
+    Returns:
+        Dict[str, str]: Maps property names to their values.
+
+    Raises:
+        UnsupportedStylesheet: If the block contains a nested rule or a value that
+            needs a full CSS parser.
+    """
+    if "{" in block:
+        raise UnsupportedStylesheet("Nested rules are not supported")
+
+    properties: Dict[str, str] = {}
+
+    for declaration in DECLARATION_PATTERN.findall(block):
+        name, separator, value = declaration.partition(":")
+        name = name.strip().lower()
+
+        if not separator or name not in EXTRACTED_STYLE_PROPERTIES:
+            continue
+
+        if not SIMPLE_VALUE_PATTERN.match(value):
+            raise UnsupportedStylesheet(f"Unsupported value for {name}: {value}")
+
+        value = " ".join(value.split())
+
+        if value:
+            properties[name] = value
+
+    return properties
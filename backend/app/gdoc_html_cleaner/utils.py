@@ -1,4 +1,66 @@
-from bs4 import BeautifulSoup
+import re
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, Tag
+from bs4.builder import builder_registry
+
+from .constants import (
+    DEFAULT_PARSER,
+    GDOC_DETECTION_CHUNK_SIZE,
+    SUPPORTED_PARSERS,
+)
+
+# a character reference with no ';' at the end of the text, which html.parser only
+# reads as a reference when a tag follows it
+UNTERMINATED_REFERENCE_PATTERN = re.compile(
+    r"&(?:[a-zA-Z][-.a-zA-Z0-9]*|#[0-9]+|#[xX][0-9a-fA-F]+)\Z"
+)
+
+
+def resolve_parser(parser: Optional[str] = None) -> str:
+    """
+    Resolves a parser backend name to a tree builder that is installed.
+
+    "auto" picks the fastest backend, which is 'html.parser': with it, paragraphs are
+    cleaned without building a tree, about twice as fast as with lxml. A backend
+    that is not installed falls back to 'html.parser' as well.
+
+    lxml output is not byte-identical to 'html.parser' output. They agree on the
+    HTML Google Docs exports, but lxml repairs markup as browsers do where
+    'html.parser' keeps it as written:
+
+        - a \\<p> is closed when another \\<p> or a block such as \\<div> starts, so
+          unclosed and nested paragraphs become siblings, and text after a nested
+          \\<p> ends up outside of both;
+        - a \\<body> nested in \\<body> is merged into it;
+        - carriage returns in text are read as line breaks, which are then stripped
+          from paragraphs;
+        - the contents of \\<textarea> are read as text;
+        - processing instructions and CDATA sections are written as comments;
+        - an unknown entity is read as the longest known one it starts with, so
+          '&notit;' becomes '¬it;'.
+
+    Args:
+        parser (Optional[str]): One of 'html.parser', 'lxml' or 'auto'. Defaults to
+            'html.parser'.
+
+    Returns:
+        str: The name of the tree builder to pass to BeautifulSoup.
+
+    Raises:
+        ValueError: If the parser backend is not supported.
+    """
+    if parser is None or parser == DEFAULT_PARSER:
+        return DEFAULT_PARSER
+
+    if parser not in SUPPORTED_PARSERS:
+        raise ValueError(f"Unsupported parser backend: {parser}")
+
+    if parser != "auto" and builder_registry.lookup(parser) is not None:
+        return parser
+
+    return DEFAULT_PARSER
 
 
 def is_c_class_selector(selector: str) -> bool:
@@ -35,20 +97,137 @@ def is_gdoc_html(html: str) -> bool:
         1. The \\<body> tag has a class that includes 'doc-content'.
         2. There are elements in the HTML with class names matching the 'c' + digits pattern (e.g., 'c1', 'c23').
 
+    The HTML is scanned without building a tree and only until both criteria are
+    settled, which for a Google Docs export is its \\<body> tag. The answer is the
+    same as `is_gdoc_soup` gives for the document parsed with 'html.parser'.
+
     Args:
         html (str): A string containing HTML content.
 
     Returns:
         bool: True if the HTML appears to be from Google Docs, False otherwise.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    body = soup.find("body")
+    return is_gdoc_html_chunks(
+        html[start : start + GDOC_DETECTION_CHUNK_SIZE]
+        for start in range(0, len(html), GDOC_DETECTION_CHUNK_SIZE)
+    )
+
+
+def is_gdoc_html_chunks(chunks: Iterable[str]) -> bool:
+    """
+    Determines whether HTML read in pieces is likely exported from Google Docs (see
+    `is_gdoc_html`), reading no more pieces than it needs to.
+
+    Args:
+        chunks (Iterable[str]): The HTML, in pieces of any size.
+
+    Returns:
+        bool: True if the HTML appears to be from Google Docs, False otherwise.
+    """
+    detector = _GdocDetector()
+
+    for chunk in chunks:
+        detector.feed(chunk)
+
+        if detector.verdict is not None:
+            return detector.verdict
+
+    detector.close()
+    return bool(detector.verdict)
+
+
+def is_gdoc_soup(soup: BeautifulSoup) -> bool:
+    """
+    Determines whether an already parsed HTML document is likely exported from Google Docs.
 
-    has_doc_content = body and body.get("class") and "doc-content" in body["class"]
+    Uses the same criteria as `is_gdoc_html`, but works on an existing tree so callers
+    that go on to process the document do not have to parse it twice.
 
-    has_c_number_classes = any(
-        tag.get("class") and any(is_c_class_name(cls) for cls in tag["class"])
-        for tag in soup.find_all(True)
+    Args:
+        soup (BeautifulSoup): Parsed HTML document.
+
+    Returns:
+        bool: True if the document appears to be from Google Docs, False otherwise.
+    """
+    if not is_gdoc_body(soup.find("body")):
+        return False
+
+    # stops at the first 'c' class, which in Google Docs exports is on \\<body>
+    return any(
+        isinstance(tag, Tag)
+        and tag.get("class")
+        and any(is_c_class_name(cls) for cls in tag["class"])
+        for tag in soup.descendants
     )
 
-    return has_doc_content and has_c_number_classes
+
+def is_gdoc_body(body: Optional[Tag]) -> bool:
+    """
+    Checks whether a \\<body> tag has the 'doc-content' class that Google Docs exports use.
+
+    Args:
+        body (Optional[Tag]): The document's \\<body> tag, if it has one.
+
+    Returns:
+        bool: True if the tag has the 'doc-content' class, False otherwise.
+    """
+    return bool(body and body.get("class") and "doc-content" in body["class"])
+
+
+def terminate_reference(html: str) -> str:
+    """
+    Ends a piece of HTML cut from a document right before a tag with a ';' if it
+    ends in a character reference without one, such as '&copy' or '&#169'.
+
+    In the whole document, html.parser reads the reference when it reaches the tag,
+    but a piece parsed on its own ends before the tag and the reference would be
+    kept as text. With the ';', the piece gives the same text it does in the document.
+
+    Args:
+        html (str): The HTML before the tag.
+
+    Returns:
+        str: The HTML, with a ';' added if it was needed.
+    """
+    if UNTERMINATED_REFERENCE_PATTERN.search(html):
+        return html + ";"
+
+    return html
+
+
+class _GdocDetector(HTMLParser):
+    """
+    Tokenizes HTML the way the 'html.parser' builder does, settling the Google Docs
+    criteria of `is_gdoc_html` as soon as the tags read so far allow.
+    """
+
+    def __init__(self):
+        # character references are left alone, as the html.parser builder does
+        super().__init__(convert_charrefs=False)
+        self.verdict: Optional[bool] = None
+        self._body_seen = False
+        self._has_c_number_classes = False
+
+    def handle_starttag(
+        self, name: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        if self.verdict is not None:
+            return
+
+        # later duplicates of an attribute replace earlier ones
+        class_names = (dict(attrs).get("class") or "").split()
+
+        if not self._has_c_number_classes:
+            self._has_c_number_classes = any(
+                is_c_class_name(class_name) for class_name in class_names
+            )
+
+        if name == "body" and not self._body_seen:
+            self._body_seen = True
+
+            if "doc-content" not in class_names:
+                self.verdict = False
+                return
+
+        if self._body_seen and self._has_c_number_classes:
+            self.verdict = True
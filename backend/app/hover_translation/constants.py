@@ -1,28 +1,77 @@
 import re
 
+# the markers `markers.iter_markers` finds; matching this takes time cubic in the
+# length of a line with many unclosed braces, so it is only kept to check the scanner
 TRANSLATION_PATTERN = re.compile(r"\{(.*?)\s\[(.+?)\]\}")
 
 CLASS_TEMPLATE = "ch{chapter_id}text{index}"
 
+# works with fewer characters than this in all their chapters are not worth sending
+# to a process pool, and are generated in the process handling the request
+WORK_PARALLEL_MIN_SIZE = 1_000_000
+
+# anchor_str names the marker itself and class_str the CSS class it uses, which
+# identical markers share when pairs are deduplicated
 ANCHOR_TEMPLATE = (
-    '<a name="return{class_str}" rel="nofollow" id="return{class_str}"></a>'
-    '<a href="#return{class_str}" class="{class_str}" rel="nofollow">'
+    '<a name="return{anchor_str}" rel="nofollow" id="return{anchor_str}"></a>'
+    '<a href="#return{anchor_str}" class="{class_str}" rel="nofollow">'
     '<span class="hide">{original}</span></a>'
 )
 
-CSS_TEMPLATE = """#workskin a.{class_str}:after {{
-  content: "{original}";
-}}
-
-#workskin a.{class_str}:hover:after,
-#workskin a.{class_str}:focus:after {{
-  content: "{translated}";
-  display: inline;
+# the declarations every pair's translation is shown with
+HOVER_DECLARATIONS = """  display: inline;
   background-color: #FFF;
   color: #2a2a2a;
   border-bottom: 1px solid #FFF;
   position: relative;
   margin: 0px;
   padding: 0px;
+"""
+
+CSS_TEMPLATE = (
+    """#workskin a.{class_str}:after {{
+  content: "{original}";
+}}
+
+#workskin a.{class_str}:hover:after,
+#workskin a.{class_str}:focus:after {{
+  content: "{translated}";
+"""
+    + HOVER_DECLARATIONS
+    + "}}\n"
+)
+
+# in compact CSS, the hover declarations are written once for all the classes of a
+# chapter, matched by the start of their names, and each pair only has its content
+COMPACT_CSS_TEMPLATE = """#workskin a.{class_str}:after {{
+  content: "{original}";
+}}
+
+#workskin a.{class_str}:hover:after,
+#workskin a.{class_str}:focus:after {{
+  content: "{translated}";
 }}
 """
+
+SHARED_HOVER_SELECTOR_TEMPLATE = (
+    '#workskin a[class^="ch{chapter_id}text"]:hover:after,\n'
+    '#workskin a[class^="ch{chapter_id}text"]:focus:after'
+)
+
+TRANSLATED_FILE_SUFFIX = "_translated.html"
+
+WORKSKIN_FILE_SUFFIX = "_workskin.css"
+
+DOWNLOAD_FILE_NAME = "hover_translation.zip"
+
+# bytes of CSS kept in memory while the HTML of a download is streamed, past which
+# the CSS is moved to a temporary file on disk
+CSS_SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
+# characters of streamed HTML held back with no line break to cut at, past which the
+# text before the first "{" that may still start a marker is written out, and a "{"
+# with more than this many characters after it is left as text
+STREAM_PENDING_MAX_SIZE = 256 * 1024
+
+# chapters a /generate-work request may hold
+WORK_MAX_CHAPTERS = 200
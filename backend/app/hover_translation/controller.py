@@ -1,12 +1,40 @@
-from flask import Blueprint, jsonify, request
+from typing import Any, Optional
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+)
 from marshmallow import ValidationError
-from .schemas import HoverTranslationFileSchema, HoverTranslationSchema
-from ..commons.exceptions import InvalidHTMLFile
-from .service import generate_translations, generate_translations_from_file
+from werkzeug.datastructures import FileStorage
+from .schemas import (
+    HoverTranslationFileSchema,
+    HoverTranslationSchema,
+    HoverTranslationWorkSchema,
+)
+from ..commons.cache import cached_json_response, hash_text, make_cache_key
+from ..commons.exceptions import (
+    InvalidHTMLFile,
+    MemoryBudgetExceeded,
+    MemoryLimitReached,
+)
+from ..commons.profiling import request_profile
+from ..commons.utils import hash_uploaded_file
+from .constants import DOWNLOAD_FILE_NAME
+from .service import (
+    generate_translations_with_count,
+    generate_translations_with_count_from_file,
+    generate_translations_zip,
+    generate_work_translations,
+)
 
 hover_translation_bp = Blueprint("hover_translation", __name__)
 hover_translation_schema = HoverTranslationSchema()
 hover_translation_file_schema = HoverTranslationFileSchema()
+hover_translation_work_schema = HoverTranslationWorkSchema()
 
 
 @hover_translation_bp.route("/generate", methods=["POST"])
@@ -19,14 +47,37 @@ def generate_from_text():
 
     html = data.get("html")
     chapter_id = data.get("chapter_id")
+    escapes = data.get("escapes")
+    dedupe = data.get("dedupe")
+    compact = data.get("compact")
+    workskin = data.get("workskin")
+    cache_key = make_cache_key(
+        "generate",
+        hash_text(html),
+        chapter_id=chapter_id,
+        escapes=escapes,
+        dedupe=dedupe,
+        compact=compact,
+        workskin=_hash_workskin(workskin),
+    )
+
+    def generate():
+        new_html, new_css, deduplicated = generate_translations_with_count(
+            html, chapter_id, escapes, dedupe, compact, workskin, request_profile()
+        )
+        return {"html": new_html, "css": new_css, "dedupedPairs": deduplicated}
 
     try:
-        new_html, new_css = generate_translations(html, chapter_id)
+        return cached_json_response(
+            current_app.extensions["result_cache"], cache_key, generate
+        )
+    except MemoryBudgetExceeded as err:
+        return jsonify({"error": str(err)}), 413
+    except MemoryLimitReached as err:
+        return jsonify({"error": str(err)}), 503, {"Retry-After": "30"}
     except Exception:
         return jsonify({"error": "Internal server error"}), 500
 
-    return jsonify({"html": new_html, "css": new_css}), 200
-
 
 @hover_translation_bp.route("/generate-file", methods=["POST"])
 def generate_from_file():
@@ -38,12 +89,149 @@ def generate_from_file():
 
     uploaded_file = data.get("file")
     chapter_id = data.get("chapter_id")
+    escapes = data.get("escapes")
+    dedupe = data.get("dedupe")
+    compact = data.get("compact")
+    workskin = data.get("workskin")
+
+    if data.get("download"):
+        return _download_translations(
+            uploaded_file, chapter_id, escapes, dedupe, compact, workskin
+        )
+
+    def generate():
+        new_html, new_css, deduplicated = generate_translations_with_count_from_file(
+            uploaded_file,
+            chapter_id,
+            escapes,
+            dedupe,
+            compact,
+            workskin,
+            request_profile(),
+        )
+        return {"html": new_html, "css": new_css, "dedupedPairs": deduplicated}
+
+    try:
+        # uploads are decoded as UTF-8, so they share cache entries with /generate
+        cache_key = make_cache_key(
+            "generate",
+            hash_uploaded_file(uploaded_file),
+            chapter_id=chapter_id,
+            escapes=escapes,
+            dedupe=dedupe,
+            compact=compact,
+            workskin=_hash_workskin(workskin),
+        )
+
+        return cached_json_response(
+            current_app.extensions["result_cache"], cache_key, generate
+        )
+    except InvalidHTMLFile as err:
+        return jsonify({"error": str(err)}), 400
+    except MemoryBudgetExceeded as err:
+        return jsonify({"error": str(err)}), 413
+    except MemoryLimitReached as err:
+        return jsonify({"error": str(err)}), 503, {"Retry-After": "30"}
+    except Exception:
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@hover_translation_bp.route("/generate-work", methods=["POST"])
+def generate_from_work():
+    try:
+        data = hover_translation_work_schema.load(data=request.get_json())
+    except ValidationError as err:
+        return jsonify({"error": _first_error(err.messages)}), 400
+
+    chapters = [
+        (chapter["chapter_id"], chapter["html"]) for chapter in data["chapters"]
+    ]
+    escapes = data.get("escapes")
+    compact = data.get("compact")
+    # chapter IDs are alphanumeric, so they cannot run into the separators
+    cache_key = make_cache_key(
+        "generate-work",
+        hash_text(
+            "\0".join(
+                f"{chapter_id}\0{hash_text(html)}" for chapter_id, html in chapters
+            )
+        ),
+        escapes=escapes,
+        compact=compact,
+    )
+
+    def generate():
+        new_htmls, new_css, deduplicated = generate_work_translations(
+            chapters,
+            escapes,
+            compact,
+            current_app.config["HOVER_TRANSLATION_WORK_WORKERS"],
+            request_profile(),
+        )
+        return {
+            "chapters": [
+                {"chapterId": chapter_id, "html": new_html}
+                for (chapter_id, _), new_html in zip(chapters, new_htmls)
+            ],
+            "css": new_css,
+            "dedupedPairs": deduplicated,
+        }
+
+    try:
+        return cached_json_response(
+            current_app.extensions["result_cache"], cache_key, generate
+        )
+    except MemoryBudgetExceeded as err:
+        return jsonify({"error": str(err)}), 413
+    except MemoryLimitReached as err:
+        return jsonify({"error": str(err)}), 503, {"Retry-After": "30"}
+    except Exception:
+        return jsonify({"error": "Internal server error"}), 500
+
+
+def _hash_workskin(workskin: Optional[str]) -> Optional[str]:
+    """
+    Hashes the workskin a chapter is generated against, for its cache key.
+    """
+    return None if workskin is None else hash_text(workskin)
+
+
+def _first_error(messages: Any) -> str:
+    """
+    Finds the first validation error message, looking into the errors of nested
+    fields such as the chapters of a work.
+    """
+    while not isinstance(messages, str):
+        messages = next(
+            iter(messages.values() if isinstance(messages, dict) else messages)
+        )
+
+    return messages
+
 
+def _download_translations(
+    uploaded_file: FileStorage,
+    chapter_id: str,
+    escapes: bool,
+    dedupe: bool,
+    compact: bool,
+    workskin: Optional[str],
+):
+    """
+    Streams the generated HTML and CSS for an upload as a zip, bypassing the result
+    cache so neither file is held whole.
+    """
     try:
-        new_html, new_css = generate_translations_from_file(uploaded_file, chapter_id)
+        chunks = generate_translations_zip(
+            uploaded_file, chapter_id, escapes, dedupe, compact, workskin
+        )
     except InvalidHTMLFile as err:
         return jsonify({"error": str(err)}), 400
     except Exception:
         return jsonify({"error": "Internal server error"}), 500
 
-    return jsonify({"html": new_html, "css": new_css}), 200
+    return Response(
+        stream_with_context(chunks),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{DOWNLOAD_FILE_NAME}"'},
+    )
@@ -1,6 +1,7 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, ValidationError, fields, validates
 from marshmallow.validate import Regexp, Length
 from ..commons.utils import not_empty_string
+from .constants import WORK_MAX_CHAPTERS
 
 
 alphanumeric_validator = Regexp(
@@ -22,6 +23,10 @@ class HoverTranslationSchema(Schema):
             length_validator,
         ],
     )
+    escapes = fields.Boolean(load_default=False)
+    dedupe = fields.Boolean(load_default=False)
+    compact = fields.Boolean(load_default=False)
+    workskin = fields.String(load_default=None)
 
 
 class HoverTranslationFileSchema(Schema):
@@ -35,3 +40,42 @@ class HoverTranslationFileSchema(Schema):
             length_validator,
         ],
     )
+    escapes = fields.Boolean(load_default=False)
+    dedupe = fields.Boolean(load_default=False)
+    compact = fields.Boolean(load_default=False)
+    workskin = fields.String(load_default=None)
+    download = fields.Boolean(load_default=False)
+
+
+class HoverTranslationChapterSchema(Schema):
+    html = fields.String(required=True, validate=not_empty_string("HTML"))
+    chapter_id = fields.String(
+        required=True,
+        data_key="chapterId",
+        validate=[
+            not_empty_string("Chapter ID"),
+            alphanumeric_validator,
+            length_validator,
+        ],
+    )
+
+
+class HoverTranslationWorkSchema(Schema):
+    chapters = fields.List(
+        fields.Nested(HoverTranslationChapterSchema),
+        required=True,
+        validate=Length(
+            min=1,
+            max=WORK_MAX_CHAPTERS,
+            error=f"Send between 1 and {WORK_MAX_CHAPTERS} chapters.",
+        ),
+    )
+    escapes = fields.Boolean(load_default=False)
+    compact = fields.Boolean(load_default=False)
+
+    @validates("chapters")
+    def validate_unique_chapter_ids(self, chapters, **kwargs):
+        chapter_ids = [chapter["chapter_id"] for chapter in chapters]
+
+        if len(set(chapter_ids)) != len(chapter_ids):
+            raise ValidationError("Chapter IDs must be unique.")
@@ -1,18 +1,40 @@
+import io
 import os
-from typing import List, Tuple, Match
+import posixpath
+import tempfile
+from itertools import repeat
+from typing import Dict, Generator, Iterable, Iterator, List, Optional, TextIO, Tuple
 from werkzeug.datastructures import FileStorage
+from .markers import is_escaped, iter_markers
+from .workskin import WorkskinIndex
 from .utils import escape_character
 from .constants import (
     ANCHOR_TEMPLATE,
     CLASS_TEMPLATE,
+    COMPACT_CSS_TEMPLATE,
+    CSS_SPOOL_MAX_SIZE,
     CSS_TEMPLATE,
-    TRANSLATION_PATTERN,
+    HOVER_DECLARATIONS,
+    SHARED_HOVER_SELECTOR_TEMPLATE,
+    STREAM_PENDING_MAX_SIZE,
+    TRANSLATED_FILE_SUFFIX,
+    WORK_PARALLEL_MIN_SIZE,
+    WORKSKIN_FILE_SUFFIX,
 )
-from ..commons.utils import read_uploaded_html_file
+from ..commons.executors import get_executor
+from ..commons.profiling import DISABLED_PROFILE, Profile
+from ..commons.utils import iter_uploaded_html_file, read_uploaded_html_file
+from ..commons.zip_stream import ZipStream
 
 
 def generate_translations_from_file(
-    file: FileStorage, chapter_id: str
+    file: FileStorage,
+    chapter_id: str,
+    escapes: bool = False,
+    dedupe: bool = False,
+    compact: bool = False,
+    workskin: Optional[str] = None,
+    profile: Profile = DISABLED_PROFILE,
 ) -> Tuple[str, str]:
     """
     Reads and decodes an uploaded HTML file, then processes it to extract translation pairs
@@ -21,6 +43,18 @@ def generate_translations_from_file(
     Args:
         file (FileStorage): The uploaded HTML file containing translation markers.
         chapter_id (str): The chapter ID used to generate unique CSS class names.
+        escapes (bool): Whether a backslash before a bracket, brace or backslash
+            makes it plain text (see `markers.iter_markers`).
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
+        compact (bool): Whether the hover declarations every pair shares are
+            written once for the chapter instead of in each pair's rules.
+        workskin (Optional[str]): An existing workskin to update (see
+            `workskin.WorkskinIndex`): pairs it has a class for reuse it, new
+            classes are numbered after the chapter's last one in it, and the CSS
+            is the workskin with the rules of the new classes appended.
+        profile (Profile): Records what each stage of the generation costs.
 
     Raises:
         InvalidHTMLFile: If the uploaded file cannot be read or decoded as UTF-8.
@@ -28,11 +62,60 @@ def generate_translations_from_file(
     Returns:
         Tuple[str, str]: A tuple containing the modified HTML string and the generated CSS styles.
     """
-    html = read_uploaded_html_file(file)
-    return generate_translations(html, chapter_id)
+    new_html, css, _ = generate_translations_with_count_from_file(
+        file, chapter_id, escapes, dedupe, compact, workskin, profile
+    )
+    return new_html, css
 
 
-def generate_translations(html: str, chapter_id: str) -> Tuple[str, str]:
+def generate_translations_with_count_from_file(
+    file: FileStorage,
+    chapter_id: str,
+    escapes: bool = False,
+    dedupe: bool = False,
+    compact: bool = False,
+    workskin: Optional[str] = None,
+    profile: Profile = DISABLED_PROFILE,
+) -> Tuple[str, str, int]:
+    """
+    Generates hover translations for an uploaded HTML file like
+    `generate_translations_from_file`, also counting the markers that did not get
+    a new CSS class.
+
+    Args:
+        file (FileStorage): The uploaded HTML file containing translation markers.
+        chapter_id (str): The chapter ID used to generate unique CSS class names.
+        escapes (bool): Whether backslash escapes are read.
+        dedupe (bool): Whether identical pairs share one CSS class.
+        compact (bool): Whether the shared hover declarations are written once.
+        workskin (Optional[str]): An existing workskin to update.
+        profile (Profile): Records what each stage of the generation costs.
+
+    Raises:
+        InvalidHTMLFile: If the uploaded file cannot be read or decoded as UTF-8.
+
+    Returns:
+        Tuple[str, str, int]: The modified HTML string, the generated CSS styles and
+        the number of markers that shared the class of an identical earlier pair or
+        reused one of the workskin.
+    """
+    with profile.stage("read_file"):
+        html = read_uploaded_html_file(file)
+
+    return generate_translations_with_count(
+        html, chapter_id, escapes, dedupe, compact, workskin, profile
+    )
+
+
+def generate_translations(
+    html: str,
+    chapter_id: str,
+    escapes: bool = False,
+    dedupe: bool = False,
+    compact: bool = False,
+    workskin: Optional[str] = None,
+    profile: Profile = DISABLED_PROFILE,
+) -> Tuple[str, str]:
     """
     Processes the input HTML string to extract translation pairs and
     replace them with annotated HTML elements. Also generates corresponding CSS.
@@ -40,17 +123,526 @@ def generate_translations(html: str, chapter_id: str) -> Tuple[str, str]:
     Args:
         html (str): The HTML content containing translation markers in the form {original [translated]}.
         chapter_id (str): The chapter ID used for generating unique CSS class names.
+        escapes (bool): Whether a backslash before a bracket, brace or backslash
+            makes it plain text (see `markers.iter_markers`).
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
+        compact (bool): Whether the hover declarations every pair shares are
+            written once for the chapter instead of in each pair's rules.
+        workskin (Optional[str]): An existing workskin to update (see
+            `workskin.WorkskinIndex`): pairs it has a class for reuse it, new
+            classes are numbered after the chapter's last one in it, and the CSS
+            is the workskin with the rules of the new classes appended.
+        profile (Profile): Records what each stage of the generation costs, counting
+            translation pairs as nodes.
 
     Returns:
         Tuple[str, str]: A tuple containing the modified HTML string and the generated CSS styles.
     """
-    new_html, pairs = replace_and_extract_translations(html, chapter_id)
-    css = generate_css(pairs, chapter_id)
+    new_html, css, _ = generate_translations_with_count(
+        html, chapter_id, escapes, dedupe, compact, workskin, profile
+    )
     return new_html, css
 
 
+def generate_translations_with_count(
+    html: str,
+    chapter_id: str,
+    escapes: bool = False,
+    dedupe: bool = False,
+    compact: bool = False,
+    workskin: Optional[str] = None,
+    profile: Profile = DISABLED_PROFILE,
+) -> Tuple[str, str, int]:
+    """
+    Generates hover translations like `generate_translations`, also counting the
+    markers that did not get a new CSS class.
+
+    Args:
+        html (str): The HTML content containing translation markers.
+        chapter_id (str): The chapter ID used for generating unique CSS class names.
+        escapes (bool): Whether backslash escapes are read.
+        dedupe (bool): Whether identical pairs share one CSS class.
+        compact (bool): Whether the shared hover declarations are written once.
+        workskin (Optional[str]): An existing workskin to update.
+        profile (Profile): Records what each stage of the generation costs, counting
+            translation pairs as nodes.
+
+    Returns:
+        Tuple[str, str, int]: The modified HTML string, the generated CSS styles and
+        the number of markers that shared the class of an identical earlier pair or
+        reused one of the workskin.
+    """
+    html_out, css_out = io.StringIO(), io.StringIO()
+    _, deduplicated = write_translations(
+        [html],
+        chapter_id,
+        html_out,
+        css_out,
+        escapes,
+        dedupe,
+        compact,
+        workskin,
+        profile,
+    )
+    return html_out.getvalue(), css_out.getvalue(), deduplicated
+
+
+def generate_translations_zip(
+    file: FileStorage,
+    chapter_id: str,
+    escapes: bool = False,
+    dedupe: bool = False,
+    compact: bool = False,
+    workskin: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Generates hover translations for an uploaded HTML file as a zip holding the new
+    HTML and the CSS, streamed as the markers are replaced.
+
+    The HTML entry is written as it is generated, while the CSS goes to a temporary
+    file (kept in memory up to CSS_SPOOL_MAX_SIZE bytes) and is added after it,
+    so neither is held whole. The upload is checked to be valid UTF-8 before this
+    returns, so the archive is not cut short by a decoding error; the returned
+    iterator still reads the upload, so the request must be open while it runs.
+
+    Args:
+        file (FileStorage): The uploaded HTML file containing translation markers.
+        chapter_id (str): The chapter ID used to generate unique CSS class names.
+        escapes (bool): Whether a backslash before a bracket, brace or backslash
+            makes it plain text (see `markers.iter_markers`).
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
+        compact (bool): Whether the hover declarations every pair shares are
+            written once for the chapter instead of in each pair's rules.
+        workskin (Optional[str]): An existing workskin to update (see
+            `workskin.WorkskinIndex`): pairs it has a class for reuse it, new
+            classes are numbered after the chapter's last one in it, and the CSS
+            is the workskin with the rules of the new classes appended.
+
+    Raises:
+        InvalidHTMLFile: If the uploaded file cannot be read or decoded as UTF-8.
+
+    Returns:
+        Iterator[bytes]: The zip archive, in chunks.
+    """
+    for _ in iter_uploaded_html_file(file):
+        pass
+
+    file.stream.seek(0)
+    stem = posixpath.splitext(posixpath.basename(file.filename or ""))[0]
+    return _stream_translations_zip(
+        file, chapter_id, escapes, dedupe, compact, workskin, stem or "chapter"
+    )
+
+
+def _stream_translations_zip(
+    file: FileStorage,
+    chapter_id: str,
+    escapes: bool,
+    dedupe: bool,
+    compact: bool,
+    workskin: Optional[str],
+    stem: str,
+) -> Iterator[bytes]:
+    archive = ZipStream()
+
+    with tempfile.SpooledTemporaryFile(
+        CSS_SPOOL_MAX_SIZE, "w+", encoding="utf-8", newline=""
+    ) as css_out:
+        html_chunks = iter_translations(
+            iter_uploaded_html_file(file),
+            chapter_id,
+            css_out,
+            escapes,
+            dedupe,
+            compact,
+            workskin,
+        )
+        yield from archive.add_chunks(stem + TRANSLATED_FILE_SUFFIX, html_chunks)
+
+        css_out.seek(0)
+        css_chunks = iter(lambda: css_out.read(64 * 1024), "")
+        yield from archive.add_chunks(stem + WORKSKIN_FILE_SUFFIX, css_chunks)
+
+    yield archive.close()
+
+
+class PairNumbering:
+    """
+    Numbers the translation markers of a chapter in order, and the CSS classes they
+    use. Every marker gets its own class unless pairs are deduplicated, in which case
+    identical (original, translated) pairs share the class of their first occurrence,
+    so classes are numbered in order of each distinct pair's first occurrence.
+
+    Attributes:
+        markers (int): The number of markers numbered so far.
+        classes (int): The number of classes handed out so far.
+    """
+
+    __slots__ = ("markers", "classes", "_first_index", "_pair_classes")
+
+    def __init__(self, dedupe: bool = False, first_index: int = 1):
+        self.markers = 0
+        self.classes = 0
+        self._first_index = first_index
+        self._pair_classes: Optional[Dict[Tuple[str, str], int]] = (
+            {} if dedupe else None
+        )
+
+    @property
+    def deduplicated(self) -> int:
+        """
+        The number of markers that did not get a new class, because they shared the
+        class of an identical earlier pair or reused one defined elsewhere.
+        """
+        return self.markers - self.classes
+
+    def number(self, pair: Tuple[str, str]) -> Tuple[int, int, bool]:
+        """
+        Numbers the next marker.
+
+        Args:
+            pair (Tuple[str, str]): The marker's original and translated text.
+
+        Returns:
+            Tuple[int, int, bool]: The marker's number, its class's number, and
+            whether the class is new and so needs its CSS written.
+        """
+        self.markers += 1
+
+        if self._pair_classes is not None:
+            index = self._pair_classes.get(pair)
+
+            if index is not None:
+                return self.markers, index, False
+
+            self._pair_classes[pair] = self._first_index + self.classes
+
+        self.classes += 1
+        return self.markers, self._first_index + self.classes - 1, True
+
+    def reuse(self) -> int:
+        """
+        Numbers the next marker, whose class is defined elsewhere, such as in an
+        existing workskin.
+
+        Returns:
+            int: The marker's number.
+        """
+        self.markers += 1
+        return self.markers
+
+
+def write_translations(
+    chunks: Iterable[str],
+    chapter_id: str,
+    html_out: TextIO,
+    css_out: TextIO,
+    escapes: bool = False,
+    dedupe: bool = False,
+    compact: bool = False,
+    workskin: Optional[str] = None,
+    profile: Profile = DISABLED_PROFILE,
+) -> Tuple[int, int]:
+    """
+    Replaces translation markers in HTML read in chunks, writing the new HTML and the
+    CSS to two streams as the markers are found.
+
+    Args:
+        chunks (Iterable[str]): The HTML content containing translation markers, in
+            chunks of any size.
+        chapter_id (str): The chapter ID used for generating unique CSS class names.
+        html_out (TextIO): Where to write the modified HTML.
+        css_out (TextIO): Where to write the generated CSS styles.
+        escapes (bool): Whether a backslash before a bracket, brace or backslash
+            makes it plain text (see `markers.iter_markers`).
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
+        compact (bool): Whether the hover declarations every pair shares are
+            written once for the chapter instead of in each pair's rules.
+        workskin (Optional[str]): An existing workskin to update (see
+            `workskin.WorkskinIndex`): pairs it has a class for reuse it, new
+            classes are numbered after the chapter's last one in it, and the CSS
+            is the workskin with the rules of the new classes appended.
+        profile (Profile): Records what the generation costs, counting translation
+            pairs as nodes.
+
+    Returns:
+        Tuple[int, int]: The number of markers replaced, and how many of them shared
+        the class of an identical earlier pair or reused one of the workskin.
+    """
+    index = None if workskin is None else WorkskinIndex(workskin)
+    numbering = _number_pairs(dedupe, chapter_id, index)
+
+    with profile.stage("write_translations") as stage:
+        html_out.writelines(
+            _iter_translations(
+                chunks, chapter_id, css_out, escapes, compact, index, numbering, profile
+            )
+        )
+
+    stage.nodes = numbering.markers
+    return numbering.markers, numbering.deduplicated
+
+
+def iter_translations(
+    chunks: Iterable[str],
+    chapter_id: str,
+    css_out: TextIO,
+    escapes: bool = False,
+    dedupe: bool = False,
+    compact: bool = False,
+    workskin: Optional[str] = None,
+    profile: Profile = DISABLED_PROFILE,
+) -> Iterator[str]:
+    """
+    Replaces translation markers in HTML read in chunks, yielding the new HTML piece
+    by piece and writing each marker's CSS to a stream as it is found.
+
+    The output, joined, is the same as `generate_translations` gives for the joined
+    chunks. A marker only spans a line break when one separates the original from
+    its "[", so text is held back from the last line break that is not followed by
+    "[" onward, and a chunk is scanned as soon as a later one shows where that is.
+
+    HTML with no line breaks to cut at is held back only from the first "{" after
+    the last marker, once more than STREAM_PENDING_MAX_SIZE characters are pending.
+    A "{" followed by more than that many characters is then left as text, so a
+    single-line marker longer than that is not replaced, unlike by
+    `generate_translations`.
+
+    Args:
+        chunks (Iterable[str]): The HTML content containing translation markers, in
+            chunks of any size.
+        chapter_id (str): The chapter ID used for generating unique CSS class names.
+        css_out (TextIO): Where to write the generated CSS styles.
+        escapes (bool): Whether a backslash before a bracket, brace or backslash
+            makes it plain text (see `markers.iter_markers`).
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
+        compact (bool): Whether the hover declarations every pair shares are
+            written once for the chapter instead of in each pair's rules.
+        workskin (Optional[str]): An existing workskin to update (see
+            `workskin.WorkskinIndex`): pairs it has a class for reuse it, new
+            classes are numbered after the chapter's last one in it, and the CSS
+            is the workskin with the rules of the new classes appended.
+        profile (Profile): Checks memory after each chunk.
+
+    Returns:
+        Iterator[str]: The HTML up to and including each replaced marker, then the
+        text after the last one.
+    """
+    index = None if workskin is None else WorkskinIndex(workskin)
+    return _iter_translations(
+        chunks,
+        chapter_id,
+        css_out,
+        escapes,
+        compact,
+        index,
+        _number_pairs(dedupe, chapter_id, index),
+        profile,
+    )
+
+
+def _number_pairs(
+    dedupe: bool, chapter_id: str, workskin: Optional[WorkskinIndex]
+) -> PairNumbering:
+    """
+    Numbers the markers of a chapter, after the chapter's last class in the workskin.
+    """
+    if workskin is None:
+        return PairNumbering(dedupe)
+
+    return PairNumbering(dedupe, workskin.last_index(chapter_id) + 1)
+
+
+def _iter_translations(
+    chunks: Iterable[str],
+    chapter_id: str,
+    css_out: TextIO,
+    escapes: bool,
+    compact: bool,
+    workskin: Optional[WorkskinIndex],
+    numbering: PairNumbering,
+    profile: Profile,
+) -> Iterator[str]:
+    if workskin is not None:
+        css_out.write(workskin.css)
+
+    pending = ""
+
+    for chunk in chunks:
+        if len(pending) > STREAM_PENDING_MAX_SIZE:
+            end = yield from _replace_markers(
+                pending,
+                len(pending),
+                chapter_id,
+                escapes,
+                compact,
+                workskin,
+                numbering,
+                css_out,
+                hold_tail=True,
+            )
+            pending = pending[end:]
+
+        searched = max(len(pending) - 1, 0)
+        pending += chunk
+        end = _find_marker_boundary(pending, searched)
+
+        if end:
+            yield from _replace_markers(
+                pending, end, chapter_id, escapes, compact, workskin, numbering, css_out
+            )
+            pending = pending[end:]
+
+        profile.check_memory()
+
+    yield from _replace_markers(
+        pending,
+        len(pending),
+        chapter_id,
+        escapes,
+        compact,
+        workskin,
+        numbering,
+        css_out,
+    )
+
+
+def _find_marker_boundary(text: str, start: int) -> int:
+    """
+    Finds the last point of the text after `start` that no translation marker can
+    span, which is just past a line break that is not the whitespace before a "[".
+
+    Returns:
+        int: The position, or 0 if there is none.
+    """
+    end = len(text) - 1
+
+    while True:
+        position = text.rfind("\n", start, end)
+
+        if position == -1:
+            return 0
+
+        if text[position + 1] != "[":
+            return position + 1
+
+        end = position
+
+
+def _replace_markers(
+    text: str,
+    end: int,
+    chapter_id: str,
+    escapes: bool,
+    compact: bool,
+    workskin: Optional[WorkskinIndex],
+    numbering: PairNumbering,
+    css_out: TextIO,
+    hold_tail: bool = False,
+) -> Generator[str, None, int]:
+    """
+    Replaces the translation markers in text up to `end`, numbering them and their
+    classes, and writing the CSS block of each new class, separated by line breaks,
+    to `css_out`, after the shared hover rule if the CSS is compact. Markers whose
+    pair has a class in the workskin use it instead.
+
+    With `hold_tail`, the text after the last marker is only yielded up to where a
+    marker may still start once more text is read (see `_find_held_tail`). A marker
+    found in the text is final whatever follows it, since each "{" before it would
+    have found its "[" and "]}" no later than the marker's.
+
+    Returns:
+        int: Where the yielded text ends.
+    """
+    position = 0
+
+    for start, marker_end, original, translated in iter_markers(text, end, escapes):
+        class_str = (
+            None if workskin is None else workskin.find_class(original, translated)
+        )
+
+        if class_str is not None:
+            marker = numbering.reuse()
+        else:
+            marker, index, new_class = numbering.number((original, translated))
+            class_str = CLASS_TEMPLATE.format(chapter_id=chapter_id, index=index)
+
+            if new_class:
+                if numbering.classes > 1:
+                    css_out.write(os.linesep)
+                else:
+                    _start_new_rules(chapter_id, compact, workskin, css_out)
+
+                css_out.write(
+                    _format_css_block(class_str, original, translated, compact)
+                )
+
+        yield text[position:start] + ANCHOR_TEMPLATE.format(
+            anchor_str=CLASS_TEMPLATE.format(chapter_id=chapter_id, index=marker),
+            class_str=class_str,
+            original=original,
+        )
+        position = marker_end
+
+    if hold_tail:
+        end = _find_held_tail(text, position, escapes)
+
+    if position < end:
+        yield text[position:end]
+
+    return end
+
+
+def _find_held_tail(text: str, position: int, escapes: bool) -> int:
+    """
+    Finds where text past its last marker has to be held back for more: at the first
+    "{" that may still start a marker, skipping any with more than
+    STREAM_PENDING_MAX_SIZE characters after it, or else before a trailing run of
+    backslashes, which could escape the next character when escapes are on.
+    """
+    while True:
+        brace = text.find("{", position)
+
+        while escapes and brace != -1 and is_escaped(text, brace):
+            brace = text.find("{", brace + 1)
+
+        if brace == -1:
+            return len(text.rstrip("\\")) if escapes else len(text)
+
+        if len(text) - brace <= STREAM_PENDING_MAX_SIZE:
+            return brace
+
+        position = brace + 1
+
+
+def _start_new_rules(
+    chapter_id: str,
+    compact: bool,
+    workskin: Optional[WorkskinIndex],
+    css_out: TextIO,
+) -> None:
+    """
+    Writes what goes before the CSS block of a chapter's first new class: a line
+    break after the workskin's rules, and the shared hover rule if the CSS is compact
+    and the workskin does not have it already.
+    """
+    if workskin is not None and workskin.css:
+        css_out.write(os.linesep)
+
+    if compact and (workskin is None or not workskin.shares_hover(chapter_id)):
+        css_out.write(shared_hover_css([chapter_id]) + os.linesep)
+
+
 def replace_and_extract_translations(
-    html: str, chapter_id: str
+    html: str, chapter_id: str, escapes: bool = False, dedupe: bool = False
 ) -> Tuple[str, List[Tuple[str, str]]]:
     """
     Replaces translation markers in the HTML with anchor-based span elements and
@@ -59,47 +651,257 @@ def replace_and_extract_translations(
     Args:
         html (str): The HTML content containing translation markers.
         chapter_id (str): The chapter ID used for generating unique class names.
+        escapes (bool): Whether a backslash before a bracket, brace or backslash
+            makes it plain text (see `markers.iter_markers`).
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
 
     Returns:
         Tuple[str, List[Tuple[str, str]]]: A tuple containing the updated HTML with replaced
-        elements and a list of (original, translated) string pairs.
+        elements and a list of (original, translated) string pairs, one per class.
     """
     translation_pairs = []
+    pieces = []
+    position = 0
+    numbering = PairNumbering(dedupe)
+
+    for start, end, original, translated in iter_markers(html, escapes=escapes):
+        marker, idx, new_class = numbering.number((original, translated))
 
-    def replacement(match: Match):
-        original, translated = match.group(1), match.group(2)
-        translation_pairs.append((original, translated))
-        idx = len(translation_pairs)
-        class_str = CLASS_TEMPLATE.format(chapter_id=chapter_id, index=idx)
+        if new_class:
+            translation_pairs.append((original, translated))
 
-        return ANCHOR_TEMPLATE.format(class_str=class_str, original=original)
+        pieces.append(html[position:start])
+        pieces.append(
+            ANCHOR_TEMPLATE.format(
+                anchor_str=CLASS_TEMPLATE.format(chapter_id=chapter_id, index=marker),
+                class_str=CLASS_TEMPLATE.format(chapter_id=chapter_id, index=idx),
+                original=original,
+            )
+        )
+        position = end
 
-    new_html = TRANSLATION_PATTERN.sub(replacement, html)
+    pieces.append(html[position:])
+    new_html = "".join(pieces)
 
     return new_html, translation_pairs
 
 
-def generate_css(pairs: List[Tuple[str, str]], chapter_id: str) -> str:
+def generate_css(
+    pairs: List[Tuple[str, str]],
+    chapter_id: str,
+    dedupe: bool = False,
+    compact: bool = False,
+) -> str:
     """
     Generates CSS rules that toggle between original and translated text on hover/focus.
 
     Args:
         pairs (List[Tuple[str, str]]): A list of (original, translated) string pairs.
         chapter_id (str): The chapter ID used for generating unique CSS class names.
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
+        compact (bool): Whether the hover declarations every pair shares are
+            written once for the chapter instead of in each pair's rules.
 
     Returns:
         str: A string containing the compiled CSS rules.
     """
     css_blocks = []
+    numbering = PairNumbering(dedupe)
+
+    for original, translated in pairs:
+        _, idx, new_class = numbering.number((original, translated))
+
+        if not new_class:
+            continue
 
-    for idx, (original, translated) in enumerate(pairs, 1):
         class_str = f"ch{chapter_id}text{idx}"
-        css_block = CSS_TEMPLATE.format(
-            class_str=class_str,
-            original=escape_character(original, '"'),
-            translated=escape_character(translated, '"'),
-        )
+        css_block = _format_css_block(class_str, original, translated, compact)
 
         css_blocks.append(css_block)
 
+    if compact and css_blocks:
+        css_blocks.insert(0, shared_hover_css([chapter_id]))
+
     return os.linesep.join(css_blocks)
+
+
+def shared_hover_css(chapter_ids: Iterable[str]) -> str:
+    """
+    Builds the rule giving the hover declarations to every class of some chapters at
+    once, for compact CSS.
+
+    Args:
+        chapter_ids (Iterable[str]): The chapters whose classes the rule matches.
+
+    Returns:
+        str: The CSS rule.
+    """
+    selectors = ",\n".join(
+        SHARED_HOVER_SELECTOR_TEMPLATE.format(chapter_id=chapter_id)
+        for chapter_id in chapter_ids
+    )
+    return f"{selectors} {{\n{HOVER_DECLARATIONS}}}\n"
+
+
+def _format_css_block(
+    class_str: str, original: str, translated: str, compact: bool
+) -> str:
+    """
+    Builds the CSS rules of a class, leaving out the shared hover declarations if
+    the CSS is compact.
+    """
+    return (COMPACT_CSS_TEMPLATE if compact else CSS_TEMPLATE).format(
+        class_str=class_str,
+        original=escape_character(original, '"'),
+        translated=escape_character(translated, '"'),
+    )
+
+
+def generate_work_translations(
+    chapters: List[Tuple[str, str]],
+    escapes: bool = False,
+    compact: bool = False,
+    workers: int = 1,
+    profile: Profile = DISABLED_PROFILE,
+) -> Tuple[List[str], str, int]:
+    """
+    Generates hover translations for every chapter of a work at once, with a single
+    workskin shared by all of them.
+
+    Identical pairs share one CSS class across the whole work, so the workskin only
+    grows with the number of distinct pairs and not with the number of chapters. A
+    pair's class is named after the chapter it first appears in, numbered in order
+    of the new pairs of that chapter, so the first chapter's output is the same as
+    `generate_translations` gives it with deduplicated pairs, and adding a chapter
+    at the end of a work leaves the earlier classes as they were. Anchor IDs are
+    numbered per chapter as usual.
+
+    The chapters are scanned for their pairs in a pool of processes, the classes are
+    handed out in chapter order, and the chapters are then rendered in the pool.
+    Works of a single chapter or of fewer than WORK_PARALLEL_MIN_SIZE characters in
+    all are handled in the calling process.
+
+    Args:
+        chapters (List[Tuple[str, str]]): The (chapter ID, HTML) of each chapter, in
+            order. The chapter IDs must be distinct.
+        escapes (bool): Whether a backslash before a bracket, brace or backslash
+            makes it plain text (see `markers.iter_markers`).
+        compact (bool): Whether the hover declarations every pair shares are
+            written once for the work instead of in each pair's rules.
+        workers (int): The number of worker processes for large works; 1 handles
+            every chapter in the calling process.
+        profile (Profile): Records what each stage of the generation costs,
+            counting translation pairs as nodes.
+
+    Returns:
+        Tuple[List[str], str, int]: The modified HTML of each chapter, in order, the
+        CSS for the whole work and the number of markers that shared the class of
+        an identical earlier pair.
+    """
+    htmls = [html for _, html in chapters]
+    in_pool = (
+        workers > 1
+        and len(htmls) > 1
+        and sum(len(html) for html in htmls) >= WORK_PARALLEL_MIN_SIZE
+    )
+    run = get_executor(workers).map if in_pool else map
+
+    with profile.stage("collect_pairs") as stage:
+        collected = list(run(_collect_pairs, htmls, repeat(escapes)))
+
+    stage.nodes = markers = sum(count for _, count in collected)
+    pair_classes: Dict[Tuple[str, str], str] = {}
+    css_blocks = []
+    chapter_classes = []
+    # the chapters that named classes, which the shared hover rule has to match
+    new_class_chapters = []
+
+    with profile.stage("number_classes") as stage:
+        for (chapter_id, _), (pairs, _) in zip(chapters, collected):
+            classes = {}
+            index = 0
+
+            for pair in pairs:
+                class_str = pair_classes.get(pair)
+
+                if class_str is None:
+                    index += 1
+                    class_str = pair_classes[pair] = CLASS_TEMPLATE.format(
+                        chapter_id=chapter_id, index=index
+                    )
+                    css_blocks.append(_format_css_block(class_str, *pair, compact))
+
+                classes[pair] = class_str
+
+            chapter_classes.append(classes)
+
+            if index:
+                new_class_chapters.append(chapter_id)
+
+    stage.nodes = classes_count = len(css_blocks)
+
+    if compact and css_blocks:
+        css_blocks.insert(0, shared_hover_css(new_class_chapters))
+
+    with profile.stage("render_chapters") as stage:
+        new_htmls = list(
+            run(
+                _render_chapter,
+                htmls,
+                [chapter_id for chapter_id, _ in chapters],
+                repeat(escapes),
+                chapter_classes,
+            )
+        )
+
+    stage.nodes = markers
+    return new_htmls, os.linesep.join(css_blocks), markers - classes_count
+
+
+def _collect_pairs(html: str, escapes: bool) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    Finds the distinct pairs of a chapter in order of first occurrence, and counts
+    its markers.
+    """
+    pairs = {}
+    markers = 0
+
+    for _, _, original, translated in iter_markers(html, escapes=escapes):
+        pairs[(original, translated)] = None
+        markers += 1
+
+    return list(pairs), markers
+
+
+def _render_chapter(
+    html: str,
+    chapter_id: str,
+    escapes: bool,
+    classes: Dict[Tuple[str, str], str],
+) -> str:
+    """
+    Replaces the translation markers of a chapter, giving each the class its pair
+    was handed.
+    """
+    pieces = []
+    position = 0
+
+    for marker, (start, end, original, translated) in enumerate(
+        iter_markers(html, escapes=escapes), 1
+    ):
+        pieces.append(html[position:start])
+        pieces.append(
+            ANCHOR_TEMPLATE.format(
+                anchor_str=CLASS_TEMPLATE.format(chapter_id=chapter_id, index=marker),
+                class_str=classes[(original, translated)],
+                original=original,
+            )
+        )
+        position = end
+
+    pieces.append(html[position:])
+    return "".join(pieces)
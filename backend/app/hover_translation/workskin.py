@@ -0,0 +1,91 @@
+import re
+from typing import Dict, Optional, Tuple
+
+from .utils import escape_character
+
+# the rules giving a class its original and its translation, in the full and the
+# compact CSS alike; the spacing is loose, since a saved workskin may be reformatted
+CONTENT_PATTERN = r'\{\s*content:\s*"((?:[^"\\\n]|\\.)*)"\s*;'
+ORIGINAL_RULE_PATTERN = re.compile(
+    r"#workskin\s+a\.([\w-]+):after\s*" + CONTENT_PATTERN
+)
+TRANSLATED_RULE_PATTERN = re.compile(
+    r"#workskin\s+a\.([\w-]+):hover:after\s*,\s*#workskin\s+a\.\1:focus:after\s*"
+    + CONTENT_PATTERN
+)
+SHARED_HOVER_PATTERN = re.compile(r'#workskin\s+a\[class\^="ch(\w+)text"\]:hover:after')
+CLASS_NAME_PATTERN = re.compile(r"ch(\w+)text(\d+)")
+
+
+class WorkskinIndex:
+    """
+    Indexes the classes an existing workskin defines, so that a revised chapter can
+    reuse the classes of its unchanged pairs and only append rules for new ones.
+
+    A class is reused for a pair when its rules give the same original and
+    translation that the generated rules would, whichever chapter named it. A pair
+    defined by more than one class is looked up by the first.
+
+    Attributes:
+        css (str): The workskin, as given.
+    """
+
+    __slots__ = ("css", "_pair_classes", "_last_indexes", "_shared_chapters")
+
+    def __init__(self, css: str):
+        self.css = css
+        self._pair_classes: Dict[Tuple[str, str], str] = {}
+        self._last_indexes: Dict[str, int] = {}
+        self._shared_chapters = set(SHARED_HOVER_PATTERN.findall(css))
+
+        originals: Dict[str, str] = {}
+        translations: Dict[str, str] = {}
+
+        for match in ORIGINAL_RULE_PATTERN.finditer(css):
+            originals.setdefault(match.group(1), match.group(2))
+
+        for match in TRANSLATED_RULE_PATTERN.finditer(css):
+            translations.setdefault(match.group(1), match.group(2))
+
+        for class_str, original in originals.items():
+            translated = translations.get(class_str)
+
+            if translated is not None:
+                self._pair_classes.setdefault((original, translated), class_str)
+
+        for class_str in originals.keys() | translations.keys():
+            name = CLASS_NAME_PATTERN.fullmatch(class_str)
+
+            if name:
+                chapter_id, index = name.group(1), int(name.group(2))
+                last_index = self._last_indexes.get(chapter_id, 0)
+                self._last_indexes[chapter_id] = max(last_index, index)
+
+    def find_class(self, original: str, translated: str) -> Optional[str]:
+        """
+        Finds the class already defined for a pair.
+
+        Args:
+            original (str): The pair's original text.
+            translated (str): The pair's translated text.
+
+        Returns:
+            Optional[str]: The class, or None if the workskin has none for the pair.
+        """
+        return self._pair_classes.get(
+            (escape_character(original, '"'), escape_character(translated, '"'))
+        )
+
+    def last_index(self, chapter_id: str) -> int:
+        """
+        The highest index of the classes named after a chapter, which new classes of
+        that chapter are numbered after, or 0 if there are none.
+        """
+        return self._last_indexes.get(chapter_id, 0)
+
+    def shares_hover(self, chapter_id: str) -> bool:
+        """
+        Whether the workskin has the rule of compact CSS that gives the hover
+        declarations to every class of a chapter.
+        """
+        return chapter_id in self._shared_chapters
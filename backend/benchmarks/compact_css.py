@@ -0,0 +1,149 @@
+"""
+Checks that compact hover translation CSS gives every class the same declarations as
+the full CSS, on single chapters and on whole works, then compares the size of both
+and the time taken to generate them.
+
+Run from the backend directory:
+    python -m benchmarks.compact_css
+
+Exits with a non-zero status if any class's declarations differ.
+"""
+
+import re
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from app.hover_translation.service import (
+    generate_translations,
+    generate_work_translations,
+)
+
+from .translation_markup import build_translation_html
+
+CHAPTER_ID = "1"
+PARAGRAPHS = 5000
+VOCABULARY_SIZES = [50, 5000]
+WORK_CHAPTERS = 10
+
+RULE_PATTERN = re.compile(r"([^{}]+)\{([^{}]*)\}")
+SELECTOR_PATTERN = re.compile(
+    r'#workskin a(?:\.(?P<class>\w+)|\[class\^="(?P<prefix>\w+)"\]):(?P<state>.+)'
+)
+
+
+def effective_declarations(css: str) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Works out the declarations each class gets in each state, from the rules naming
+    it and the rules matching the start of its name. The hover translation CSS
+    never gives a declaration twice, so the order of the rules does not matter.
+
+    Args:
+        css (str): The CSS.
+
+    Returns:
+        Dict[Tuple[str, str], List[str]]: The sorted declarations of each
+        (class, state) named by a class selector.
+    """
+    by_class: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    by_prefix: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+
+    for match in RULE_PATTERN.finditer(css):
+        declarations = [line.strip() for line in match.group(2).splitlines()]
+        declarations = [declaration for declaration in declarations if declaration]
+
+        for selector in match.group(1).split(","):
+            parts = SELECTOR_PATTERN.fullmatch(selector.strip())
+
+            if parts.group("class"):
+                by_class[(parts.group("class"), parts.group("state"))] += declarations
+            else:
+                by_prefix[(parts.group("prefix"), parts.group("state"))] += declarations
+
+    result = {}
+
+    for class_str, state in list(by_class):
+        declarations = list(by_class[(class_str, state)])
+
+        for (prefix, prefix_state), shared in by_prefix.items():
+            if prefix_state == state and class_str.startswith(prefix):
+                declarations += shared
+
+        result[(class_str, state)] = sorted(declarations)
+
+    return result
+
+
+def compare(name: str, css: str, compact_css: str) -> bool:
+    """
+    Compares the declarations of full and compact CSS, printing their sizes.
+
+    Args:
+        name (str): The input's name, for messages.
+        css (str): The full CSS.
+        compact_css (str): The compact CSS.
+
+    Returns:
+        bool: Whether every class gets the same declarations.
+    """
+    same = effective_declarations(css) == effective_declarations(compact_css)
+
+    if not same:
+        print(f"{name}: compact CSS gives different declarations")
+
+    print(
+        f"{name}: CSS {len(css) // 1024} KiB, compact "
+        f"{len(compact_css) // 1024} KiB ({len(css) / max(len(compact_css), 1):.1f}x)"
+    )
+    return same
+
+
+def timed(run):
+    """
+    Runs a generation and times it.
+
+    Returns:
+        Tuple: What the generation returned, and the wall time in seconds.
+    """
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def main():
+    """
+    Entry point for the compact CSS check and size comparison.
+    """
+    passed = True
+
+    for vocabulary in VOCABULARY_SIZES:
+        html = build_translation_html(PARAGRAPHS, vocabulary=vocabulary)
+
+        for dedupe in (False, True):
+            (_, css), full_time = timed(
+                lambda: generate_translations(html, CHAPTER_ID, dedupe=dedupe)
+            )
+            (_, compact_css), compact_time = timed(
+                lambda: generate_translations(
+                    html, CHAPTER_ID, dedupe=dedupe, compact=True
+                )
+            )
+            name = f"vocabulary {vocabulary}, dedupe={dedupe}"
+            passed = compare(name, css, compact_css) and passed
+            print(f"{name}: generated in {full_time:.2f}s, compact {compact_time:.2f}s")
+
+    chapters = [
+        (str(seed + 1), build_translation_html(500, seed, vocabulary=5000))
+        for seed in range(WORK_CHAPTERS)
+    ]
+    _, css, _ = generate_work_translations(chapters)
+    _, compact_css, _ = generate_work_translations(chapters, compact=True)
+    passed = compare(f"work of {WORK_CHAPTERS} chapters", css, compact_css) and passed
+
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
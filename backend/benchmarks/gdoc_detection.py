@@ -0,0 +1,151 @@
+"""
+Checks that the scanning Google Docs detector agrees with the tree-based check on
+generated exports and on documents that only partly look like them, then times both
+on large documents.
+
+Run from the backend directory:
+    python -m benchmarks.gdoc_detection
+
+Exits with a non-zero status if the two checks disagree on any document.
+"""
+
+import re
+import sys
+import time
+from typing import Callable, List
+
+from bs4 import BeautifulSoup
+
+from app.gdoc_html_cleaner.constants import DEFAULT_PARSER
+from app.gdoc_html_cleaner.utils import is_gdoc_html, is_gdoc_soup
+
+from .gdoc_export import build_gdoc_html
+
+CORPUS_SIZE = 50
+CORPUS_PARAGRAPHS = 60
+LARGE_PARAGRAPH_COUNTS = [1000, 10000]
+REPEATS = 3
+
+STYLE = '<style type="text/css">.c1{font-weight:700}</style>'
+
+
+def strip_c_classes(html: str) -> str:
+    """
+    Renames every 'c' class so no element has one.
+
+    Args:
+        html (str): The HTML document.
+
+    Returns:
+        str: The document with its 'c' classes renamed.
+    """
+    return re.sub(r"\bc(\d+)\b", r"k\1", html)
+
+
+def build_variants(html: str) -> List[str]:
+    """
+    Builds documents that differ from a Google Docs export in the ways the detector
+    has to notice.
+
+    Args:
+        html (str): A generated Google Docs export.
+
+    Returns:
+        List[str]: The variants, including the export itself.
+    """
+    return [
+        html,
+        html.replace("doc-content", "doc-contents", 1),
+        strip_c_classes(html),
+        re.sub(r'<body class="(c\d+) ', '<body class="', html, count=1),
+        re.sub(r"<body[^>]*>", "<body>", html, count=1),
+        html.replace("<body", "<main", 1).replace("</body>", "</main>", 1),
+    ]
+
+
+EDGE_CASES = [
+    "",
+    "<p class='c1'>no body</p>",
+    f"<html><head>{STYLE}</head><body class='doc-content'><p>plain</p></body></html>",
+    f"<html><head>{STYLE}</head><body class='doc-content'></body><p class='c1'>x</p>",
+    "<html><head><meta class='c3'></head><body class='doc-content'>x</body></html>",
+    "<html><body class='other'></body><body class='doc-content c1'></body></html>",
+    "<!-- <body class='doc-content c1'> --><body><p class='c1'>x</p></body>",
+    "<style><body class='doc-content c1'></style><body class=c2>x</body>",
+    "<body class='c1' class='doc-content'><p class='c2'>x</p></body>",
+    "<body class='doc-content' class='other'><p class='c2'>x</p></body>",
+    "<body\nclass='DOC-CONTENT c1'>x</body>",
+    "<body class='doc-content&#32;c1'>x</body>",
+    "<BODY CLASS='doc-content'><P CLASS='c7'>x</P></BODY>",
+    "<body class='doc-content'><br class='c4'/></body>",
+    "<body class='doc-content'><p class='c1x c'>x</p></body>",
+    "<body class='doc-content'><p class='c1",
+]
+
+
+def check_agreement() -> int:
+    """
+    Compares both checks on every generated document, variant and edge case.
+
+    Returns:
+        int: The number of documents the checks disagree on.
+    """
+    documents = list(EDGE_CASES)
+
+    for seed in range(CORPUS_SIZE):
+        documents.extend(build_variants(build_gdoc_html(CORPUS_PARAGRAPHS, seed=seed)))
+
+    disagreements = 0
+
+    for html in documents:
+        expected = is_gdoc_soup(BeautifulSoup(html, DEFAULT_PARSER))
+
+        if is_gdoc_html(html) != expected:
+            print(f"detectors disagree (expected {expected}): {html[:80]!r}")
+            disagreements += 1
+
+    return disagreements
+
+
+def best_time(run: Callable[[], bool]) -> float:
+    """
+    Times a check.
+
+    Args:
+        run (Callable[[], bool]): Runs the check.
+
+    Returns:
+        float: The best wall time in seconds over all repeats.
+    """
+    best = float("inf")
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    """
+    Entry point for the Google Docs detection agreement check and benchmark.
+    """
+    disagreements = check_agreement()
+    print(f"{disagreements} disagreements between the detectors")
+
+    for paragraphs in LARGE_PARAGRAPH_COUNTS:
+        html = build_gdoc_html(paragraphs)
+        tree_time = best_time(lambda: is_gdoc_soup(BeautifulSoup(html, DEFAULT_PARSER)))
+        scan_time = best_time(lambda: is_gdoc_html(html))
+        print(
+            f"{paragraphs} paragraphs ({len(html) // 1024} KiB): "
+            f"tree {tree_time * 1000:.1f}ms, scan {scan_time * 1000:.2f}ms"
+        )
+
+    if disagreements:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Generates synthetic HTML documents shaped like Google Docs "Web page (.html)" exports.
+"""
+
+import random
+from typing import List, Optional
+
+WORDS = (
+    "the quiet river ran past old stone walls while she waited for news "
+    "from the north and the wind carried smoke across empty fields"
+).split()
+
+SPECIAL_TEXT = ["&amp;", "&lt;", "&gt;", "&quot;", "&#39;", "&nbsp;", "é", "“", "”"]
+
+STYLE_PROPERTIES = [
+    "font-weight:700",
+    "font-weight:400",
+    "font-style:italic",
+    "font-style:normal",
+    "text-decoration:underline",
+    "text-decoration:line-through",
+    "text-decoration:none",
+]
+
+ALIGNMENTS = ["left", "center", "right", "justify"]
+
+
+def build_gdoc_html(
+    paragraphs: int,
+    seed: int = 0,
+    class_count: int = 40,
+    max_spans: int = 10,
+    max_run_length: int = 1,
+    target_size: Optional[int] = None,
+) -> str:
+    """
+    Builds a Google Docs style HTML export.
+
+    Args:
+        paragraphs (int): Number of body blocks (mostly \\<p> tags) to generate.
+        seed (int): Seed for the random generator, so documents are reproducible.
+        class_count (int): Number of 'c' classes defined in the stylesheet.
+        max_spans (int): Most inline elements (mostly \\<span> tags) in a paragraph;
+            each paragraph gets between 1 and this many.
+        max_run_length (int): Longest run of adjacent spans sharing the same classes,
+            which the cleaner merges into one tag. 1 gives every span its own classes.
+        target_size (Optional[int]): Size of the document in characters to build up
+            to, overriding `paragraphs` when given. Blocks are added until the
+            document is at least this long.
+
+    Returns:
+        str: The generated HTML document.
+    """
+    rng = random.Random(seed)
+    css = _build_stylesheet(rng, class_count)
+    body: List[str] = []
+    body_size = 0
+
+    while (
+        len(body) < paragraphs
+        if target_size is None
+        else len(css) + body_size < target_size
+    ):
+        block = _build_block(rng, class_count, max_spans, max_run_length)
+        body.append(block)
+        body_size += len(block)
+
+    return (
+        '<html><head><meta content="text/html; charset=UTF-8" http-equiv="content-type">'
+        f'<style type="text/css">{css}</style></head>'
+        f'<body class="c{class_count} doc-content">{"".join(body)}</body></html>'
+    )
+
+
+def _build_stylesheet(rng: random.Random, class_count: int) -> str:
+    """
+    Builds a stylesheet with numbered 'c' classes and the usual Google Docs extras.
+
+    Args:
+        rng (random.Random): The random generator to use.
+        class_count (int): Number of 'c' classes to define.
+
+    Returns:
+        str: The generated CSS.
+    """
+    rules = ["@import url(https://themes.googleusercontent.com/fonts/css?kit=a);"]
+    rules.append('.lst-kix_a-0>li:before{content:"\\0025cf   "}')
+    rules.append("ol{margin:0;padding:0}table td,table th{padding:0}")
+
+    for i in range(class_count + 1):
+        declarations = ["color:#000000", "font-size:11pt", 'font-family:"Arial"']
+        declarations += rng.sample(STYLE_PROPERTIES, rng.randint(0, 2))
+
+        if rng.random() < 0.3:
+            declarations.append(f"text-align:{rng.choice(ALIGNMENTS)}")
+
+        rng.shuffle(declarations)
+        rules.append(f".c{i}{{{';'.join(declarations)}}}")
+
+    rules.append(".title{padding-top:0pt;font-size:26pt}h1{padding-top:20pt}")
+    return "".join(rules)
+
+
+def _build_block(
+    rng: random.Random, class_count: int, max_spans: int, max_run_length: int
+) -> str:
+    """
+    Builds one body block: usually a paragraph, sometimes a heading, list or table.
+
+    Args:
+        rng (random.Random): The random generator to use.
+        class_count (int): Number of 'c' classes defined in the stylesheet.
+        max_spans (int): Most inline elements in a paragraph.
+        max_run_length (int): Longest run of adjacent spans sharing the same classes.
+
+    Returns:
+        str: The generated HTML block.
+    """
+    roll = rng.random()
+    cls = _class_attr(rng, class_count)
+
+    if roll < 0.04:
+        return (
+            f'<h1 class="{cls}" id="h.a"><span class="{cls}">{_text(rng)}</span></h1>'
+        )
+    if roll < 0.07:
+        return (
+            f'<ul class="lst-kix_a-0 start"><li class="{cls} li-bullet-0">'
+            f'<span class="{_class_attr(rng, class_count)}">{_text(rng)}</span></li></ul>'
+        )
+    if roll < 0.09:
+        return (
+            f'<table class="{cls}"><tr><td colspan="1" rowspan="1"><p class="{cls}">'
+            f'<span class="{_class_attr(rng, class_count)}">{_text(rng)}</span></p></td></tr></table>'
+        )
+    if roll < 0.15:
+        return f'<p class="{cls}"><span class="{cls}"></span></p>'
+
+    spans = []
+
+    for _ in range(rng.randint(1, max_spans)):
+        span = _inline(rng, class_count)
+        spans.append(span)
+
+        if max_run_length > 1 and span.startswith("<span"):
+            span_class = span[: span.index(">") + 1]
+            spans.extend(
+                f"{span_class}{_text(rng)}</span>"
+                for _ in range(rng.randint(1, max_run_length) - 1)
+            )
+
+    return f'<p class="{cls}">{"".join(spans)}</p>'
+
+
+def _inline(rng: random.Random, class_count: int) -> str:
+    """
+    Builds one inline element of a paragraph, usually a classed \\<span>.
+
+    Args:
+        rng (random.Random): The random generator to use.
+        class_count (int): Number of 'c' classes defined in the stylesheet.
+
+    Returns:
+        str: The generated inline HTML.
+    """
+    roll = rng.random()
+    cls = _class_attr(rng, class_count)
+
+    if roll < 0.05:
+        return f'<span class="{cls}"><a class="c1" href="https://example.com/?a=1&amp;b=2">{_text(rng)}</a></span>'
+    if roll < 0.07:
+        return (
+            f'<span class="{cls}"><img alt="" src="images/image1.png" title=""></span>'
+        )
+    if roll < 0.09:
+        return '<sup><a href="#ftnt1" id="ftnt_ref1">[1]</a></sup>'
+    if roll < 0.11:
+        return "<br>"
+
+    return f'<span class="{cls}">{_text(rng)}</span>'
+
+
+def _class_attr(rng: random.Random, class_count: int) -> str:
+    """
+    Picks one to three 'c' classes for an element.
+
+    Args:
+        rng (random.Random): The random generator to use.
+        class_count (int): Number of 'c' classes defined in the stylesheet.
+
+    Returns:
+        str: A space-separated class attribute value.
+    """
+    count = rng.choice([1, 1, 2, 2, 3])
+    return " ".join(f"c{rng.randrange(class_count)}" for _ in range(count))
+
+
+def _text(rng: random.Random) -> str:
+    """
+    Builds a run of words, with the occasional entity, accent or newline.
+
+    Args:
+        rng (random.Random): The random generator to use.
+
+    Returns:
+        str: The generated text.
+    """
+    words: List[str] = []
+
+    for _ in range(rng.randint(1, 12)):
+        if rng.random() < 0.08:
+            words.append(rng.choice(SPECIAL_TEXT))
+        else:
+            words.append(rng.choice(WORDS))
+
+        words.append(rng.choice([" ", " ", " ", "", "\n"]))
+
+    return "".join(words)
@@ -0,0 +1,134 @@
+"""
+Checks that incremental cleaning gives the same output as cleaning a tree of the
+whole document with 'html.parser', both on a first clean and after a few paragraphs change, then times
+a re-clean of an edited document against a full clean.
+
+Run from the backend directory:
+    python -m benchmarks.incremental_cleaner
+
+Exits with a non-zero status if any output differs.
+"""
+
+import re
+import sys
+import time
+from typing import Tuple
+
+from app.commons.cache import ResultCache
+from app.gdoc_html_cleaner.constants import DEFAULT_PARSER
+from app.gdoc_html_cleaner.service import clean_html, clean_html_incremental
+
+from .gdoc_export import build_gdoc_html
+from .paragraph_runs import clean_as_tree
+
+CORPUS_SIZE = 50
+CORPUS_PARAGRAPHS = 60
+LARGE_PARAGRAPH_COUNTS = [300, 3000]
+EDITED_PARAGRAPHS = 3
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def edit_paragraphs(html: str, count: int) -> str:
+    """
+    Appends a word to a few paragraphs spread through a document.
+
+    Args:
+        html (str): The HTML document.
+        count (int): The number of paragraphs to edit.
+
+    Returns:
+        str: The edited document.
+    """
+    parts = re.split("(</p>)", html)
+    # every other part is a closing tag, and the last part is what follows the body
+    paragraphs = len(parts) // 2
+    step = max(1, paragraphs // count)
+
+    for index in range(step // 2, paragraphs, step)[:count]:
+        parts[index * 2] += " edited"
+
+    return "".join(parts)
+
+
+def check_equivalence() -> int:
+    """
+    Cleans the corpus incrementally in both formats, before and after an edit, and
+    compares the output.
+
+    Every other document has a character reference without a ';' after each
+    paragraph, so the range of each element ends in one.
+
+    Returns:
+        int: The number of documents whose output differs.
+    """
+    cache = ResultCache(CACHE_MAX_BYTES)
+    mismatches = 0
+
+    for seed in range(CORPUS_SIZE):
+        html = build_gdoc_html(CORPUS_PARAGRAPHS, seed=seed)
+
+        if seed % 2:
+            html = html.replace("</p>", "</p>&copy")
+
+        for compact in (False, True):
+            if any(
+                clean_html_incremental(version, cache, compact)[0]
+                != clean_as_tree(version, compact)
+                for version in (html, edit_paragraphs(html, EDITED_PARAGRAPHS))
+            ):
+                print(f"seed {seed}: incremental output differs (compact={compact})")
+                mismatches += 1
+                break
+
+    return mismatches
+
+
+def time_reclean(html: str) -> Tuple[float, float, int]:
+    """
+    Times a full clean and an incremental re-clean of a document after a few of its
+    paragraphs changed.
+
+    Args:
+        html (str): The HTML document, cleaned once before the edit.
+
+    Returns:
+        Tuple[float, float, int]: The full and incremental wall times in seconds, and
+        the number of reused paragraphs.
+    """
+    cache = ResultCache(CACHE_MAX_BYTES)
+    clean_html_incremental(html, cache)
+    edited = edit_paragraphs(html, EDITED_PARAGRAPHS)
+
+    start = time.perf_counter()
+    clean_html(edited, parser=DEFAULT_PARSER)
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, reused = clean_html_incremental(edited, cache)
+    incremental_time = time.perf_counter() - start
+
+    return full_time, incremental_time, reused
+
+
+def main():
+    """
+    Entry point for the incremental cleaning equivalence check and benchmark.
+    """
+    mismatches = check_equivalence()
+    print(f"{CORPUS_SIZE - mismatches}/{CORPUS_SIZE} documents match incrementally")
+
+    for paragraphs in LARGE_PARAGRAPH_COUNTS:
+        html = build_gdoc_html(paragraphs)
+        full_time, incremental_time, reused = time_reclean(html)
+        print(
+            f"{paragraphs} paragraphs, {EDITED_PARAGRAPHS} edited: "
+            f"full {full_time:.3f}s, incremental {incremental_time:.3f}s "
+            f"({full_time / incremental_time:.1f}x, {reused} reused)"
+        )
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Checks that the hand-written translation marker scanner finds the same markers as
+TRANSLATION_PATTERN, on random strings made of the characters markers are built from
+and on generated chapters, and that its escapes work. Then stress tests both on
+adversarial inputs full of unclosed braces and brackets, checking that the scanner
+stays linear: doubling the input must not much more than double its time.
+
+Run from the backend directory:
+    python -m benchmarks.marker_scanner
+
+Exits with a non-zero status if any markers differ or the scanner is not linear.
+"""
+
+import random
+import sys
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+from app.hover_translation.constants import TRANSLATION_PATTERN
+from app.hover_translation.markers import iter_markers
+
+from .translation_markup import build_translation_html
+
+RANDOM_CASES = 50000
+RANDOM_ALPHABET = "{}[] \n\r\ta]}"
+CHAPTER_COUNT = 20
+REPEATS = 3
+
+# the regex is cubic on most of these, so it is only timed on short inputs
+REGEX_SIZE = 200
+SCANNER_SIZE = 200000
+# how much slower the scanner may get on an input twice as long, unless it is too
+# quick to time reliably
+MAX_DOUBLING_RATIO = 3.0
+MIN_TIMED = 0.01
+
+ADVERSARIAL_INPUTS: Dict[str, Callable[[int], str]] = {
+    "open braces": lambda n: "{" * n,
+    "unclosed markers": lambda n: "{ [" * n,
+    "unclosed translations": lambda n: "{a [b" * n,
+    "one brace, many openings": lambda n: "{" + " [x" * n,
+    "closing brackets without braces": lambda n: "{a [" + "]" * n,
+    "line break openings": lambda n: "{\n[" * n,
+    "closers after a line break": lambda n: "{ [" * n + "\n]}" * n,
+}
+
+ESCAPED_INPUTS: Dict[str, Callable[[int], str]] = {
+    "escaped closers": lambda n: "{a [" + ("\\" * 7 + "]}") * n,
+    "escaped braces": lambda n: "\\{ [" * n,
+}
+
+# (text, pairs found with escapes on)
+ESCAPE_CASES: List[Tuple[str, List[Tuple[str, str]]]] = [
+    ("{a [b \\]} c]}", [("a", "b ]} c")]),
+    ("{a [b \\\\]} c]}", [("a", "b \\")]),
+    ("\\{a [b]} {c [d]}", [("c", "d")]),
+    ("{x \\[y] [z]}", [("x [y]", "z")]),
+    ("{a\\{b\\} [\\[c\\]]}", [("a{b}", "[c]")]),
+    ("{a [b\\]}", []),
+]
+
+
+def regex_markers(text: str, end: int) -> List[Tuple[int, int, str, str]]:
+    """
+    Finds markers with TRANSLATION_PATTERN, in the scanner's form.
+
+    Args:
+        text (str): The text to scan.
+        end (int): Where to stop.
+
+    Returns:
+        List[Tuple[int, int, str, str]]: Each marker's start, end, original and
+        translated text.
+    """
+    return [
+        (match.start(), match.end(), match.group(1), match.group(2))
+        for match in TRANSLATION_PATTERN.finditer(text, 0, end)
+    ]
+
+
+def check_equivalence() -> int:
+    """
+    Scans random strings and generated chapters both ways and compares the markers.
+
+    Returns:
+        int: The number of inputs whose markers differ.
+    """
+    inputs = []
+
+    for seed in range(RANDOM_CASES):
+        rng = random.Random(seed)
+        text = "".join(rng.choices(RANDOM_ALPHABET, k=rng.randint(0, 30)))
+        inputs.append((f"random {seed}", text, rng.randint(0, len(text))))
+
+    for seed in range(CHAPTER_COUNT):
+        text = build_translation_html(200, seed=seed)
+        inputs.append((f"chapter {seed}", text, len(text)))
+
+    mismatches = 0
+
+    for name, text, end in inputs:
+        if list(iter_markers(text, end)) != regex_markers(text, end):
+            print(f"{name}: markers differ for {text[:end]!r}")
+            mismatches += 1
+
+    return mismatches
+
+
+def check_escapes() -> int:
+    """
+    Scans the escape cases with escapes on and compares the pairs found.
+
+    Returns:
+        int: The number of cases whose pairs differ.
+    """
+    mismatches = 0
+
+    for text, expected in ESCAPE_CASES:
+        pairs = [marker[2:] for marker in iter_markers(text, escapes=True)]
+
+        if pairs != expected:
+            print(f"escapes: {text!r} gave {pairs}, expected {expected}")
+            mismatches += 1
+
+    return mismatches
+
+
+def best_time(run: Callable[[], object]) -> float:
+    """
+    Times a call, keeping the best of REPEATS runs.
+
+    Args:
+        run (Callable[[], object]): The call to time.
+
+    Returns:
+        float: The wall time in seconds.
+    """
+    return min(timeit.repeat(run, number=1, repeat=REPEATS))
+
+
+def stress(name: str, build: Callable[[int], str], escapes: bool) -> bool:
+    """
+    Times the scanner on an adversarial input and on one twice as long, and the
+    regex on a short one.
+
+    Args:
+        name (str): The input's name.
+        build (Callable[[int], str]): Builds the input from a repeat count.
+        escapes (bool): Whether to scan with escapes on.
+
+    Returns:
+        bool: Whether the scanner stayed linear.
+    """
+    short = build(REGEX_SIZE)
+    regex = (
+        "-"
+        if escapes
+        else f"{best_time(lambda: regex_markers(short, len(short))):.3f}s"
+    )
+    times = []
+
+    for size in (SCANNER_SIZE, 2 * SCANNER_SIZE):
+        text = build(size)
+        times.append(best_time(lambda: list(iter_markers(text, escapes=escapes))))
+
+    ratio = times[1] / max(times[0], 1e-9)
+    print(
+        f"{name}: regex {regex} on {len(short)} chars, scanner "
+        f"{times[0]:.3f}s on {len(build(SCANNER_SIZE))} chars, "
+        f"{times[1]:.3f}s on twice that ({ratio:.1f}x)"
+    )
+    return ratio <= MAX_DOUBLING_RATIO or times[1] < MIN_TIMED
+
+
+def main():
+    """
+    Entry point for the marker scanner equivalence check and stress test.
+    """
+    mismatches = check_equivalence()
+    total = RANDOM_CASES + CHAPTER_COUNT
+    print(f"{total - mismatches}/{total} inputs give the same markers")
+
+    escape_mismatches = check_escapes()
+    print(
+        f"{len(ESCAPE_CASES) - escape_mismatches}/{len(ESCAPE_CASES)} escape cases "
+        "give the expected pairs"
+    )
+
+    linear = all(
+        [stress(name, build, False) for name, build in ADVERSARIAL_INPUTS.items()]
+        + [stress(name, build, True) for name, build in ESCAPED_INPUTS.items()]
+    )
+
+    if mismatches or escape_mismatches or not linear:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
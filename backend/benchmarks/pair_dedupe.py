@@ -0,0 +1,94 @@
+"""
+Compares the size of the generated workskin CSS with and without deduplicated
+translation pairs, on chapters drawing their markers from vocabularies of different
+sizes, and checks the deduplicated output: every class used in the HTML is defined
+once in the CSS, every anchor ID is still unique, and the reported number of
+deduplicated markers adds up.
+
+Run from the backend directory:
+    python -m benchmarks.pair_dedupe
+
+Exits with a non-zero status if any check fails.
+"""
+
+import re
+import sys
+from collections import Counter
+
+from app.hover_translation.service import (
+    generate_translations,
+    generate_translations_with_count,
+)
+
+from .translation_markup import build_translation_html
+
+CHAPTER_ID = "1"
+PARAGRAPHS = 2000
+VOCABULARY_SIZES = [10, 50, 500, 5000]
+
+ANCHOR_ID_PATTERN = re.compile(r' id="(return[^"]+)"')
+ANCHOR_CLASS_PATTERN = re.compile(r' class="(ch[^"]+)" rel="nofollow"')
+CSS_CLASS_PATTERN = re.compile(r"^#workskin a\.([\w]+):after \{", re.MULTILINE)
+
+
+def check_output(html: str, css: str, deduplicated: int, name: str) -> bool:
+    """
+    Checks that deduplicated output is consistent.
+
+    Args:
+        html (str): The generated HTML.
+        css (str): The generated CSS.
+        deduplicated (int): The reported number of deduplicated markers.
+        name (str): The chapter's name, for messages.
+
+    Returns:
+        bool: Whether every check passed.
+    """
+    anchor_ids = Counter(ANCHOR_ID_PATTERN.findall(html))
+    used_classes = set(ANCHOR_CLASS_PATTERN.findall(html))
+    css_classes = Counter(CSS_CLASS_PATTERN.findall(css))
+    markers = sum(anchor_ids.values())
+    passed = True
+
+    if any(count > 1 for count in anchor_ids.values()):
+        print(f"{name}: anchor IDs repeat")
+        passed = False
+
+    if used_classes != set(css_classes) or any(
+        count > 1 for count in css_classes.values()
+    ):
+        print(f"{name}: classes used and defined differ")
+        passed = False
+
+    if markers - len(css_classes) != deduplicated:
+        print(f"{name}: reported {deduplicated} deduplicated markers")
+        passed = False
+
+    return passed
+
+
+def main():
+    """
+    Entry point for the pair deduplication check and size comparison.
+    """
+    passed = True
+
+    for vocabulary in VOCABULARY_SIZES:
+        html = build_translation_html(PARAGRAPHS, vocabulary=vocabulary)
+        _, css = generate_translations(html, CHAPTER_ID)
+        new_html, deduped_css, deduplicated = generate_translations_with_count(
+            html, CHAPTER_ID, dedupe=True
+        )
+        name = f"vocabulary {vocabulary}"
+        passed = check_output(new_html, deduped_css, deduplicated, name) and passed
+        print(
+            f"{name}: {deduplicated} markers deduplicated, CSS "
+            f"{len(css) // 1024} KiB -> {len(deduped_css) // 1024} KiB"
+        )
+
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Checks that cleaning paragraphs as runs gives the same output as cleaning the whole
+document as an 'html.parser' tree, on generated documents and on hand-written edge
+cases, then compares the time and peak traced memory of both.
+
+Run from the backend directory:
+    python -m benchmarks.paragraph_runs
+
+Exits with a non-zero status if any output differs.
+"""
+
+import random
+import sys
+import timeit
+import tracemalloc
+from typing import Callable, Tuple
+
+from bs4 import BeautifulSoup
+
+from app.gdoc_html_cleaner.constants import DEFAULT_PARSER
+from app.gdoc_html_cleaner.service import (
+    apply_transformations,
+    clean_html_paragraphs,
+    extract_styles,
+    get_cleaned_body_html,
+)
+
+from .gdoc_export import build_gdoc_html
+
+CORPUS_SIZE = 60
+LARGE_PARAGRAPH_COUNTS = [300, 3000]
+REPEATS = 3
+
+EDGE_CASE_CSS = (
+    ".c1{font-weight:700}.c2{font-style:italic}.c3{text-align:center}"
+    ".c4{text-decoration:underline line-through}.c5{color:red}"
+    ".c6{font-weight:700;font-style:italic}"
+)
+
+# bodies that exercise how the tree builder reads and nests a paragraph
+EDGE_CASES = [
+    '<p class="c3 c5"><span class="c1">a</span><span class="c1">b</span></p>',
+    '<p class="c3 x  y"><span class="c6">a</span><span class="c1">b</span></p>',
+    '<p><span class="c5">x</span>t<span class="c5">z</span><span class="c1">y</span></p>',
+    '<p>  \n </p><p></p><p>&nbsp;</p><p><span class="c5"></span></p><p><span class="c1"></span></p>',
+    "<p>a &amp; b &lt; &#147;q&#148; &#x2014; &#128; &#129; &#0; &foo; &nbsp &copy x</p>",
+    "<p>&#x110000;&#99999999; &lt;b&gt;</p>",
+    '<p><span class="c1">a\nb</span>\n<span class="c5">c\n</span></p>',
+    '<p>\r\n<span class="c2">tab\there</span>\t</p>',
+    '<p><span class="c1"><a href="?a=1&amp;b=2" title=\'say "hi"\'>link</a></span>'
+    '<sup><a href="#f" id="r">[1]</a></sup></p>',
+    '<p><a href="#"><span class="c1">in a link</span></a></p>',
+    '<p><span class="c5"><span class="c1">n</span></span><span class="c1"><span class="c2">m</span></span></p>',
+    '<p><span class="c1">a<br>b</span><br/><img src="x.png" alt=""></br><span>c</span></p>',
+    '<p><span class="c1">a<br/>b</span></br></p><p><br></br><br/></p>',
+    "<p><!-- comment --><span>x</span></p>",
+    '<p><span class="c1">a</p></span><p>b</p>',
+    '<p><b>x</b></p><h1 class="c1"><span class="c1">h</span></h1><p class="c1">after</p>',
+    "loose text<p>x</p> more text <p>y</p>",
+    '<p id="a" id="b" class="c1" class="c5 k"><span class="  c1   c2 ">dup</span></p>',
+    '<p dir="ltr" align="left"><span class="c5">a</span></p><p class="c3" align="left">b</p>',
+    '<table><tr><td><p class="c3"><span class="c1">t</span></p></td></tr></table><p>z</p>',
+    '<p><span class="c1">a</span><span>b</span><span class="c1">c</span></p>',
+    '<p><span class="c4">u s</span><span class="c4">2</span></p><hr><p>x</p>',
+    '<p><a download>x</a><span class="">y</span><span class="c1" title="t">z</span></p>',
+    '<p><span/><p/><span class="c1"/>x</p>',
+    "<ul><li>x</li></ul><p>&amp;</p><![CDATA[x]]><p>q</p><?pi x?><p>r</p>",
+    '<p><script>var a="<p>"</script></p><p><style>x</style></p>',
+    '<p><span class="c1">unclosed',
+    '<p>a</p>&copy<p class="c3">b</p>&#169<p>c</p>&#xA9<ul><li>d</li></ul>&not<p>e</p>',
+    "<p>x</p>&amp",
+    '<p data-a&amp;b="1" t&copy;="&amp;amp;"><a h&gt;="1" x&lt;y>l</a></p>',
+]
+
+
+def clean_as_tree(html: str, compact: bool = False) -> str:
+    """
+    Cleans a document by building and transforming a tree of the whole of it.
+
+    Args:
+        html (str): The Google Docs export to clean.
+        compact (bool): Whether to use the compact AO3-paste format.
+
+    Returns:
+        str: The cleaned HTML.
+    """
+    soup = BeautifulSoup(html, DEFAULT_PARSER)
+    apply_transformations(soup, extract_styles(soup))
+    return get_cleaned_body_html(soup, compact)
+
+
+def check_equivalence() -> int:
+    """
+    Cleans the corpus and the edge cases both ways in both formats and compares the
+    output.
+
+    Returns:
+        int: The number of documents whose output differs.
+    """
+    documents = []
+
+    for seed in range(CORPUS_SIZE):
+        rng = random.Random(seed)
+        documents.append(
+            (
+                f"seed {seed}",
+                build_gdoc_html(
+                    rng.randint(1, 200),
+                    seed=seed,
+                    class_count=rng.randint(3, 40),
+                    max_spans=rng.randint(1, 12),
+                    max_run_length=rng.randint(1, 4),
+                ),
+            )
+        )
+
+    for index, body in enumerate(EDGE_CASES):
+        documents.append(
+            (
+                f"edge case {index}",
+                f"<html><head><style>{EDGE_CASE_CSS}</style></head>"
+                f'<body class="c5 doc-content">{body}</body></html>',
+            )
+        )
+
+    mismatches = 0
+
+    for name, html in documents:
+        for compact in (False, True):
+            if clean_html_paragraphs(html, compact) != clean_as_tree(html, compact):
+                print(f"{name}: output differs (compact={compact})")
+                mismatches += 1
+                break
+
+    return mismatches
+
+
+def measure(run: Callable[[], str]) -> Tuple[float, int]:
+    """
+    Times a clean, keeping the best of REPEATS runs, then runs it again with tracing
+    on to find its peak memory.
+
+    Args:
+        run (Callable[[], str]): The clean to measure.
+
+    Returns:
+        Tuple[float, int]: The wall time in seconds and the peak traced bytes.
+    """
+    seconds = min(timeit.repeat(run, number=1, repeat=REPEATS))
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak
+
+
+def main():
+    """
+    Entry point for the paragraph run equivalence check and benchmark.
+    """
+    mismatches = check_equivalence()
+    total = CORPUS_SIZE + len(EDGE_CASES)
+    print(f"{total - mismatches}/{total} documents match as paragraph runs")
+
+    for paragraphs in LARGE_PARAGRAPH_COUNTS:
+        html = build_gdoc_html(paragraphs)
+        tree_time, tree_peak = measure(lambda: clean_as_tree(html))
+        runs_time, runs_peak = measure(lambda: clean_html_paragraphs(html))
+        print(
+            f"{paragraphs} paragraphs: tree {tree_time:.3f}s "
+            f"{tree_peak / 1024 / 1024:.1f} MiB, runs {runs_time:.3f}s "
+            f"{runs_peak / 1024 / 1024:.1f} MiB ({tree_time / runs_time:.1f}x faster, "
+            f"{tree_peak / runs_peak:.1f}x less memory)"
+        )
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
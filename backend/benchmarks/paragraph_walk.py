@@ -0,0 +1,170 @@
+"""
+Checks that applying the paragraph rules in one walk of the tree gives the same
+output as the whole-document passes it replaced, on generated documents and on
+documents with nested paragraphs, then compares the time of both.
+
+Run from the backend directory:
+    python -m benchmarks.paragraph_walk
+
+Exits with a non-zero status if any output differs.
+"""
+
+import random
+import sys
+import timeit
+
+from bs4 import BeautifulSoup
+
+from app.gdoc_html_cleaner.constants import DEFAULT_PARSER
+from app.gdoc_html_cleaner.service import (
+    apply_paragraph_alignment,
+    apply_transformations,
+    consolidate_spans_in_paragraphs,
+    ensure_nonempty_paragraphs,
+    extract_styles,
+    get_cleaned_body_html,
+    merge_similar_adjacent_semantic_tags,
+    replace_spans_with_semantic_tags,
+    strip_paragraph_newlines,
+)
+
+from .gdoc_export import build_gdoc_html
+
+CORPUS_SIZE = 40
+PARAGRAPH_COUNTS = [500, 3000]
+REPEATS = 3
+
+NESTED_CASE_CSS = (
+    ".c0{font-weight:700}.c1{font-style:italic}.c3{text-align:center}"
+    ".c4{text-decoration:underline}.c5{font-weight:400}"
+)
+
+# 'html.parser' does not close a <p> when another one opens, so exports edited by
+# hand can nest paragraphs in paragraphs, and in the divs and spans inside them
+NESTED_CASES = [
+    '<p class="c3">a<p class="c3"><span class="c0">b</span></p></p>',
+    '<p class="c3">a<p class="c3"></p></p>',
+    '<p class="c3">a<p></p><p class="c3">  </p>z</p>',
+    '<p class="c3">a<div><p class="c3"><span class="c1">x</span><span class="c1">y</span></p></div></p>',
+    '<p class="c3"><span class="c0">a<p class="c3"><span class="c1">i</span></p></span></p>',
+    '<p><span class="c5">a<p class="c3"><span class="c1">i</span>\nz</p></span>t</p>',
+    '<span class="c0">out<p class="c3"><span class="c1">i</span></p></span><p>x</p>',
+    '<span class="c5">out<p class="c3"><span class="c1">i</span></p></span>',
+    '<div><span class="c0"><p class="c3"></p></span></div>',
+    '<p class="c3">a<p class="c3">b<p class="c3"><span class="c0">c</span><span class="c0">d</span></p></p></p>',
+    '<p class="c3">unclosed<p class="c3"><span class="c0">b</span>',
+    '<p><span class="c0">x</span><p><span class="c0">y</span></p><span class="c0">z</span></p>',
+    '<p><span>flat<p class="c3">gone</p></span></p>',
+    '<p><span class="c1"><span class="c0">k<p class="c3"><span class="c0">m</span></p></span></span></p>',
+    '<p><p class="c2"><span class="c6"><!-- x --></span></p>',
+    '<p class="c3"><span class="c6">s</span><p class="c3"><span class="c6">a</span><span class="c0">b</span></p><span class="c6">c</span></p>',
+]
+
+
+def clean_in_passes(html: str) -> str:
+    """
+    Cleans a document by running each transformation over the whole document before
+    the next one, as `apply_transformations` did before it walked the tree once.
+
+    Args:
+        html (str): The Google Docs export to clean.
+
+    Returns:
+        str: The cleaned HTML.
+    """
+    soup = BeautifulSoup(html, DEFAULT_PARSER)
+    class_styles = extract_styles(soup)
+    apply_paragraph_alignment(soup, class_styles)
+    replace_spans_with_semantic_tags(soup, class_styles)
+    merge_similar_adjacent_semantic_tags(soup)
+    consolidate_spans_in_paragraphs(soup)
+    strip_paragraph_newlines(soup)
+    ensure_nonempty_paragraphs(soup)
+    return get_cleaned_body_html(soup)
+
+
+def clean_in_one_walk(html: str) -> str:
+    """
+    Cleans a document with `apply_transformations`.
+
+    Args:
+        html (str): The Google Docs export to clean.
+
+    Returns:
+        str: The cleaned HTML.
+    """
+    soup = BeautifulSoup(html, DEFAULT_PARSER)
+    apply_transformations(soup, extract_styles(soup))
+    return get_cleaned_body_html(soup)
+
+
+def check_equivalence() -> int:
+    """
+    Cleans the corpus and the nested cases both ways and compares the output.
+
+    Returns:
+        int: The number of documents whose output differs.
+    """
+    documents = []
+
+    for seed in range(CORPUS_SIZE):
+        rng = random.Random(seed)
+        documents.append(
+            (
+                f"seed {seed}",
+                build_gdoc_html(
+                    rng.randint(1, 200),
+                    seed=seed,
+                    class_count=rng.randint(3, 40),
+                    max_spans=rng.randint(1, 12),
+                    max_run_length=rng.randint(1, 4),
+                ),
+            )
+        )
+
+    for index, body in enumerate(NESTED_CASES):
+        documents.append(
+            (
+                f"nested case {index}",
+                f"<html><head><style>{NESTED_CASE_CSS}</style></head>"
+                f'<body class="doc-content">{body}</body></html>',
+            )
+        )
+
+    mismatches = 0
+
+    for name, html in documents:
+        if clean_in_one_walk(html) != clean_in_passes(html):
+            print(f"{name}: output differs")
+            mismatches += 1
+
+    return mismatches
+
+
+def main():
+    """
+    Entry point for the paragraph walk equivalence check and benchmark.
+    """
+    mismatches = check_equivalence()
+    total = CORPUS_SIZE + len(NESTED_CASES)
+    print(f"{total - mismatches}/{total} documents match in one walk")
+
+    for paragraphs in PARAGRAPH_COUNTS:
+        html = build_gdoc_html(paragraphs)
+        passes_time = min(
+            timeit.repeat(lambda: clean_in_passes(html), number=1, repeat=REPEATS)
+        )
+        walk_time = min(
+            timeit.repeat(lambda: clean_in_one_walk(html), number=1, repeat=REPEATS)
+        )
+        print(
+            f"{paragraphs} paragraphs: passes {passes_time:.3f}s, "
+            f"one walk {walk_time:.3f}s ({passes_time / walk_time:.2f}x faster)"
+        )
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
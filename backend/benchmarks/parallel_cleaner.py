@@ -0,0 +1,145 @@
+"""
+Checks that paragraph-parallel cleaning gives the same output as cleaning a tree of
+the whole document with 'html.parser', then times it against the number of worker processes on documents of
+10k+ paragraphs.
+
+Run from the backend directory:
+    python -m benchmarks.parallel_cleaner
+
+Exits with a non-zero status if any output differs. The speedup is bounded by the
+number of cores, which is printed first.
+"""
+
+import os
+import sys
+import time
+from typing import List
+
+from app.commons.executors import get_executor
+from app.gdoc_html_cleaner.constants import DEFAULT_PARSER
+from app.gdoc_html_cleaner.service import clean_html, clean_html_parallel
+
+from .gdoc_export import build_gdoc_html
+from .paragraph_runs import clean_as_tree
+
+CORPUS_SIZE = 50
+CORPUS_PARAGRAPHS = 60
+CORPUS_WORKERS = [2, 5]
+LARGE_PARAGRAPH_COUNTS = [10000, 20000]
+REPEATS = 2
+
+
+def worker_counts() -> List[int]:
+    """
+    Lists the worker counts to time: powers of two up to the number of cores.
+
+    Returns:
+        List[int]: The worker counts, starting with 2.
+    """
+    cores = os.cpu_count() or 1
+    counts = [2]
+
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+
+    if cores > counts[-1]:
+        counts.append(cores)
+
+    return counts
+
+
+def check_equivalence() -> int:
+    """
+    Cleans the corpus in parallel in both formats and compares the output.
+
+    Every other document has a character reference without a ';' after each
+    paragraph, so ranges are cut right after one.
+
+    Returns:
+        int: The number of documents whose output differs.
+    """
+    mismatches = 0
+
+    for seed in range(CORPUS_SIZE):
+        html = build_gdoc_html(CORPUS_PARAGRAPHS, seed=seed)
+
+        if seed % 2:
+            html = html.replace("</p>", "</p>&copy")
+
+        for compact in (False, True):
+            expected = clean_as_tree(html, compact)
+
+            if any(
+                clean_html_parallel(html, compact, workers) != expected
+                for workers in CORPUS_WORKERS
+            ):
+                print(f"seed {seed}: parallel output differs (compact={compact})")
+                mismatches += 1
+                break
+
+    return mismatches
+
+
+def time_clean(html: str, workers: int) -> float:
+    """
+    Times a clean of a document with a number of worker processes.
+
+    Args:
+        html (str): The HTML document to clean.
+        workers (int): The number of worker processes, or 1 to clean in this process.
+
+    Returns:
+        float: The best wall time in seconds over all repeats.
+    """
+    if workers > 1:
+        # start the pool's processes before timing
+        clean_html_parallel(build_gdoc_html(100), workers=workers)
+
+    best = float("inf")
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+
+        if workers > 1:
+            clean_html_parallel(html, workers=workers)
+        else:
+            clean_html(html, parser=DEFAULT_PARSER)
+
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    """
+    Entry point for the parallel cleaning equivalence check and benchmark.
+    """
+    print(f"Cores: {os.cpu_count()}")
+
+    mismatches = check_equivalence()
+    print(f"{CORPUS_SIZE - mismatches}/{CORPUS_SIZE} documents match in parallel")
+
+    for paragraphs in LARGE_PARAGRAPH_COUNTS:
+        html = build_gdoc_html(paragraphs)
+        baseline = time_clean(html, 1)
+        timings = [f"1 worker {baseline:.2f}s"]
+
+        for workers in worker_counts():
+            seconds = time_clean(html, workers)
+            timings.append(
+                f"{workers} workers {seconds:.2f}s ({baseline / seconds:.1f}x)"
+            )
+
+        print(
+            f"{paragraphs} paragraphs ({len(html) // 1024} KiB): {', '.join(timings)}"
+        )
+
+    for workers in worker_counts():
+        get_executor(workers).shutdown()
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
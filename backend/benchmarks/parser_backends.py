@@ -0,0 +1,170 @@
+"""
+Checks that every installed parser backend cleans a corpus of Google Docs style exports
+and edge cases to the same output as 'html.parser', prints the edge cases on which the
+backends are known to differ, then times each backend on large documents.
+
+Run from the backend directory:
+    python -m benchmarks.parser_backends
+
+Exits with a non-zero status if any backend's output differs.
+"""
+
+import sys
+import time
+from typing import List
+
+from app.gdoc_html_cleaner.constants import DEFAULT_PARSER, FAST_PARSERS
+from app.gdoc_html_cleaner.service import clean_html
+from app.gdoc_html_cleaner.utils import resolve_parser
+
+from .gdoc_export import build_gdoc_html
+
+CORPUS_SIZE = 50
+CORPUS_PARAGRAPHS = 60
+LARGE_PARAGRAPH_COUNTS = [2000, 10000]
+REPEATS = 3
+
+EDGE_CASE_CSS = ".c1{font-weight:700}.c3{text-align:center}"
+
+EDGE_CASES = [
+    '<p class="c3">a\nb<span class="c1">x\ny</span>\n</p>',
+    '<p class="c3">a</p></body><body class="c5"><p>b</p>',
+    '<p class="c3">a</p></body></html><p class="c3">after</p>',
+]
+
+# lxml repairs markup as browsers do, where html.parser keeps it as written (see
+# `utils.resolve_parser`)
+KNOWN_DIFFERENCES = [
+    '<p class="c3">a\r\nb<span class="c1">x\r\ny</span>\r\n</p><p>c\rd</p>',
+    '<p class="c3">a</p><body><p class="c3">b</p></body>',
+    '<p class="c3">unclosed<p>next',
+    '<p>a<p class="c3">nested</p>after</p><div><p>b<div>block</div></p></div>',
+    '<p class="c3">a</p><textarea><b>x</b></textarea>',
+    '<p class="c3">a</p><?pi x?><![CDATA[x]]><p>b</p>',
+    '<p class="c3">x &notit; y</p>&notit;',
+]
+
+
+def installed_backends() -> List[str]:
+    """
+    Lists the parser backends that are installed, starting with the default one.
+
+    Returns:
+        List[str]: The names of the installed parser backends.
+    """
+    return [DEFAULT_PARSER] + [p for p in FAST_PARSERS if resolve_parser(p) == p]
+
+
+def edge_case_html(body: str) -> str:
+    """
+    Wraps an edge case's body in a Google Docs style export.
+
+    Args:
+        body (str): The contents of \\<body>.
+
+    Returns:
+        str: The HTML document.
+    """
+    return (
+        f"<html><head><style>{EDGE_CASE_CSS}</style></head>"
+        f'<body class="doc-content">{body}</body></html>'
+    )
+
+
+def check_equivalence(backends: List[str]) -> int:
+    """
+    Cleans the corpus and the edge cases with every backend and compares the output to
+    the default backend.
+
+    Args:
+        backends (List[str]): The parser backends to compare.
+
+    Returns:
+        int: The number of documents whose output differs for at least one backend.
+    """
+    documents = [
+        (f"seed {seed}", build_gdoc_html(CORPUS_PARAGRAPHS, seed=seed))
+        for seed in range(CORPUS_SIZE)
+    ]
+    documents += [
+        (f"edge case {index}", edge_case_html(body))
+        for index, body in enumerate(EDGE_CASES)
+    ]
+    mismatches = 0
+
+    for name, html in documents:
+        expected = clean_html(html, parser=DEFAULT_PARSER)
+
+        for backend in backends[1:]:
+            if clean_html(html, parser=backend) != expected:
+                print(f"{name}: output from '{backend}' differs")
+                mismatches += 1
+                break
+
+    return mismatches
+
+
+def print_known_differences(backends: List[str]) -> None:
+    """
+    Prints the output of every backend for the edge cases they are known to differ on.
+
+    Args:
+        backends (List[str]): The parser backends to compare.
+    """
+    for index, body in enumerate(KNOWN_DIFFERENCES):
+        html = edge_case_html(body)
+        print(f"known difference {index}: {body!r}")
+
+        for backend in backends:
+            print(f"  {backend}: {clean_html(html, parser=backend)!r}")
+
+
+def time_backend(html: str, backend: str) -> float:
+    """
+    Times a full clean of a document with one backend.
+
+    Args:
+        html (str): The HTML document to clean.
+        backend (str): The parser backend to use.
+
+    Returns:
+        float: The best wall time in seconds over all repeats.
+    """
+    best = float("inf")
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        clean_html(html, parser=backend)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    """
+    Entry point for the parser backend equivalence check and benchmark.
+    """
+    backends = installed_backends()
+    print(f"Installed backends: {', '.join(backends)}")
+
+    mismatches = check_equivalence(backends)
+    total = CORPUS_SIZE + len(EDGE_CASES)
+    print(f"{total - mismatches}/{total} documents match across backends")
+    print_known_differences(backends)
+
+    for paragraphs in LARGE_PARAGRAPH_COUNTS:
+        html = build_gdoc_html(paragraphs)
+        times = {backend: time_backend(html, backend) for backend in backends}
+        baseline = times[DEFAULT_PARSER]
+        summary = ", ".join(
+            f"{backend} {seconds:.3f}s ({baseline / seconds:.1f}x)"
+            for backend, seconds in times.items()
+        )
+        print(f"{paragraphs} paragraphs ({len(html) // 1024} KiB): {summary}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
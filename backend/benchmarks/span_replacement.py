@@ -0,0 +1,195 @@
+"""
+Checks that replacing styled \\<span> tags by moving their children gives the same
+output as the previous approach of serializing and re-parsing each span's contents,
+then compares the time of both.
+
+Run from the backend directory:
+    python -m benchmarks.span_replacement
+
+Exits with a non-zero status if any output differs.
+"""
+
+import sys
+import time
+from typing import Callable
+
+from bs4 import BeautifulSoup
+
+from app.gdoc_html_cleaner.serializer import serialize_body
+from app.gdoc_html_cleaner.service import (
+    extract_styles,
+    replace_spans_with_semantic_tags,
+)
+from app.gdoc_html_cleaner.stylesheet import ClassStyleTable
+
+STYLE = (
+    ".c0{font-weight:400;font-style:normal}"
+    ".c1{font-style:italic}"
+    ".c2{font-weight:700}"
+    ".c3{text-decoration:underline}"
+    ".c4{padding-top:0pt;text-align:left}"
+)
+
+PARAGRAPH_COUNTS = [100, 500, 2000]
+SPANS_PER_PARAGRAPH = 20
+REPEATS = 3
+
+# a <br/> after a <br> leaves the second one open, so the text after it becomes its
+# children, which the re-parse put next to it
+EDGE_CASES = [
+    '<p class="c4"><span class="c2">a<br>b<br/>c</span></p>',
+    '<p><span class="c2">a<br>b<br/><span class="c1">c</span>d</span>e</p>',
+    '<p><span class="c1 c3"><br><br/>x<br/>y</span><span class="c1">z</span></p>',
+    '<p><span class="c0">a<br>b<br/>c</span><span class="c2">d<img>e<img/>f</span></p>',
+]
+
+
+def build_span_dense_html(paragraphs: int, spans_per_paragraph: int) -> str:
+    """
+    Builds a Google Docs style export where most spans map to a semantic tag.
+
+    Args:
+        paragraphs (int): Number of \\<p> tags to generate.
+        spans_per_paragraph (int): Number of \\<span> tags in each paragraph.
+
+    Returns:
+        str: The generated HTML document.
+    """
+    span_classes = ["c1", "c2", "c1 c3", "c0"]
+    body = []
+
+    for _ in range(paragraphs):
+        spans = "".join(
+            f'<span class="{span_classes[i % len(span_classes)]}">word &amp; word </span>'
+            for i in range(spans_per_paragraph)
+        )
+        body.append(f'<p class="c4">{spans}</p>')
+
+    return (
+        f"<html><head><style>{STYLE}</style></head>"
+        f'<body class="doc-content">{"".join(body)}</body></html>'
+    )
+
+
+def replace_spans_by_reparsing(
+    soup: BeautifulSoup, class_styles: ClassStyleTable
+) -> BeautifulSoup:
+    """
+    Reference implementation that re-parses each styled span's serialized contents.
+
+    Args:
+        soup (BeautifulSoup): The parsed HTML document.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+
+    Returns:
+        BeautifulSoup: Updated soup with semantic tags replacing spans.
+    """
+    for span in soup.find_all("span"):
+        tags = class_styles.span_tags(span.get("class", []))
+
+        if not tags:
+            continue
+
+        span_content = span.decode_contents(formatter="html")
+        new_node = None
+
+        for tag in reversed(tags):
+            new_tag = soup.new_tag(tag)
+
+            if new_node is None:
+                new_tag.append(BeautifulSoup(span_content, "html.parser"))
+            else:
+                new_tag.append(new_node)
+
+            new_node = new_tag
+
+        span.replace_with(new_node)
+
+    return soup
+
+
+def check_equivalence() -> int:
+    """
+    Replaces the spans of the edge cases and a span-dense document both ways and
+    compares the serialized output.
+
+    Returns:
+        int: The number of documents whose output differs.
+    """
+    documents = [build_span_dense_html(10, SPANS_PER_PARAGRAPH)] + [
+        f"<html><head><style>{STYLE}</style></head>"
+        f'<body class="doc-content">{body}</body></html>'
+        for body in EDGE_CASES
+    ]
+    mismatches = 0
+
+    for index, html in enumerate(documents):
+        outputs = []
+
+        for replace in (replace_spans_by_reparsing, replace_spans_with_semantic_tags):
+            soup = BeautifulSoup(html, "html.parser")
+            replace(soup, extract_styles(soup))
+            outputs.append(
+                [serialize_body(soup.body, compact) for compact in (False, True)]
+            )
+
+        if outputs[0] != outputs[1]:
+            print(f"document {index}: output differs")
+            mismatches += 1
+
+    return mismatches
+
+
+def time_replacement(
+    html: str,
+    replace: Callable[[BeautifulSoup, ClassStyleTable], BeautifulSoup],
+) -> float:
+    """
+    Times a span replacement function on freshly parsed copies of a document.
+
+    Args:
+        html (str): The HTML document to run the replacement on.
+        replace (Callable): The span replacement function to time.
+
+    Returns:
+        float: The best wall time in seconds over all repeats.
+    """
+    best = float("inf")
+
+    for _ in range(REPEATS):
+        soup = BeautifulSoup(html, "html.parser")
+        class_styles = extract_styles(soup)
+
+        start = time.perf_counter()
+        replace(soup, class_styles)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    """
+    Entry point for the span replacement equivalence check and benchmark.
+    """
+    mismatches = check_equivalence()
+    total = len(EDGE_CASES) + 1
+    print(f"{total - mismatches}/{total} documents match when moving children")
+
+    print(f"{'spans':>8} {'reparse (s)':>12} {'move (s)':>10} {'speedup':>8}")
+
+    for paragraphs in PARAGRAPH_COUNTS:
+        html = build_span_dense_html(paragraphs, SPANS_PER_PARAGRAPH)
+        reparse_time = time_replacement(html, replace_spans_by_reparsing)
+        move_time = time_replacement(html, replace_spans_with_semantic_tags)
+
+        print(
+            f"{paragraphs * SPANS_PER_PARAGRAPH:>8} {reparse_time:>12.3f} "
+            f"{move_time:>10.3f} {reparse_time / move_time:>7.1f}x"
+        )
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Times each stage of the Google Docs cleaner and the hover translation generator on
+generated documents, and saves the timings to JSON so runs can be compared.
+
+Run from the backend directory:
+    python -m benchmarks.stages --output before.json
+    python -m benchmarks.stages --output after.json --compare before.json
+
+The cleaner stages are parsing, the Google Docs check, `extract_styles`,
+`apply_transformations` with a breakdown by paragraph rule, and
+`get_cleaned_body_html` in both formats. The generator stages are
+`generate_translations` and its two steps. Each timing is the best of the repeats.
+"""
+
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup, Tag
+
+from app.gdoc_html_cleaner.constants import DEFAULT_PARSER
+from app.gdoc_html_cleaner.service import (
+    apply_transformations,
+    build_paragraph_rules,
+    extract_styles,
+    get_cleaned_body_html,
+    transform_node,
+)
+from app.gdoc_html_cleaner.stylesheet import ClassStyleTable
+from app.gdoc_html_cleaner.utils import is_gdoc_soup
+from app.hover_translation.service import (
+    generate_css,
+    generate_translations,
+    replace_and_extract_translations,
+)
+
+from .gdoc_export import build_gdoc_html
+from .translation_markup import build_translation_html
+
+CHAPTER_ID = "1"
+
+
+def time_call(run: Callable[[], Any]) -> float:
+    """
+    Times a single call.
+
+    Args:
+        run (Callable[[], Any]): The call to time.
+
+    Returns:
+        float: The wall time in seconds.
+    """
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def time_cleaner_stages(html: str) -> Dict[str, float]:
+    """
+    Cleans a document once, timing each stage.
+
+    Args:
+        html (str): The Google Docs export to clean.
+
+    Returns:
+        Dict[str, float]: The wall time in seconds of each stage.
+    """
+    timings: Dict[str, float] = {}
+    soup: Optional[BeautifulSoup] = None
+    class_styles: Optional[ClassStyleTable] = None
+
+    def parse():
+        nonlocal soup
+        soup = BeautifulSoup(html, DEFAULT_PARSER)
+
+    def extract():
+        nonlocal class_styles
+        class_styles = extract_styles(soup)
+
+    timings["parse"] = time_call(parse)
+    timings["is_gdoc_soup"] = time_call(lambda: is_gdoc_soup(soup))
+    timings["extract_styles"] = time_call(extract)
+    timings["apply_transformations"] = time_call(
+        lambda: apply_transformations(soup, class_styles)
+    )
+    timings["get_cleaned_body_html"] = time_call(lambda: get_cleaned_body_html(soup))
+    timings["get_cleaned_body_html.compact"] = time_call(
+        lambda: get_cleaned_body_html(soup, compact=True)
+    )
+
+    # the rules are timed on a fresh tree, so the timers do not skew the total above
+    soup = BeautifulSoup(html, DEFAULT_PARSER)
+    timings.update(time_paragraph_rules(soup, extract_styles(soup)))
+
+    return timings
+
+
+def time_paragraph_rules(
+    soup: BeautifulSoup, class_styles: ClassStyleTable
+) -> Dict[str, float]:
+    """
+    Runs the transformations on a document, timing each paragraph rule across all
+    paragraphs.
+
+    Args:
+        soup (BeautifulSoup): The parsed document.
+        class_styles (ClassStyleTable): The semantic tag and alignment flags of each class.
+
+    Returns:
+        Dict[str, float]: The total wall time in seconds of each rule.
+    """
+    timings: Dict[str, float] = {}
+
+    def timed(rule: Callable[[Tag], None]) -> Callable[[Tag], None]:
+        name = f"apply_transformations.{getattr(rule, 'func', rule).__name__}"
+        timings[name] = 0.0
+
+        def run(p: Tag) -> None:
+            start = time.perf_counter()
+            rule(p)
+            timings[name] += time.perf_counter() - start
+
+        return run
+
+    rules = [timed(rule) for rule in build_paragraph_rules(soup, class_styles)]
+
+    for node in list(soup.children):
+        transform_node(soup, node, rules, class_styles)
+
+    return timings
+
+
+def time_generator_stages(html: str) -> Dict[str, float]:
+    """
+    Generates hover translations for a chapter once, timing each stage.
+
+    Args:
+        html (str): The chapter with translation markers.
+
+    Returns:
+        Dict[str, float]: The wall time in seconds of each stage.
+    """
+    pairs: List = []
+
+    def replace():
+        nonlocal pairs
+        _, pairs = replace_and_extract_translations(html, CHAPTER_ID)
+
+    return {
+        "generate_translations": time_call(
+            lambda: generate_translations(html, CHAPTER_ID)
+        ),
+        "generate_translations.replace_and_extract_translations": time_call(replace),
+        "generate_translations.generate_css": time_call(
+            lambda: generate_css(pairs, CHAPTER_ID)
+        ),
+    }
+
+
+def best_timings(run: Callable[[], Dict[str, float]], repeats: int) -> Dict[str, float]:
+    """
+    Runs a set of timings several times, keeping the best time of each stage.
+
+    Args:
+        run (Callable[[], Dict[str, float]]): Times every stage once.
+        repeats (int): The number of runs.
+
+    Returns:
+        Dict[str, float]: The best wall time in seconds of each stage.
+    """
+    best: Dict[str, float] = {}
+
+    for _ in range(repeats):
+        for stage, seconds in run().items():
+            best[stage] = min(best.get(stage, seconds), seconds)
+
+    return best
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Generates the documents and times every stage on each of them.
+
+    Args:
+        args (argparse.Namespace): The command line options.
+
+    Returns:
+        Dict[str, Any]: The results, ready to be saved as JSON.
+    """
+    documents = []
+    gdoc_options = {
+        "class_count": args.class_count,
+        "max_spans": args.max_spans,
+        "max_run_length": args.max_run_length,
+    }
+    gdoc_documents = [
+        (f"clean/{count}p", {"paragraphs": count}) for count in args.paragraphs
+    ] + [
+        (f"clean/{size}c", {"paragraphs": 0, "target_size": size})
+        for size in args.sizes
+    ]
+
+    for name, size_options in gdoc_documents:
+        options = {**size_options, **gdoc_options}
+        html = build_gdoc_html(seed=args.seed, **options)
+        documents.append(
+            {
+                "name": name,
+                "options": options,
+                "size": len(html),
+                "stages": best_timings(lambda: time_cleaner_stages(html), args.repeats),
+            }
+        )
+
+    for count in args.paragraphs:
+        html = build_translation_html(count, seed=args.seed)
+        documents.append(
+            {
+                "name": f"generate/{count}p",
+                "options": {"paragraphs": count},
+                "size": len(html),
+                "stages": best_timings(
+                    lambda: time_generator_stages(html), args.repeats
+                ),
+            }
+        )
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeats": args.repeats,
+        "documents": documents,
+    }
+
+
+def print_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    """
+    Prints the timings of each document, with the change from a baseline run if one
+    is given. Documents are only compared when they were generated the same way.
+
+    Args:
+        results (Dict[str, Any]): The results of this run.
+        baseline (Optional[Dict[str, Any]]): The results of an earlier run.
+    """
+    baseline_documents = {
+        document_key(document): document
+        for document in (baseline or {}).get("documents", [])
+    }
+    width = max(
+        len(stage) for document in results["documents"] for stage in document["stages"]
+    )
+
+    for document in results["documents"]:
+        print(f"{document['name']} ({document['size'] // 1024} KiB)")
+        baseline_document = baseline_documents.get(document_key(document), {})
+        baseline_stages = baseline_document.get("stages", {})
+
+        for stage, seconds in document["stages"].items():
+            line = f"  {stage:<{width}} {seconds * 1000:10.2f}ms"
+            previous = baseline_stages.get(stage)
+
+            if previous:
+                line += f"  {seconds / previous:6.2f}x of baseline"
+
+            print(line)
+
+
+def document_key(document: Dict[str, Any]) -> str:
+    """
+    Identifies a benchmarked document by how it was generated.
+
+    Args:
+        document (Dict[str, Any]): A document's results.
+
+    Returns:
+        str: Its name and generator options.
+    """
+    return document["name"] + json.dumps(document["options"], sort_keys=True)
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Reads the command line options.
+
+    Returns:
+        argparse.Namespace: The options.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, nargs="*", default=[100, 1000, 5000])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="*",
+        default=[],
+        help="document sizes in characters to generate cleaner inputs up to",
+    )
+    parser.add_argument("--class-count", type=int, default=40)
+    parser.add_argument("--max-spans", type=int, default=10)
+    parser.add_argument("--max-run-length", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="stage_timings.json")
+    parser.add_argument("--compare", help="an earlier output file to compare against")
+    return parser.parse_args()
+
+
+def main():
+    """
+    Entry point for the stage timing benchmark.
+    """
+    args = parse_args()
+    baseline = None
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = run_benchmarks(args)
+    print_results(results, baseline)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Checks that the streaming cleaner gives the same output as a full clean with
+'html.parser' when fed in chunks of varied sizes, then compares the peak memory of
+both on large documents.
+
+Run from the backend directory:
+    python -m benchmarks.streaming_cleaner
+
+Exits with a non-zero status if any output differs.
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from io import StringIO
+from typing import Callable, Iterator, Tuple
+
+from app.gdoc_html_cleaner.constants import DEFAULT_PARSER
+from app.gdoc_html_cleaner.service import clean_html, clean_html_stream
+
+from .gdoc_export import build_gdoc_html
+
+CORPUS_SIZE = 50
+CORPUS_PARAGRAPHS = 60
+CHUNK_SIZES = [1, 7, 100, 4096]
+LARGE_PARAGRAPH_COUNTS = [1000, 5000]
+LARGE_CHUNK_SIZE = 64 * 1024
+
+
+def split_randomly(html: str, seed: int) -> Iterator[str]:
+    """
+    Splits a document into chunks of randomly chosen sizes.
+
+    Args:
+        html (str): The HTML document.
+        seed (int): Seed for the chunk sizes.
+
+    Yields:
+        str: The chunks, in order.
+    """
+    rng = random.Random(seed)
+    start = 0
+
+    while start < len(html):
+        end = start + rng.choice(CHUNK_SIZES)
+        yield html[start:end]
+        start = end
+
+
+def stream_clean(html: str, chunk_size: int, compact: bool = False) -> str:
+    """
+    Cleans a document with the streaming cleaner, feeding it fixed-size chunks.
+
+    Args:
+        html (str): The HTML document.
+        chunk_size (int): The number of characters per chunk.
+        compact (bool): Whether to use the compact format.
+
+    Returns:
+        str: The cleaned HTML.
+    """
+    out = StringIO()
+    chunks = (html[i : i + chunk_size] for i in range(0, len(html), chunk_size))
+    clean_html_stream(chunks, out, compact)
+    return out.getvalue()
+
+
+def check_equivalence() -> int:
+    """
+    Cleans the corpus in both modes and formats and compares the output.
+
+    Returns:
+        int: The number of documents whose output differs.
+    """
+    mismatches = 0
+
+    for seed in range(CORPUS_SIZE):
+        html = build_gdoc_html(CORPUS_PARAGRAPHS, seed=seed)
+
+        for compact in (False, True):
+            out = StringIO()
+            clean_html_stream(split_randomly(html, seed), out, compact)
+
+            if out.getvalue() != clean_html(html, compact, DEFAULT_PARSER):
+                print(f"seed {seed}: streamed output differs (compact={compact})")
+                mismatches += 1
+                break
+
+    return mismatches
+
+
+def measure(run: Callable[[], str]) -> Tuple[float, int]:
+    """
+    Runs a clean while tracing memory allocations.
+
+    Args:
+        run (Callable[[], str]): Cleans the document.
+
+    Returns:
+        Tuple[float, int]: The wall time in seconds and the peak traced memory in bytes.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    """
+    Entry point for the streaming cleaner equivalence check and benchmark.
+    """
+    mismatches = check_equivalence()
+    print(f"{CORPUS_SIZE - mismatches}/{CORPUS_SIZE} documents match when streamed")
+
+    for paragraphs in LARGE_PARAGRAPH_COUNTS:
+        html = build_gdoc_html(paragraphs)
+        full_time, full_peak = measure(lambda: clean_html(html, parser=DEFAULT_PARSER))
+        stream_time, stream_peak = measure(lambda: stream_clean(html, LARGE_CHUNK_SIZE))
+        print(
+            f"{paragraphs} paragraphs ({len(html) // 1024} KiB): "
+            f"full {full_time:.2f}s peak {full_peak // 2**20} MiB, "
+            f"streamed {stream_time:.2f}s peak {stream_peak // 2**20} MiB"
+        )
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Generates chapters marked up for the hover translation generator, with translation
+markers of the form {original [translated]} spread through cleaned paragraphs.
+"""
+
+import random
+from typing import Optional, Tuple
+
+from .gdoc_export import SPECIAL_TEXT, WORDS
+
+TRANSLATED_WORDS = (
+    "el río tranquilo pasaba junto a viejos muros de piedra mientras ella esperaba "
+    "noticias del norte"
+).split()
+
+
+def build_translation_html(
+    paragraphs: int,
+    seed: int = 0,
+    max_markers: int = 4,
+    vocabulary: int = 50,
+    vocabulary_seed: Optional[int] = None,
+) -> str:
+    """
+    Builds a chapter of \\<p> tags with translation markers in their text.
+
+    Args:
+        paragraphs (int): Number of \\<p> tags to generate.
+        seed (int): Seed for the random generator, so chapters are reproducible.
+        max_markers (int): Most translation markers in a paragraph; each paragraph
+            gets between 0 and this many.
+        vocabulary (int): Number of distinct (original, translated) pairs the markers
+            are drawn from, so smaller values repeat pairs more often.
+        vocabulary_seed (Optional[int]): Seed for the pairs, so chapters built with
+            different seeds can share them; defaults to `seed`.
+
+    Returns:
+        str: The generated HTML.
+    """
+    rng = random.Random(seed)
+
+    if vocabulary_seed is None:
+        pairs = [_build_pair(rng) for _ in range(vocabulary)]
+    else:
+        pair_rng = random.Random(vocabulary_seed)
+        pairs = [_build_pair(pair_rng) for _ in range(vocabulary)]
+    body = []
+
+    for _ in range(paragraphs):
+        pieces = [_text(rng)]
+
+        for _ in range(rng.randint(0, max_markers)):
+            original, translated = rng.choice(pairs)
+            pieces.append(f"{{{original} [{translated}]}}")
+            pieces.append(_text(rng))
+
+        body.append(f"<p>{' '.join(pieces)}</p>")
+
+    return "\n".join(body)
+
+
+def _build_pair(rng: random.Random) -> Tuple[str, str]:
+    """
+    Builds one (original, translated) pair of short phrases.
+
+    Args:
+        rng (random.Random): The random generator to use.
+
+    Returns:
+        Tuple[str, str]: The original and the translated phrase.
+    """
+    original = " ".join(rng.choices(WORDS, k=rng.randint(1, 3)))
+    translated = " ".join(rng.choices(TRANSLATED_WORDS, k=rng.randint(1, 4)))
+
+    if rng.random() < 0.1:
+        translated += ' "quoted"'
+
+    return original, translated
+
+
+def _text(rng: random.Random) -> str:
+    """
+    Builds a run of words, with the occasional entity or accent.
+
+    Args:
+        rng (random.Random): The random generator to use.
+
+    Returns:
+        str: The generated text.
+    """
+    words = [
+        rng.choice(SPECIAL_TEXT) if rng.random() < 0.05 else rng.choice(WORDS)
+        for _ in range(rng.randint(3, 20))
+    ]
+    return " ".join(words)
@@ -0,0 +1,200 @@
+"""
+Checks that the streaming hover translation writer gives the same HTML and CSS as
+replacing the markers and then building the CSS in two passes, when fed in chunks of
+varied sizes, with and without deduplicated pairs and compact CSS, then compares the
+time and peak memory of both on large chapters.
+
+Run from the backend directory:
+    python -m benchmarks.translation_stream
+
+Exits with a non-zero status if any output differs.
+"""
+
+import io
+import random
+import sys
+import time
+import tracemalloc
+from itertools import product
+from typing import Callable, Iterator, Tuple
+
+from app.hover_translation.service import (
+    generate_css,
+    replace_and_extract_translations,
+    write_translations,
+)
+
+from .translation_markup import build_translation_html
+
+CHAPTER_ID = "1"
+CORPUS_SIZE = 50
+CORPUS_PARAGRAPHS = 80
+CHUNK_SIZES = [1, 2, 7, 100, 4096]
+LARGE_PARAGRAPH_COUNTS = [5000, 50000]
+LARGE_CHUNK_SIZE = 64 * 1024
+
+# markers next to line breaks, which is where the writer decides how much to hold back
+EDGE_CASES = [
+    "{a\n[b]}",
+    "{a \n[b]}\n{c\r\n[d]}\n\n{e\n\n[f]}",
+    "{\n[x]}{y [z\n]}",
+    "\n[\n[{a\n[b]}\n[",
+    "{a {b [c]} {d [e] f} [g]}",
+    '{say "hi" [di "hola"]}\n',
+    "no markers\nat all\n",
+    "",
+]
+
+
+class _Discard(io.TextIOBase):
+    """
+    Text stream that throws away what is written, like a response sent as it goes.
+    """
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def split_randomly(html: str, seed: int) -> Iterator[str]:
+    """
+    Splits a chapter into chunks of randomly chosen sizes.
+
+    Args:
+        html (str): The chapter.
+        seed (int): Seed for the chunk sizes.
+
+    Yields:
+        str: The chunks, in order.
+    """
+    rng = random.Random(seed)
+    start = 0
+
+    while start < len(html):
+        end = start + rng.choice(CHUNK_SIZES)
+        yield html[start:end]
+        start = end
+
+
+def generate_in_two_passes(
+    html: str, dedupe: bool = False, compact: bool = False
+) -> Tuple[str, str]:
+    """
+    Generates hover translations by replacing every marker, then building the CSS
+    for all the pairs.
+
+    Args:
+        html (str): The chapter with translation markers.
+        dedupe (bool): Whether identical pairs share a class.
+        compact (bool): Whether the hover declarations are written once.
+
+    Returns:
+        Tuple[str, str]: The new HTML and the CSS.
+    """
+    new_html, pairs = replace_and_extract_translations(html, CHAPTER_ID, dedupe=dedupe)
+    return new_html, generate_css(pairs, CHAPTER_ID, dedupe, compact)
+
+
+def check_equivalence() -> int:
+    """
+    Generates the corpus and the edge cases both ways, with and without deduplicated
+    pairs and compact CSS, and compares the output.
+
+    Returns:
+        int: The number of chapters whose output differs.
+    """
+    chapters = [
+        (f"seed {seed}", build_translation_html(CORPUS_PARAGRAPHS, seed=seed))
+        for seed in range(CORPUS_SIZE)
+    ]
+    chapters += [(f"edge case {i}", html) for i, html in enumerate(EDGE_CASES)]
+    mismatches = 0
+
+    for seed, (name, html) in enumerate(chapters):
+        for dedupe, compact in product((False, True), repeat=2):
+            html_out, css_out = io.StringIO(), io.StringIO()
+            chunks = split_randomly(html, seed)
+            write_translations(
+                chunks, CHAPTER_ID, html_out, css_out, dedupe=dedupe, compact=compact
+            )
+            output = (html_out.getvalue(), css_out.getvalue())
+
+            if output != generate_in_two_passes(html, dedupe, compact):
+                print(
+                    f"{name}: streamed output differs "
+                    f"(dedupe={dedupe}, compact={compact})"
+                )
+                mismatches += 1
+                break
+
+    return mismatches
+
+
+def measure(run: Callable[[], object]) -> Tuple[float, int]:
+    """
+    Runs a generation while tracing memory allocations.
+
+    Args:
+        run (Callable[[], object]): Generates the translations.
+
+    Returns:
+        Tuple[float, int]: The wall time in seconds and the peak traced memory in bytes.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    """
+    Entry point for the streaming translation writer equivalence check and benchmark.
+    """
+    mismatches = check_equivalence()
+    total = CORPUS_SIZE + len(EDGE_CASES)
+    print(f"{total - mismatches}/{total} chapters match when streamed")
+
+    # a chapter with no line breaks is held back from the first "{" after the last
+    # marker instead, so it is streamed in bounded memory as well
+    for paragraphs, one_line in product(LARGE_PARAGRAPH_COUNTS, (False, True)):
+        html = build_translation_html(paragraphs)
+
+        if one_line:
+            html = html.replace("\n", "")
+
+        chunks = [
+            html[i : i + LARGE_CHUNK_SIZE]
+            for i in range(0, len(html), LARGE_CHUNK_SIZE)
+        ]
+        full_time, full_peak = measure(lambda: generate_in_two_passes(html))
+        stream_time, stream_peak = measure(
+            lambda: write_translations(chunks, CHAPTER_ID, _Discard(), _Discard())
+        )
+        print(
+            f"{paragraphs} paragraphs{' on one line' if one_line else ''} "
+            f"({len(html) // 1024} KiB): "
+            f"two passes {full_time:.2f}s peak {full_peak / 2**20:.1f} MiB, "
+            f"streamed {stream_time:.2f}s peak {stream_peak / 2**20:.1f} MiB"
+        )
+
+        if one_line:
+            html_out, css_out = io.StringIO(), io.StringIO()
+            write_translations(chunks, CHAPTER_ID, html_out, css_out)
+
+            if (html_out.getvalue(), css_out.getvalue()) != generate_in_two_passes(
+                html
+            ):
+                print(f"{paragraphs} paragraphs on one line: streamed output differs")
+                mismatches += 1
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
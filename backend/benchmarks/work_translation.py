@@ -0,0 +1,152 @@
+"""
+Checks hover translations generated for a whole work at once: the output is the same
+with any number of worker processes, the first chapter matches a single chapter
+generated with deduplicated pairs, every anchor ID is unique across the work and
+every class used is defined once in the shared workskin. Then compares the size of
+the shared workskin with the CSS of each chapter generated on its own, and times the
+work against the number of worker processes.
+
+Run from the backend directory:
+    python -m benchmarks.work_translation
+
+Exits with a non-zero status if any check fails. The speedup is bounded by the
+number of cores, which is printed first.
+"""
+
+import os
+import re
+import sys
+import time
+from collections import Counter
+from typing import List, Tuple
+
+from app.commons.executors import get_executor
+from app.hover_translation.service import (
+    generate_translations,
+    generate_work_translations,
+)
+
+from .translation_markup import build_translation_html
+
+CHAPTER_COUNTS = [10, 50]
+PARAGRAPHS = 1000
+VOCABULARY = 500
+WORKER_COUNTS = [1, 2, 4]
+
+ANCHOR_ID_PATTERN = re.compile(r' id="(return[^"]+)"')
+ANCHOR_CLASS_PATTERN = re.compile(r' class="(ch[^"]+)" rel="nofollow"')
+CSS_CLASS_PATTERN = re.compile(r"^#workskin a\.([\w]+):after \{", re.MULTILINE)
+
+
+def build_work(chapter_count: int) -> List[Tuple[str, str]]:
+    """
+    Builds the chapters of a work, drawing their markers from the same vocabulary.
+
+    Args:
+        chapter_count (int): The number of chapters.
+
+    Returns:
+        List[Tuple[str, str]]: The (chapter ID, HTML) of each chapter.
+    """
+    return [
+        (
+            str(seed + 1),
+            build_translation_html(
+                PARAGRAPHS, seed, vocabulary=VOCABULARY, vocabulary_seed=0
+            ),
+        )
+        for seed in range(chapter_count)
+    ]
+
+
+def check_work(
+    chapters: List[Tuple[str, str]], htmls: List[str], css: str, deduplicated: int
+) -> bool:
+    """
+    Checks that the output for a work is consistent.
+
+    Args:
+        chapters (List[Tuple[str, str]]): The (chapter ID, HTML) of each chapter.
+        htmls (List[str]): The generated HTML of each chapter.
+        css (str): The generated workskin.
+        deduplicated (int): The reported number of deduplicated markers.
+
+    Returns:
+        bool: Whether every check passed.
+    """
+    name = f"{len(chapters)} chapters"
+    anchor_ids = Counter(
+        id_ for html in htmls for id_ in ANCHOR_ID_PATTERN.findall(html)
+    )
+    used_classes = {cls for html in htmls for cls in ANCHOR_CLASS_PATTERN.findall(html)}
+    css_classes = Counter(CSS_CLASS_PATTERN.findall(css))
+    passed = True
+
+    if any(count > 1 for count in anchor_ids.values()):
+        print(f"{name}: anchor IDs repeat")
+        passed = False
+
+    if used_classes != set(css_classes) or any(
+        count > 1 for count in css_classes.values()
+    ):
+        print(f"{name}: classes used and defined differ")
+        passed = False
+
+    if sum(anchor_ids.values()) - len(css_classes) != deduplicated:
+        print(f"{name}: reported {deduplicated} deduplicated markers")
+        passed = False
+
+    chapter_id, html = chapters[0]
+    new_html, chapter_css = generate_translations(html, chapter_id, dedupe=True)
+
+    if htmls[0] != new_html or not css.startswith(chapter_css):
+        print(f"{name}: the first chapter differs from generating it on its own")
+        passed = False
+
+    return passed
+
+
+def main():
+    """
+    Entry point for the whole-work translation check and benchmark.
+    """
+    print(f"{os.cpu_count()} cores")
+    passed = True
+
+    for chapter_count in CHAPTER_COUNTS:
+        chapters = build_work(chapter_count)
+        outputs = []
+
+        for workers in WORKER_COUNTS:
+            if workers > 1:
+                # start the pool outside the timing
+                get_executor(workers).submit(int).result()
+
+            start = time.perf_counter()
+            outputs.append(generate_work_translations(chapters, workers=workers))
+            elapsed = time.perf_counter() - start
+            print(f"{chapter_count} chapters, {workers} workers: {elapsed:.2f}s")
+
+        if any(output != outputs[0] for output in outputs):
+            print(f"{chapter_count} chapters: output depends on the number of workers")
+            passed = False
+
+        htmls, css, deduplicated = outputs[0]
+        passed = check_work(chapters, htmls, css, deduplicated) and passed
+        per_chapter = [generate_translations(html, id_) for id_, html in chapters]
+        deduped = [
+            generate_translations(html, id_, dedupe=True) for id_, html in chapters
+        ]
+        print(
+            f"{chapter_count} chapters: CSS per chapter "
+            f"{sum(len(c) for _, c in per_chapter) // 1024} KiB, deduplicated per "
+            f"chapter {sum(len(c) for _, c in deduped) // 1024} KiB, shared "
+            f"workskin {len(css) // 1024} KiB"
+        )
+
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Checks updating an existing workskin for a revised chapter: the workskin is kept as
+it was with rules only appended for new pairs, unchanged pairs keep their classes,
+every class the chapter uses is defined, and updating again with the same chapter
+appends nothing. Then compares what is appended with regenerating the CSS.
+
+Run from the backend directory:
+    python -m benchmarks.workskin_update
+
+Exits with a non-zero status if any check fails.
+"""
+
+import random
+import re
+import sys
+import time
+from itertools import product
+from typing import Dict, List, Tuple
+
+from app.hover_translation.markers import iter_markers
+from app.hover_translation.service import generate_translations
+
+from .translation_markup import build_translation_html
+
+CHAPTER_ID = "1"
+PARAGRAPHS = 5000
+VOCABULARY = 500
+# share of the paragraphs a revision rewrites, with pairs from another vocabulary
+REVISED_SHARE = 0.1
+
+ANCHOR_CLASS_PATTERN = re.compile(r' class="(ch[^"]+)" rel="nofollow"')
+CSS_CLASS_PATTERN = re.compile(r"^#workskin a\.([\w]+):after \{", re.MULTILINE)
+
+
+def revise(html: str, seed: int) -> str:
+    """
+    Rewrites some of a chapter's paragraphs.
+
+    Args:
+        html (str): The chapter.
+        seed (int): Seed for the paragraphs to rewrite and their new text.
+
+    Returns:
+        str: The revised chapter.
+    """
+    paragraphs = html.split("\n")
+    rewritten = build_translation_html(
+        len(paragraphs), seed, vocabulary=VOCABULARY, vocabulary_seed=seed
+    ).split("\n")
+    rng = random.Random(seed)
+
+    for index in rng.sample(
+        range(len(paragraphs)), int(len(paragraphs) * REVISED_SHARE)
+    ):
+        paragraphs[index] = rewritten[index]
+
+    return "\n".join(paragraphs)
+
+
+def marker_classes(html: str, new_html: str) -> List[Tuple[Tuple[str, str], str]]:
+    """
+    Pairs each marker of a chapter with the class it was given.
+
+    Args:
+        html (str): The chapter with translation markers.
+        new_html (str): The generated HTML.
+
+    Returns:
+        List[Tuple[Tuple[str, str], str]]: Each marker's pair and class, in order.
+    """
+    pairs = [marker[2:] for marker in iter_markers(html)]
+    return list(zip(pairs, ANCHOR_CLASS_PATTERN.findall(new_html)))
+
+
+def check_update(name: str, html: str, revised: str, dedupe: bool, compact: bool):
+    """
+    Generates a chapter, then its revision against the chapter's workskin, and checks
+    the update.
+
+    Args:
+        name (str): The case's name, for messages.
+        html (str): The chapter.
+        revised (str): The revised chapter.
+        dedupe (bool): Whether identical pairs share a class.
+        compact (bool): Whether the hover declarations are written once.
+
+    Returns:
+        bool: Whether every check passed.
+    """
+    options = {"dedupe": dedupe, "compact": compact}
+    generated = generate_translations(html, CHAPTER_ID, **options)
+    new_html, css = generated
+    start = time.perf_counter()
+    revised_html, updated_css = generate_translations(
+        revised, CHAPTER_ID, workskin=css, **options
+    )
+    elapsed = time.perf_counter() - start
+    _, regenerated_css = generate_translations(revised, CHAPTER_ID, **options)
+    passed = True
+
+    if generate_translations(html, CHAPTER_ID, workskin="", **options) != generated:
+        print(f"{name}: an empty workskin changes the output")
+        passed = False
+
+    if not updated_css.startswith(css):
+        print(f"{name}: the workskin was not kept as it was")
+        passed = False
+
+    first_classes: Dict[Tuple[str, str], str] = {}
+
+    for pair, class_str in marker_classes(html, new_html):
+        first_classes.setdefault(pair, class_str)
+
+    revised_classes = marker_classes(revised, revised_html)
+    new_pairs = {pair for pair, _ in revised_classes if pair not in first_classes}
+
+    if any(
+        pair in first_classes and class_str != first_classes[pair]
+        for pair, class_str in revised_classes
+    ):
+        print(f"{name}: an unchanged pair changed class")
+        passed = False
+
+    defined = CSS_CLASS_PATTERN.findall(updated_css)
+    appended = CSS_CLASS_PATTERN.findall(updated_css[len(css) :])
+    expected = (
+        len(new_pairs)
+        if dedupe
+        else sum(pair in new_pairs for pair, _ in revised_classes)
+    )
+
+    if len(set(defined)) != len(defined) or not {
+        class_str for _, class_str in revised_classes
+    } <= set(defined):
+        print(f"{name}: classes used and defined differ")
+        passed = False
+
+    if len(appended) != expected:
+        print(f"{name}: {len(appended)} rules appended for {expected} new markers")
+        passed = False
+
+    # without deduplication, repeated new pairs got a class each the first time, and
+    # share the first of them once they are in the workskin
+    again_html, again_css = generate_translations(
+        revised, CHAPTER_ID, workskin=updated_css, **options
+    )
+
+    if again_css != updated_css or dedupe and again_html != revised_html:
+        print(f"{name}: updating again with the same chapter changed the output")
+        passed = False
+
+    print(
+        f"{name}: {len(appended)} rules appended "
+        f"({(len(updated_css) - len(css)) // 1024} KiB) in {elapsed:.2f}s, "
+        f"regenerated CSS {len(regenerated_css) // 1024} KiB"
+    )
+    return passed
+
+
+def main():
+    """
+    Entry point for the workskin update check.
+    """
+    html = build_translation_html(PARAGRAPHS, vocabulary=VOCABULARY)
+    revised = revise(html, 1)
+    passed = True
+
+    for dedupe, compact in product((False, True), repeat=2):
+        name = f"dedupe={dedupe}, compact={compact}"
+        passed = check_update(name, html, revised, dedupe, compact) and passed
+
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,51 @@
+import os
+
+
 class Config:
     DEBUG = False
     TESTING = False
+    # parser backend for the Google Docs HTML cleaner: "html.parser", "lxml" or "auto";
+    # with "html.parser", paragraphs are cleaned without building a tree, which is
+    # faster than lxml, so "auto" picks it too. lxml output is not byte-identical: it
+    # repairs nested and unclosed paragraphs, carriage returns, textareas, processing
+    # instructions, CDATA and unknown entities (see utils.resolve_parser)
+    GDOC_HTML_CLEANER_PARSER = "html.parser"
+    # clean uploaded files while reading them, which keeps memory use bounded but
+    # always uses "html.parser"
+    GDOC_HTML_CLEANER_STREAM_UPLOADS = True
+    # processes used to clean documents of at least PARALLEL_MIN_SIZE characters; 1
+    # cleans every document in the process handling the request
+    GDOC_HTML_CLEANER_WORKERS = 1
+    # processes used to clean the files of a /clean-batch request concurrently once
+    # they hold BATCH_PARALLEL_MIN_SIZE characters in all; smaller batches, and every
+    # batch with 1, are cleaned in the process handling the request
+    GDOC_HTML_CLEANER_BATCH_WORKERS = os.cpu_count() or 1
+    # processes used to generate the chapters of a /generate-work request once they
+    # hold WORK_PARALLEL_MIN_SIZE characters in all; smaller works, and every work
+    # with 1, are handled in the process handling the request
+    HOVER_TRANSLATION_WORK_WORKERS = os.cpu_count() or 1
+    # in-process cache of clean/generate results; a size of 0 disables it
+    RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    RESULT_CACHE_TTL = 60 * 60
+    # in-process cache of cleaned paragraphs for incremental cleans
+    PARAGRAPH_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    # time each stage of the clean/generate services and send the timings back in a
+    # Server-Timing header
+    PROFILE_REQUESTS = False
+    # bytes the process may grow by while cleaning or generating for one request
+    # before the request is stopped with a 413; None for no budget. The growth is of
+    # the whole process's resident size, so it includes other requests it handles at
+    # the same time. Unless PROFILE_REQUESTS is on, the budget is only checked between
+    # stages, without timing them
+    REQUEST_MEMORY_BUDGET = 1024 * 1024 * 1024
+    # resident bytes of the process past which clean/generate requests are turned away
+    # with a 503; None for no limit
+    PROCESS_MEMORY_LIMIT = None
 
 
 class DevConfig(Config):
     DEBUG = True
+    PROFILE_REQUESTS = True
     ENV = "dev"
 
 
@@ -69,8 +69,8 @@ const InfoSection = () => {
             Click <strong>File → Download → Web Page (.html, zipped)</strong>
           </ListItem>
           <ListItem sx={{ display: "list-item" }}>
-            Extract the <code>.zip</code> file and open the <code>.html</code>{" "}
-            file inside
+            Upload the <code>.zip</code> file as is, or the <code>.html</code>{" "}
+            file inside it
           </ListItem>
         </List>
       </Typography>
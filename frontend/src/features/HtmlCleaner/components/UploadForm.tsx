@@ -69,7 +69,7 @@ const UploadForm: React.FC<UploadFormProps> = (props) => {
           name="files"
           variant="contained"
           size="small"
-          accept=".html"
+          accept=".html,.zip"
           disabled={isSubmitting}
         />
       </Stack>
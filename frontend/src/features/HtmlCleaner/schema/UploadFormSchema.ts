@@ -6,8 +6,8 @@ export const uploadFormSchema = Yup.object().shape({
     .of(
       Yup.mixed<File>()
         .required("File is required")
-        .test("is-html", "Only HTML files are allowed", (file) =>
-          file ? file.name.endsWith(".html") : false,
+        .test("is-html", "Only HTML or zip files are allowed", (file) =>
+          file ? /\.(html|zip)$/.test(file.name) : false,
         ),
     )
     .min(1, "File is required")
@@ -1,10 +1,11 @@
 import html
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
 import cssutils
 import utils
-from bs4 import BeautifulSoup, NavigableString
+from bs4 import BeautifulSoup, NavigableString, PageElement
 from constants import SEMANTIC_TAGS
+from streaming import StreamingDocument
 
 
 def clean(html_str: str) -> str:
@@ -26,6 +27,61 @@ def clean(html_str: str) -> str:
     return get_cleaned_body_html(soup)
 
 
+def clean_stream(chunks: Iterable[str], out: TextIO) -> None:
+    """
+    Cleans HTML content exported from Google Docs while reading it, writing each
+    top-level element of \\<body> to the output as soon as it has been cleaned.
+
+    Only the \\<head> and the element being read are kept in memory, so large
+    documents can be cleaned straight from one file into another. The output is the
+    same as `clean` returns.
+
+    Args:
+        chunks (Iterable[str]): The raw HTML, in pieces of any size.
+        out (TextIO): Where to write the cleaned HTML.
+    """
+    document = StreamingDocument()
+    styles = None
+
+    for chunk in chunks:
+        document.feed(chunk)
+
+        if styles is None and document.has_complete_style:
+            styles = extract_styles(document.soup)
+
+        if styles is not None:
+            write_cleaned_elements(document.take_completed_body_elements(), styles, out)
+
+    document.close()
+
+    if styles is None:
+        styles = extract_styles(document.soup)
+
+    write_cleaned_elements(document.take_completed_body_elements(), styles, out)
+
+
+def write_cleaned_elements(
+    elements: List[PageElement],
+    styles: Tuple[Dict[str, Optional[str]], Dict[str, Dict[str, Optional[str]]]],
+    out: TextIO,
+) -> None:
+    """
+    Cleans a run of top-level \\<body> elements and writes them out.
+
+    Args:
+        elements (List[PageElement]): Consecutive \\<body> children, detached from their document.
+        styles (Tuple): The class alignment and style maps from `extract_styles`.
+        out (TextIO): Where to write the cleaned HTML.
+    """
+    if not elements:
+        return
+
+    fragment = BeautifulSoup("", features="html.parser")
+    fragment.extend(elements)
+    fragment = apply_transformations(fragment, *styles)
+    out.write(get_cleaned_html(fragment))
+
+
 def extract_styles(
     soup: BeautifulSoup,
 ) -> Tuple[Dict[str, Optional[str]], Dict[str, Dict[str, Optional[str]]]]:
@@ -399,6 +455,19 @@ def get_cleaned_body_html(soup: BeautifulSoup) -> str:
         str: Unescaped HTML string from within \\<body>.
     """
     body = soup.find("body")
-    body_html = body.decode_contents(formatter="html")
-    prettified_html = BeautifulSoup(body_html, features="html.parser", preserve_whitespace_tags=["p"]).prettify()
+    return get_cleaned_html(body)
+
+
+def get_cleaned_html(element: PageElement) -> str:
+    """
+    Prettifies and unescapes the contents of a tag.
+
+    Args:
+        element (PageElement): The tag (or soup) whose contents are returned.
+
+    Returns:
+        str: Unescaped HTML string from within the tag.
+    """
+    contents_html = element.decode_contents(formatter="html")
+    prettified_html = BeautifulSoup(contents_html, features="html.parser", preserve_whitespace_tags=["p"]).prettify()
     return html.unescape(prettified_html)
@@ -4,15 +4,15 @@ from tkinter import filedialog, messagebox
 
 import cleaner
 import utils
+from constants import READ_CHUNK_SIZE
 
 
-def select_gdoc_html_file() -> tuple[str, str]:
+def select_gdoc_html_file() -> str:
     """
     Prompts the user to select a Google Docs-exported HTML file.
 
     Returns:
-        Tuple of (file path, file content) if valid file is selected,
-        otherwise ("", "") if cancelled.
+        The file path if a valid file is selected, otherwise "" if cancelled.
     """
     while True:
         print("Please select an HTML file exported from Google Docs.")
@@ -24,11 +24,14 @@ def select_gdoc_html_file() -> tuple[str, str]:
 
         if not file_path:
             print("No file selected.")
-            return "", ""
+            return ""
 
         try:
+            # only the start of the file is read, up to its <body> tag
             with open(file_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
+                is_gdoc_html = utils.is_gdoc_html_chunks(
+                    iter(lambda: f.read(READ_CHUNK_SIZE), "")
+                )
         except PermissionError:
             print("You do not have permission to read the selected file.")
             messagebox.showerror(
@@ -44,8 +47,8 @@ def select_gdoc_html_file() -> tuple[str, str]:
             )
             continue
 
-        if utils.is_gdoc_html(html_content):
-            return file_path, html_content
+        if is_gdoc_html:
+            return file_path
         else:
             print(
                 "The selected file does not appear to be an HTML file exported from Google Docs. Please try again."
@@ -56,23 +59,24 @@ def select_gdoc_html_file() -> tuple[str, str]:
             )
 
 
-def save_cleaned_html(content: str, default_dir: str) -> None:
+def save_cleaned_html(html_path: str) -> None:
     """
-    Prompts the user to choose where to save the cleaned HTML.
+    Prompts the user to choose where to save the cleaned HTML, then cleans the
+    selected file straight into it, a chunk at a time.
 
     Args:
-        content: The cleaned HTML content.
-        default_dir: Default directory or file path for the save dialog.
+        html_path: The HTML file to clean, also used as the default location for
+            the save dialog.
     """
     while True:
         default_file_name = (
-            f"{os.path.splitext(os.path.basename(default_dir))[0]}_cleaned.html"
+            f"{os.path.splitext(os.path.basename(html_path))[0]}_cleaned.html"
         )
 
         print("Please choose a location to save the cleaned HTML file.")
 
         output_path = filedialog.asksaveasfilename(
-            initialdir=default_dir,
+            initialdir=html_path,
             initialfile=default_file_name,
             title="Save Cleaned HTML As",
             defaultextension=".html",
@@ -84,8 +88,13 @@ def save_cleaned_html(content: str, default_dir: str) -> None:
             return
 
         try:
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(content)
+            with (
+                open(html_path, "r", encoding="utf-8") as source,
+                open(output_path, "w", encoding="utf-8") as f,
+            ):
+                print("Cleaning HTML file...")
+                cleaner.clean_stream(iter(lambda: source.read(READ_CHUNK_SIZE), ""), f)
+                print("Done!")
 
             print(f"Cleaned HTML saved to: {output_path}")
             return
@@ -112,17 +121,13 @@ def main():
     root = tk.Tk()
     root.withdraw()
 
-    html_path, html_content = select_gdoc_html_file()
+    html_path = select_gdoc_html_file()
 
     if not html_path:
         print("Goodbye!")
         return
 
-    print("Cleaning HTML file...")
-    cleaned_html = cleaner.clean(html_content)
-    print("Done!")
-
-    save_cleaned_html(cleaned_html, default_dir=html_path)
+    save_cleaned_html(html_path)
 
     print("Goodbye!")
 
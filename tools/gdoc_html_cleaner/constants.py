@@ -1 +1,3 @@
 SEMANTIC_TAGS = ["em", "strong", "u", "s"]
+
+READ_CHUNK_SIZE = 64 * 1024
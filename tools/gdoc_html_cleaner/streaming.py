@@ -0,0 +1,113 @@
+from typing import Any, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, PageElement, Tag
+from bs4.builder._htmlparser import BeautifulSoupHTMLParser
+
+
+class StreamingDocument:
+    """
+    Builds a document tree from HTML fed in chunks, so the top-level children of
+    \\<body> can be processed and dropped as soon as they are complete.
+
+    The tree is built by the same event handlers as BeautifulSoup's 'html.parser'
+    builder, so every element is identical to the one `BeautifulSoup(html,
+    "html.parser")` would produce.
+    """
+
+    def __init__(self):
+        self.soup = BeautifulSoup("", "html.parser")
+        args, kwargs = self.soup.builder.parser_args
+        self._parser = _StreamingHTMLParser(self.soup, *args, **kwargs)
+        self._closed = False
+
+    @property
+    def body(self) -> Optional[Tag]:
+        """
+        The first \\<body> tag in the document, once it has been opened.
+        """
+        return self._parser.body
+
+    @property
+    def has_complete_style(self) -> bool:
+        """
+        Whether the first \\<style> tag in the document has been read to its end.
+        """
+        style = self._parser.style
+        return style is not None and not self._is_open(style)
+
+    def feed(self, chunk: str) -> None:
+        """
+        Parses the next chunk of the document.
+
+        Args:
+            chunk (str): The next piece of HTML.
+        """
+        self._parser.feed(chunk)
+
+    def close(self) -> None:
+        """
+        Parses whatever input is left and closes all open tags.
+        """
+        self._parser.close()
+        self.soup.endData()
+
+        while self.soup.currentTag.name != self.soup.ROOT_TAG_NAME:
+            self.soup.popTag()
+
+        self._closed = True
+
+    def take_completed_body_elements(self) -> List[PageElement]:
+        """
+        Removes the leading \\<body> children that will not change as more input is read.
+
+        Text nodes at the end are held back until a tag follows them, because text that
+        comes next would be merged with them.
+
+        Returns:
+            List[PageElement]: The completed children, detached from the tree.
+        """
+        body = self.body
+
+        if body is None:
+            return []
+
+        contents = body.contents
+        end = len(contents)
+
+        if not self._closed:
+            if self._is_open(body) and self.soup.currentTag is not body:
+                # the last child is still being parsed
+                end -= 1
+
+            while end and not isinstance(contents[end - 1], Tag):
+                end -= 1
+
+        return [element.extract() for element in contents[:end]]
+
+    def _is_open(self, tag: Tag) -> bool:
+        return any(open_tag is tag for open_tag in self.soup.tagStack)
+
+
+class _StreamingHTMLParser(BeautifulSoupHTMLParser):
+    """
+    BeautifulSoup's html.parser event handler, noting the \\<body> and \\<style> tags.
+    """
+
+    def __init__(self, soup: BeautifulSoup, *args: Any, **kwargs: Any):
+        super().__init__(soup, *args, **kwargs)
+        self.body: Optional[Tag] = None
+        self.style: Optional[Tag] = None
+
+    def handle_starttag(
+        self,
+        name: str,
+        attrs: List[Tuple[str, Optional[str]]],
+        handle_empty_element: bool = True,
+    ) -> None:
+        super().handle_starttag(name, attrs, handle_empty_element)
+
+        # neither tag is an empty element, so it is still on top of the stack
+        if name == "body" and self.body is None:
+            self.body = self.soup.currentTag
+        elif name == "style" and self.style is None:
+            self.style = self.soup.currentTag
@@ -1,4 +1,7 @@
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional, Tuple
+
+from constants import READ_CHUNK_SIZE
 
 
 def is_c_class_selector(selector: str) -> bool:
@@ -41,14 +44,70 @@ def is_gdoc_html(html: str) -> bool:
     Returns:
         bool: True if the HTML appears to be from Google Docs, False otherwise.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    body = soup.find("body")
+    return is_gdoc_html_chunks(
+        html[start : start + READ_CHUNK_SIZE]
+        for start in range(0, len(html), READ_CHUNK_SIZE)
+    )
 
-    has_doc_content = body and body.get("class") and "doc-content" in body["class"]
 
-    has_c_number_classes = any(
-        tag.get("class") and any(is_c_class_name(cls) for cls in tag["class"])
-        for tag in soup.find_all(True)
-    )
+def is_gdoc_html_chunks(chunks: Iterable[str]) -> bool:
+    """
+    Determines whether HTML read in pieces is likely exported from Google Docs (see
+    `is_gdoc_html`).
+
+    The HTML is scanned without building a tree, and no more pieces are read once
+    both criteria are settled, which for a Google Docs export is at its \\<body> tag.
+
+    Args:
+        chunks (Iterable[str]): The HTML, in pieces of any size.
+
+    Returns:
+        bool: True if the HTML appears to be from Google Docs, False otherwise.
+    """
+    detector = _GdocDetector()
+
+    for chunk in chunks:
+        detector.feed(chunk)
+
+        if detector.verdict is not None:
+            return detector.verdict
+
+    detector.close()
+    return bool(detector.verdict)
+
+
+class _GdocDetector(HTMLParser):
+    """
+    Tokenizes HTML the way BeautifulSoup's 'html.parser' builder does, settling the
+    Google Docs criteria as soon as the tags read so far allow.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.verdict: Optional[bool] = None
+        self._body_seen = False
+        self._has_c_number_classes = False
+
+    def handle_starttag(
+        self, name: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        if self.verdict is not None:
+            return
+
+        # later duplicates of an attribute replace earlier ones
+        class_names = (dict(attrs).get("class") or "").split()
+
+        if not self._has_c_number_classes:
+            self._has_c_number_classes = any(
+                is_c_class_name(class_name) for class_name in class_names
+            )
+
+        if name == "body" and not self._body_seen:
+            self._body_seen = True
+
+            if "doc-content" not in class_names:
+                self.verdict = False
+                return
 
-    return has_doc_content and has_c_number_classes
+        if self._body_seen and self._has_c_number_classes:
+            self.verdict = True
@@ -1,7 +1,11 @@
+import io
 import os
+import shutil
+import tempfile
 import tkinter as tk
 import zipfile
 from tkinter import filedialog, messagebox
+from typing import Optional
 
 import generator
 
@@ -48,13 +52,27 @@ def select_html_file() -> tuple[str, str]:
         return file_path, html_content
 
 
-def save_generated_files(html_content: str, css_content: str, default_dir: str) -> None:
+def save_generated_files(
+    html_content: str,
+    chapter: int,
+    dedupe: bool,
+    compact: bool,
+    workskin: Optional[str],
+    default_dir: str,
+) -> None:
     """
-    Prompts the user to select a save location and writes the HTML and CSS content to a ZIP file.
+    Prompts the user to select a save location, then generates the translated HTML and
+    CSS straight into the entries of a ZIP file there.
+
+    The HTML is written to its entry as the markers are replaced, while the CSS is
+    written to a temporary file and copied into its entry afterwards.
 
     Args:
-        html_content (str): The translated HTML content to save.
-        css_content (str): The corresponding CSS content to save.
+        html_content (str): The HTML content containing translation markers.
+        chapter (int): The chapter number used for generating unique CSS class names.
+        dedupe (bool): Whether identical translation pairs share one CSS class.
+        compact (bool): Whether the hover styles are written once for every pair.
+        workskin (Optional[str]): An existing workskin to add the new styles to.
         default_dir (str): The default directory to open in the file dialog.
 
     Returns:
@@ -83,8 +101,21 @@ def save_generated_files(html_content: str, css_content: str, default_dir: str)
 
         try:
             with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                zipf.writestr(html_file_name, html_content)
-                zipf.writestr(css_file_name, css_content)
+                print("Generating HTML and CSS files...")
+                deduplicated = write_generated_files(
+                    zipf,
+                    html_file_name,
+                    css_file_name,
+                    html_content,
+                    chapter,
+                    dedupe,
+                    compact,
+                    workskin,
+                )
+                print("Done!")
+
+            if dedupe or workskin is not None:
+                print(f"{deduplicated} translations reuse an existing CSS class.")
 
             print(f"Files saved to: {output_path}")
             return
@@ -103,6 +134,94 @@ def save_generated_files(html_content: str, css_content: str, default_dir: str)
             )
 
 
+def write_generated_files(
+    zipf: zipfile.ZipFile,
+    html_file_name: str,
+    css_file_name: str,
+    html_content: str,
+    chapter: int,
+    dedupe: bool,
+    compact: bool,
+    workskin: Optional[str],
+) -> int:
+    """
+    Generates the translated HTML and CSS straight into two entries of a ZIP file.
+
+    Args:
+        zipf (zipfile.ZipFile): The ZIP file, open for writing.
+        html_file_name (str): The name of the HTML entry.
+        css_file_name (str): The name of the CSS entry.
+        html_content (str): The HTML content containing translation markers.
+        chapter (int): The chapter number used for generating unique CSS class names.
+        dedupe (bool): Whether identical translation pairs share one CSS class.
+        compact (bool): Whether the hover styles are written once for every pair.
+        workskin (Optional[str]): An existing workskin to add the new styles to.
+
+    Returns:
+        int: The number of markers that shared the class of an identical earlier pair
+        or reused one of the workskin.
+    """
+    with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as css_file:
+        with zipf.open(html_file_name, "w") as entry:
+            with io.TextIOWrapper(entry, encoding="utf-8", newline="") as html_out:
+                _, deduplicated = generator.write_translations(
+                    [html_content],
+                    chapter,
+                    html_out,
+                    css_file,
+                    dedupe,
+                    compact,
+                    workskin,
+                )
+
+        css_file.seek(0)
+
+        with zipf.open(css_file_name, "w") as entry:
+            with io.TextIOWrapper(entry, encoding="utf-8", newline="") as css_out:
+                shutil.copyfileobj(css_file, css_out)
+
+    return deduplicated
+
+
+def select_workskin_file() -> Optional[str]:
+    """
+    Asks the user whether to update an existing workskin, and if so opens a file
+    dialog for them to select its CSS file and reads it.
+
+    Returns:
+        Optional[str]: The workskin, or None if the user does not update one.
+    """
+    while True:
+        user_input = input("Add the styles to an existing workskin? (y/n): ")
+        answer = user_input.strip().lower()
+
+        if answer in ("n", "no"):
+            return None
+
+        if answer not in ("y", "yes"):
+            print("Please answer y or n.")
+            continue
+
+        file_path = filedialog.askopenfilename(
+            title="Select a workskin CSS file",
+            filetypes=[("CSS files", "*.css")],
+        )
+
+        if not file_path:
+            print("No file selected.")
+            continue
+
+        try:
+            with open(file_path, "r", encoding="utf-8", newline="") as f:
+                return f.read()
+        except (IOError, UnicodeDecodeError):
+            print("Something went wrong when opening the file. Please try again.")
+            messagebox.showerror(
+                "File Error",
+                "Something went wrong when opening the file. Please try again.",
+            )
+
+
 def get_chapter_number() -> int:
     """
     Prompts the user to input a positive integer representing the chapter number.
@@ -126,6 +245,54 @@ def get_chapter_number() -> int:
             print("Chapter number must be a positive integer.")
 
 
+def get_dedupe_choice() -> bool:
+    """
+    Asks the user whether identical translations should share one CSS class, which
+    keeps the workskin smaller when the same translation appears many times.
+
+    Keeps asking until valid input is received.
+
+    Returns:
+        bool: True if identical translations should share a class.
+    """
+    while True:
+        user_input = input(
+            "Share one CSS class between identical translations? (y/n): "
+        )
+        answer = user_input.strip().lower()
+
+        if answer in ("y", "yes"):
+            return True
+
+        if answer in ("n", "no"):
+            return False
+
+        print("Please answer y or n.")
+
+
+def get_compact_choice() -> bool:
+    """
+    Asks the user whether the hover styles shared by every translation should be
+    written once, which keeps the workskin smaller.
+
+    Keeps asking until valid input is received.
+
+    Returns:
+        bool: True if the shared hover styles should be written once.
+    """
+    while True:
+        user_input = input("Write the shared hover styles only once? (y/n): ")
+        answer = user_input.strip().lower()
+
+        if answer in ("y", "yes"):
+            return True
+
+        if answer in ("n", "no"):
+            return False
+
+        print("Please answer y or n.")
+
+
 def main():
     """
     Entry point for the Hover Translation tool.
@@ -142,14 +309,13 @@ def main():
         return
 
     chapter = get_chapter_number()
+    dedupe = get_dedupe_choice()
+    compact = get_compact_choice()
+    workskin = select_workskin_file()
 
-    print("Generating HTML and CSS files...")
-    new_html_content, new_css_content = generator.generate_translations(
-        html_content, chapter
+    save_generated_files(
+        html_content, chapter, dedupe, compact, workskin, default_dir=html_path
     )
-    print("Done!")
-
-    save_generated_files(new_html_content, new_css_content, default_dir=html_path)
 
     print("Goodbye!")
 
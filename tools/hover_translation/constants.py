@@ -1,28 +1,60 @@
 import re
 
+# the markers `markers.iter_markers` finds; matching this takes time cubic in the
+# length of a line with many unclosed braces, so it is only kept as a reference
 TRANSLATION_PATTERN = re.compile(r"\{(.*?)\s\[(.+?)\]\}")
 
 CLASS_TEMPLATE = "ch{chapter}text{index}"
 
+# anchor_str names the marker itself and class_str the CSS class it uses, which
+# identical markers share when pairs are deduplicated
 ANCHOR_TEMPLATE = (
-    '<a name="return{class_str}" rel="nofollow" id="return{class_str}"></a>'
-    '<a href="#return{class_str}" class="{class_str}" rel="nofollow">'
+    '<a name="return{anchor_str}" rel="nofollow" id="return{anchor_str}"></a>'
+    '<a href="#return{anchor_str}" class="{class_str}" rel="nofollow">'
     '<span class="hide">{original}</span></a>'
 )
 
-CSS_TEMPLATE ="""#workskin a.{class_str}:after {{
-  content: "{original}";
-}}
-
-#workskin a.{class_str}:hover:after,
-#workskin a.{class_str}:focus:after {{
-  content: "{translated}";
-  display: inline;
+# the declarations every pair's translation is shown with
+HOVER_DECLARATIONS = """  display: inline;
   background-color: #FFF;
   color: #2a2a2a;
   border-bottom: 1px solid #FFF;
   position: relative;
   margin: 0px;
   padding: 0px;
+"""
+
+CSS_TEMPLATE = (
+    """#workskin a.{class_str}:after {{
+  content: "{original}";
+}}
+
+#workskin a.{class_str}:hover:after,
+#workskin a.{class_str}:focus:after {{
+  content: "{translated}";
+"""
+    + HOVER_DECLARATIONS
+    + "}}\n"
+)
+
+# in compact CSS, the hover declarations are written once for all the classes of a
+# chapter, matched by the start of their names, and each pair only has its content
+COMPACT_CSS_TEMPLATE = """#workskin a.{class_str}:after {{
+  content: "{original}";
+}}
+
+#workskin a.{class_str}:hover:after,
+#workskin a.{class_str}:focus:after {{
+  content: "{translated}";
 }}
 """
+
+SHARED_HOVER_SELECTOR_TEMPLATE = (
+    '#workskin a[class^="ch{chapter}text"]:hover:after,\n'
+    '#workskin a[class^="ch{chapter}text"]:focus:after'
+)
+
+# characters of HTML held back with no line break to cut at, past which the text
+# before the first "{" that may still start a marker is written out, and a "{" with
+# more than this many characters after it is left as text
+STREAM_PENDING_MAX_SIZE = 256 * 1024
@@ -1,11 +1,94 @@
+import io
 import os
-from typing import List, Match, Tuple
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
 
 import utils
-from constants import ANCHOR_TEMPLATE, CLASS_TEMPLATE, CSS_TEMPLATE, TRANSLATION_PATTERN
+from constants import (
+    ANCHOR_TEMPLATE,
+    CLASS_TEMPLATE,
+    COMPACT_CSS_TEMPLATE,
+    CSS_TEMPLATE,
+    HOVER_DECLARATIONS,
+    SHARED_HOVER_SELECTOR_TEMPLATE,
+    STREAM_PENDING_MAX_SIZE,
+)
+from markers import iter_markers
+from workskin import WorkskinIndex
 
 
-def generate_translations(html: str, chapter: int) -> Tuple[str, str]:
+class PairNumbering:
+    """
+    Numbers the translation markers of a chapter in order, and the CSS classes they
+    use. Every marker gets its own class unless pairs are deduplicated, in which case
+    identical (original, translated) pairs share the class of their first occurrence,
+    so classes are numbered in order of each distinct pair's first occurrence.
+
+    Attributes:
+        markers (int): The number of markers numbered so far.
+        classes (int): The number of classes handed out so far.
+    """
+
+    __slots__ = ("markers", "classes", "_first_index", "_pair_classes")
+
+    def __init__(self, dedupe: bool = False, first_index: int = 1):
+        self.markers = 0
+        self.classes = 0
+        self._first_index = first_index
+        self._pair_classes: Optional[Dict[Tuple[str, str], int]] = (
+            {} if dedupe else None
+        )
+
+    @property
+    def deduplicated(self) -> int:
+        """
+        The number of markers that did not get a new class, because they shared the
+        class of an identical earlier pair or reused one defined elsewhere.
+        """
+        return self.markers - self.classes
+
+    def number(self, pair: Tuple[str, str]) -> Tuple[int, int, bool]:
+        """
+        Numbers the next marker.
+
+        Args:
+            pair (Tuple[str, str]): The marker's original and translated text.
+
+        Returns:
+            Tuple[int, int, bool]: The marker's number, its class's number, and
+            whether the class is new and so needs its CSS written.
+        """
+        self.markers += 1
+
+        if self._pair_classes is not None:
+            index = self._pair_classes.get(pair)
+
+            if index is not None:
+                return self.markers, index, False
+
+            self._pair_classes[pair] = self._first_index + self.classes
+
+        self.classes += 1
+        return self.markers, self._first_index + self.classes - 1, True
+
+    def reuse(self) -> int:
+        """
+        Numbers the next marker, whose class is defined elsewhere, such as in an
+        existing workskin.
+
+        Returns:
+            int: The marker's number.
+        """
+        self.markers += 1
+        return self.markers
+
+
+def generate_translations(
+    html: str,
+    chapter: int,
+    dedupe: bool = False,
+    compact: bool = False,
+    workskin: Optional[str] = None,
+) -> Tuple[str, str]:
     """
     Processes the input HTML string to extract translation pairs and
     replace them with annotated HTML elements. Also generates corresponding CSS.
@@ -13,17 +96,108 @@ def generate_translations(html: str, chapter: int) -> Tuple[str, str]:
     Args:
         html (str): The HTML content containing translation markers in the form {original [translated]}.
         chapter (int): The chapter number used for generating unique CSS class names.
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
+        compact (bool): Whether the hover declarations every pair shares are
+            written once for the chapter instead of in each pair's rules.
+        workskin (Optional[str]): An existing workskin to update (see
+            `workskin.WorkskinIndex`): pairs it has a class for reuse it, new
+            classes are numbered after the chapter's last one in it, and the CSS
+            is the workskin with the rules of the new classes appended.
 
     Returns:
         Tuple[str, str]: A tuple containing the modified HTML string and the generated CSS styles.
     """
-    new_html, pairs = replace_and_extract_translations(html, chapter)
-    css = generate_css(pairs, chapter)
-    return new_html, css
+    html_out, css_out = io.StringIO(), io.StringIO()
+    write_translations([html], chapter, html_out, css_out, dedupe, compact, workskin)
+    return html_out.getvalue(), css_out.getvalue()
+
+
+def write_translations(
+    chunks: Iterable[str],
+    chapter: int,
+    html_out: TextIO,
+    css_out: TextIO,
+    dedupe: bool = False,
+    compact: bool = False,
+    workskin: Optional[str] = None,
+) -> Tuple[int, int]:
+    """
+    Replaces translation markers in HTML read in chunks, writing the new HTML and the
+    CSS to two streams as the markers are found, so neither is held whole.
+
+    HTML with no line breaks to cut at is held back only from the first "{" after
+    the last marker, once more than STREAM_PENDING_MAX_SIZE characters are pending,
+    and a "{" followed by more than that many characters is then left as text.
+
+    A marker only spans a line break when one separates the original from its "[",
+    so text is held back from the last line break that is not followed by "[" onward,
+    and the output is the same as `generate_translations` gives for the joined chunks.
+
+    Args:
+        chunks (Iterable[str]): The HTML content containing translation markers, in
+            chunks of any size.
+        chapter (int): The chapter number used for generating unique CSS class names.
+        html_out (TextIO): Where to write the modified HTML.
+        css_out (TextIO): Where to write the generated CSS styles.
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
+        compact (bool): Whether the hover declarations every pair shares are
+            written once for the chapter instead of in each pair's rules.
+        workskin (Optional[str]): An existing workskin to update (see
+            `workskin.WorkskinIndex`): pairs it has a class for reuse it, new
+            classes are numbered after the chapter's last one in it, and the CSS
+            is the workskin with the rules of the new classes appended.
+
+    Returns:
+        Tuple[int, int]: The number of markers replaced, and how many of them shared
+        the class of an identical earlier pair or reused one of the workskin.
+    """
+    index = None if workskin is None else WorkskinIndex(workskin)
+
+    if index is None:
+        numbering = PairNumbering(dedupe)
+    else:
+        numbering = PairNumbering(dedupe, index.last_index(chapter) + 1)
+        css_out.write(index.css)
+
+    pending = ""
+
+    for chunk in chunks:
+        if len(pending) > STREAM_PENDING_MAX_SIZE:
+            end = _replace_markers(
+                pending,
+                len(pending),
+                chapter,
+                compact,
+                index,
+                numbering,
+                html_out,
+                css_out,
+                hold_tail=True,
+            )
+            pending = pending[end:]
+
+        searched = max(len(pending) - 1, 0)
+        pending += chunk
+        end = _find_marker_boundary(pending, searched)
+
+        if end:
+            _replace_markers(
+                pending, end, chapter, compact, index, numbering, html_out, css_out
+            )
+            pending = pending[end:]
+
+    _replace_markers(
+        pending, len(pending), chapter, compact, index, numbering, html_out, css_out
+    )
+    return numbering.markers, numbering.deduplicated
 
 
 def replace_and_extract_translations(
-    html: str, chapter: int
+    html: str, chapter: int, dedupe: bool = False
 ) -> Tuple[str, List[Tuple[str, str]]]:
     """
     Replaces translation markers in the HTML with anchor-based span elements and
@@ -32,47 +206,231 @@ def replace_and_extract_translations(
     Args:
         html (str): The HTML content containing translation markers.
         chapter (int): The chapter number used for generating unique class names.
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
 
     Returns:
         Tuple[str, List[Tuple[str, str]]]: A tuple containing the updated HTML with replaced
-        elements and a list of (original, translated) string pairs.
+        elements and a list of (original, translated) string pairs, one per class.
     """
     translation_pairs = []
+    pieces = []
+    position = 0
+    numbering = PairNumbering(dedupe)
 
-    def replacement(match: Match):
-        original, translated = match.group(1), match.group(2)
-        translation_pairs.append((original, translated))
-        idx = len(translation_pairs)
-        class_str = CLASS_TEMPLATE.format(chapter=chapter, index=idx)
+    for start, end, original, translated in iter_markers(html):
+        marker, idx, new_class = numbering.number((original, translated))
 
-        return ANCHOR_TEMPLATE.format(class_str=class_str, original=original)
+        if new_class:
+            translation_pairs.append((original, translated))
 
-    new_html = TRANSLATION_PATTERN.sub(replacement, html)
+        pieces.append(html[position:start])
+        pieces.append(
+            ANCHOR_TEMPLATE.format(
+                anchor_str=CLASS_TEMPLATE.format(chapter=chapter, index=marker),
+                class_str=CLASS_TEMPLATE.format(chapter=chapter, index=idx),
+                original=original,
+            )
+        )
+        position = end
+
+    pieces.append(html[position:])
+    new_html = "".join(pieces)
 
     return new_html, translation_pairs
 
 
-def generate_css(pairs: List[Tuple[str, str]], chapter: int) -> str:
+def generate_css(
+    pairs: List[Tuple[str, str]],
+    chapter: int,
+    dedupe: bool = False,
+    compact: bool = False,
+) -> str:
     """
     Generates CSS rules that toggle between original and translated text on hover/focus.
 
     Args:
         pairs (List[Tuple[str, str]]): A list of (original, translated) string pairs.
         chapter (int): The chapter number used for generating unique CSS class names.
+        dedupe (bool): Whether identical pairs share one CSS class, numbered in
+            order of each pair's first occurrence, instead of every marker getting
+            its own.
+        compact (bool): Whether the hover declarations every pair shares are
+            written once for the chapter instead of in each pair's rules.
 
     Returns:
         str: A string containing the compiled CSS rules.
     """
     css_blocks = []
+    numbering = PairNumbering(dedupe)
+
+    for original, translated in pairs:
+        _, idx, new_class = numbering.number((original, translated))
+
+        if not new_class:
+            continue
 
-    for idx, (original, translated) in enumerate(pairs, 1):
         class_str = f"ch{chapter}text{idx}"
-        css_block = CSS_TEMPLATE.format(
-            class_str=class_str,
-            original=utils.escape_character(original, '"'),
-            translated=utils.escape_character(translated, '"'),
-        )
+        css_block = _format_css_block(class_str, original, translated, compact)
 
         css_blocks.append(css_block)
-        
+
+    if compact and css_blocks:
+        css_blocks.insert(0, shared_hover_css([chapter]))
+
     return os.linesep.join(css_blocks)
+
+
+def shared_hover_css(chapters: Iterable[int]) -> str:
+    """
+    Builds the rule giving the hover declarations to every class of some chapters at
+    once, for compact CSS.
+
+    Args:
+        chapters (Iterable[int]): The chapters whose classes the rule matches.
+
+    Returns:
+        str: The CSS rule.
+    """
+    selectors = ",\n".join(
+        SHARED_HOVER_SELECTOR_TEMPLATE.format(chapter=chapter) for chapter in chapters
+    )
+    return f"{selectors} {{\n{HOVER_DECLARATIONS}}}\n"
+
+
+def _format_css_block(
+    class_str: str, original: str, translated: str, compact: bool
+) -> str:
+    """
+    Builds the CSS rules of a class, leaving out the shared hover declarations if
+    the CSS is compact.
+    """
+    return (COMPACT_CSS_TEMPLATE if compact else CSS_TEMPLATE).format(
+        class_str=class_str,
+        original=utils.escape_character(original, '"'),
+        translated=utils.escape_character(translated, '"'),
+    )
+
+
+def _find_marker_boundary(text: str, start: int) -> int:
+    """
+    Finds the last point of the text after `start` that no translation marker can
+    span, which is just past a line break that is not the whitespace before a "[".
+
+    Returns:
+        int: The position, or 0 if there is none.
+    """
+    end = len(text) - 1
+
+    while True:
+        position = text.rfind("\n", start, end)
+
+        if position == -1:
+            return 0
+
+        if text[position + 1] != "[":
+            return position + 1
+
+        end = position
+
+
+def _replace_markers(
+    text: str,
+    end: int,
+    chapter: int,
+    compact: bool,
+    workskin: Optional[WorkskinIndex],
+    numbering: PairNumbering,
+    html_out: TextIO,
+    css_out: TextIO,
+    hold_tail: bool = False,
+) -> int:
+    """
+    Replaces the translation markers in text up to `end`, numbering them and their
+    classes, and writing the CSS block of each new class, separated by line breaks,
+    to `css_out`, after the shared hover rule if the CSS is compact. Markers whose
+    pair has a class in the workskin use it instead.
+
+    With `hold_tail`, the text after the last marker is only written up to where a
+    marker may still start once more text is read (see `_find_held_tail`). A marker
+    found in the text is final whatever follows it, since each "{" before it would
+    have found its "[" and "]}" no later than the marker's.
+
+    Returns:
+        int: Where the written text ends.
+    """
+    position = 0
+
+    for start, marker_end, original, translated in iter_markers(text, end):
+        class_str = (
+            None if workskin is None else workskin.find_class(original, translated)
+        )
+
+        if class_str is not None:
+            marker = numbering.reuse()
+        else:
+            marker, index, new_class = numbering.number((original, translated))
+            class_str = CLASS_TEMPLATE.format(chapter=chapter, index=index)
+
+            if new_class:
+                if numbering.classes > 1:
+                    css_out.write(os.linesep)
+                else:
+                    _start_new_rules(chapter, compact, workskin, css_out)
+
+                css_out.write(
+                    _format_css_block(class_str, original, translated, compact)
+                )
+
+        html_out.write(text[position:start])
+        html_out.write(
+            ANCHOR_TEMPLATE.format(
+                anchor_str=CLASS_TEMPLATE.format(chapter=chapter, index=marker),
+                class_str=class_str,
+                original=original,
+            )
+        )
+        position = marker_end
+
+    if hold_tail:
+        end = _find_held_tail(text, position)
+
+    html_out.write(text[position:end])
+    return end
+
+
+def _find_held_tail(text: str, position: int) -> int:
+    """
+    Finds where text past its last marker has to be held back for more: at the first
+    "{" that may still start a marker, skipping any with more than
+    STREAM_PENDING_MAX_SIZE characters after it.
+    """
+    while True:
+        brace = text.find("{", position)
+
+        if brace == -1:
+            return len(text)
+
+        if len(text) - brace <= STREAM_PENDING_MAX_SIZE:
+            return brace
+
+        position = brace + 1
+
+
+def _start_new_rules(
+    chapter: int,
+    compact: bool,
+    workskin: Optional[WorkskinIndex],
+    css_out: TextIO,
+) -> None:
+    """
+    Writes what goes before the CSS block of a chapter's first new class: a line
+    break after the workskin's rules, and the shared hover rule if the CSS is compact
+    and the workskin does not have it already.
+    """
+    if workskin is not None and workskin.css:
+        css_out.write(os.linesep)
+
+    if compact and (workskin is None or not workskin.shares_hover(chapter)):
+        css_out.write(shared_hover_css([chapter]) + os.linesep)
@@ -0,0 +1,124 @@
+import re
+from typing import Iterator, Optional, Tuple
+
+# a backslash before one of these in a marker makes it plain text when escapes are on
+ESCAPED_CHARACTER_PATTERN = re.compile(r"\\([\[\]{}\\])")
+
+
+def iter_markers(
+    text: str, end: Optional[int] = None, escapes: bool = False
+) -> Iterator[Tuple[int, int, str, str]]:
+    """
+    Finds the translation markers of the form {original [translated]} in text, in one
+    pass that takes time linear in the length of the text.
+
+    The markers are the ones TRANSLATION_PATTERN finds: a marker starts at a "{", its
+    original runs to the first "[" that follows whitespace, and its translation runs
+    to the first "]}" after that. Neither may cross a line break, though the
+    whitespace before the "[" may be one. A "{" that starts no marker is skipped.
+
+    The pattern's lazy groups are retried from every "{" and every "[" after it across
+    the rest of the line, so a line with many unclosed braces and brackets takes time
+    that grows with the cube of its length. Here each "{" only needs
+    the next "[" after whitespace, "]}" and line break, and those only move forward,
+    so each is searched for from where the last search left off: if the first "["
+    on the line has no "]}" before the line ends, neither has any later one.
+
+    Args:
+        text (str): The text to scan.
+        end (Optional[int]): Where to stop, as if the text ended there; defaults to
+            the end of the text.
+        escapes (bool): Whether a backslash before "[", "]", "{", "}" or another
+            backslash makes it plain text, so that "\\{" does not start a marker and
+            "\\]}" does not end a translation. The backslashes are dropped from the
+            pairs but left as they are in the text around the markers.
+
+    Yields:
+        Tuple[int, int, str, str]: Where each marker starts and ends, and its
+        original and translated text, in order.
+    """
+    if end is None:
+        end = len(text)
+
+    find = text.find
+    # the next line break, "[" after whitespace and "]}" found so far, and the same
+    # for the line after a line break that is the whitespace before a "["; each is
+    # searched for again only once the scan has passed it, and from there on
+    line_end = opening = close = -1
+    next_line_end = next_line_close = -1
+    start = find("{", 0, end)
+
+    while escapes and start != -1 and _is_escaped(text, start):
+        start = find("{", start + 1, end)
+
+    while start != -1:
+        if line_end <= start:
+            line_end = find("\n", start + 1, end)
+            line_end = end if line_end == -1 else line_end
+
+        if opening < start + 2:
+            opening = find("[", start + 2, end)
+
+            while opening != -1 and not text[opening - 1].isspace():
+                opening = find("[", opening + 1, end)
+
+            opening = end if opening == -1 else opening
+
+        if opening < line_end and close < opening + 2:
+            close = _find_close(text, opening + 2, end, escapes)
+
+        marker_opening, marker_line_end = opening, line_end
+        marker_close = close if opening < line_end else end
+
+        if marker_close >= line_end and text.startswith("[", line_end + 1, end):
+            # the line break itself is the whitespace before the "["
+            marker_opening = line_end + 1
+
+            if next_line_end < marker_opening + 1:
+                next_line_end = find("\n", marker_opening + 1, end)
+                next_line_end = end if next_line_end == -1 else next_line_end
+
+            if next_line_close < marker_opening + 2:
+                next_line_close = _find_close(text, marker_opening + 2, end, escapes)
+
+            marker_close, marker_line_end = next_line_close, next_line_end
+
+        if marker_close < marker_line_end:
+            original = text[start + 1 : marker_opening - 1]
+            translated = text[marker_opening + 1 : marker_close]
+
+            if escapes:
+                original = ESCAPED_CHARACTER_PATTERN.sub(r"\1", original)
+                translated = ESCAPED_CHARACTER_PATTERN.sub(r"\1", translated)
+
+            yield start, marker_close + 2, original, translated
+            start = find("{", marker_close + 2, end)
+        else:
+            start = find("{", start + 1, end)
+
+        while escapes and start != -1 and _is_escaped(text, start):
+            start = find("{", start + 1, end)
+
+
+def _find_close(text: str, position: int, end: int, escapes: bool) -> int:
+    """
+    Finds the next "]}" that could end a translation, or `end` if there is none.
+    """
+    found = text.find("]}", position, end)
+
+    while escapes and found != -1 and _is_escaped(text, found):
+        found = text.find("]}", found + 1, end)
+
+    return end if found == -1 else found
+
+
+def _is_escaped(text: str, position: int) -> bool:
+    """
+    Checks whether the character at a position follows an odd run of backslashes.
+    """
+    backslash = position
+
+    while backslash > 0 and text[backslash - 1] == "\\":
+        backslash -= 1
+
+    return (position - backslash) % 2 == 1